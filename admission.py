@@ -0,0 +1,240 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+
+# Request classes within a pool: lower numbers are served first, and a full queue sheds its lowest-priority entry
+PRIORITIES = {"interactive": 0, "write": 1, "bulk": 2}
+
+# Route suffixes of long-running transfers, queued behind everything else in their pool
+BULK_SUFFIXES = ('/bulk', '/export')
+
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_TIMEOUT = 10.0
+
+# Weight of the newest observation in the service-time average
+SERVICE_TIME_ALPHA = 0.1
+
+
+class Rejected(Exception):
+    """The request was not admitted; answer 503 with Retry-After"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def request_class(method, path):
+    """Priority class of a request from its route: reads, then single writes, then bulk transfers"""
+    if path.rstrip('/').endswith(BULK_SUFFIXES):
+        return "bulk"
+    return "interactive" if method in READ_METHODS else "write"
+
+
+class _Waiter:
+    __slots__ = ('priority', 'sequence', 'deadline', 'future', 'cancelled')
+
+    def __init__(self, priority, sequence, deadline, future):
+        self.priority = priority
+        self.sequence = sequence
+        self.deadline = deadline
+        self.future = future
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class PoolAdmission:
+    """
+    Concurrency limit plus a bounded priority queue for one pool.
+
+    At most `capacity` requests run at once; the rest wait in priority order
+    (then arrival order). A request is turned away up front when the queue is
+    full of equal or higher priority work, or when the expected wait means it
+    would finish after its deadline anyway, and a waiter whose deadline can
+    no longer be met leaves the queue instead of taking a slot. Work that would
+    time out is never started, so the backends spend their capacity on
+    requests that can still succeed.
+    """
+
+    def __init__(self, name, capacity, queue_size=DEFAULT_QUEUE_SIZE, initial_service_time=0.1):
+        self.name = name
+        self.capacity = capacity
+        self.queue_size = queue_size
+        self.service_time = initial_service_time  # moving average, seconds
+        self.running = 0
+        self._queue = []  # heap of _Waiter, cancelled entries removed lazily
+        self._queued = 0
+        self._sequence = itertools.count()
+        self.admitted = 0
+        self.completed = 0
+        self.rejected = {'queue_full': 0, 'deadline': 0, 'shed': 0}
+
+    @property
+    def queued(self):
+        return self._queued
+
+    def expected_wait(self, ahead):
+        """Seconds until a request with `ahead` requests in front of it gets a slot"""
+        if self.running < self.capacity and not ahead:
+            return 0.0
+        return (ahead + 1) / max(self.capacity, 1) * self.service_time
+
+    def retry_after(self):
+        return max(1, math.ceil(self.expected_wait(self._queued)))
+
+    def _reject(self, kind, reason):
+        self.rejected[kind] += 1
+        return Rejected(reason, self.retry_after())
+
+    def _ahead_of(self, priority):
+        return sum(1 for w in self._queue if not w.cancelled and w.priority <= priority)
+
+    async def acquire(self, priority, deadline):
+        """Wait for a slot; raises Rejected if the request cannot be served in time"""
+        now = time.monotonic()
+        if self.running < self.capacity and not self._queued:
+            self.running += 1
+            self.admitted += 1
+            return
+        if now + self.expected_wait(self._ahead_of(priority)) + self.service_time > deadline:
+            raise self._reject('deadline', f"{self.name} cannot serve the request before its deadline")
+        if self._queued >= self.queue_size:
+            victim = max((w for w in self._queue if not w.cancelled), default=None)
+            if victim is None or victim.priority <= priority:
+                raise self._reject('queue_full', f"{self.name} queue is full")
+            # Make room by shedding the newest entry of the lowest priority class
+            self._remove(victim)
+            victim.future.set_exception(self._reject('shed', f"{self.name} shed for higher-priority work"))
+
+        waiter = _Waiter(priority, next(self._sequence), deadline, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, waiter)
+        self._queued += 1
+        try:
+            # Leave early enough that the request could still finish by its deadline
+            await asyncio.wait_for(asyncio.shield(waiter.future),
+                                   max(0.0, deadline - self.service_time - time.monotonic()))
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.exception():
+                self.release(None)  # the slot was granted just as the wait timed out
+            self._remove(waiter)
+            raise self._reject('deadline', f"{self.name} queue wait exceeded the deadline")
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.exception():
+                self.release(None)
+            self._remove(waiter)
+            raise
+
+    def _remove(self, waiter):
+        if not waiter.cancelled and not waiter.future.done():
+            waiter.cancelled = True
+            self._queued -= 1
+
+    def release(self, service_time):
+        """Free a slot (recording how long the request ran) and hand it to the best waiter"""
+        self.running -= 1
+        if service_time is not None:
+            self.completed += 1
+            self.service_time += SERVICE_TIME_ALPHA * (service_time - self.service_time)
+        now = time.monotonic()
+        while self._queue and self.running < self.capacity:
+            waiter = heapq.heappop(self._queue)
+            if waiter.cancelled or waiter.future.done():
+                continue
+            self._queued -= 1
+            if now + self.service_time > waiter.deadline:
+                waiter.future.set_exception(self._reject('deadline', f"{self.name} deadline passed while queued"))
+                continue
+            self.running += 1
+            self.admitted += 1
+            waiter.future.set_result(None)
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "running": self.running,
+            "queued": self._queued,
+            "queue_size": self.queue_size,
+            "service_time_ms": round(self.service_time * 1000, 2),
+            "admitted": self.admitted,
+            "completed": self.completed,
+            "rejected": dict(self.rejected),
+        }
+
+
+class _Admission:
+    def __init__(self, pool, priority, deadline):
+        self.pool = pool
+        self.priority = priority
+        self.deadline = deadline
+        self.started = None
+
+    async def __aenter__(self):
+        await self.pool.acquire(self.priority, self.deadline)
+        self.started = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Failed requests free their slot without skewing the service-time average
+        self.pool.release(time.monotonic() - self.started if exc_type is None else None)
+
+
+class AdmissionController:
+    """
+    Admission for every pool behind the balancer (one event loop).
+
+        async with controller.admit("Web", timeout=5, priority="bulk"):
+            ...forward the request...
+
+    raises Rejected when the pool is saturated; pool capacity follows the
+    number of backends through set_capacity. Priority is a class name from
+    `priorities` (see request_class) or a number, lower first; requests
+    default to "interactive".
+    """
+
+    def __init__(self, per_backend_concurrency, queue_size=DEFAULT_QUEUE_SIZE, priorities=PRIORITIES):
+        self.per_backend_concurrency = per_backend_concurrency
+        self.queue_size = queue_size
+        self.priorities = priorities
+        self.pools = {}
+
+    def pool(self, name):
+        if name not in self.pools:
+            self.pools[name] = PoolAdmission(name, self.per_backend_concurrency.get(name, 1), self.queue_size)
+        return self.pools[name]
+
+    def set_capacity(self, name, backends):
+        """Resize a pool's concurrency limit for its current number of backends"""
+        pool = self.pool(name)
+        capacity = backends * self.per_backend_concurrency.get(name, 1)
+        if capacity != pool.capacity:
+            grew = capacity > pool.capacity
+            pool.capacity = capacity
+            if grew:
+                # Hand the new slots to waiters: release() with a phantom slot grants queued requests
+                pool.running += 1
+                pool.release(None)
+
+    def priority(self, value):
+        """Numeric priority for a class name or number; ValueError for anything else"""
+        if value is None:
+            return self.priorities["interactive"]
+        if isinstance(value, str) and value in self.priorities:
+            return self.priorities[value]
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"Unknown priority {value!r}; use a number or one of {', '.join(self.priorities)}") \
+                from None
+
+    def admit(self, name, timeout=DEFAULT_TIMEOUT, priority=None):
+        deadline = time.monotonic() + timeout
+        return _Admission(self.pool(name), self.priority(priority), deadline)
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
@@ -1,98 +1,46 @@
 import streamlit as st
-import requests
 from datetime import datetime
 import time
-import subprocess  # Import subprocess to run the command script
+import os
+import subprocess  # Import subprocess to start the backend supervisor
+import sys
+import uuid
 from load_balancer_least_connections import LoadBalancerLeastConnections  # Import the new load balancer
+from load_balancer_round_robin import LoadBalancer
+import background_loop
+import backend_registry
+import profiling
+import rate_limiter
+import request_trace
+import warmup
+import web_client
 
-# Automatically run the run_servers.cmd script
-subprocess.Popen(['cmd.exe', '/c', 'run_servers.cmd'], shell=True)
+# Start the backend pools once per dashboard process (not on every rerun), unless the
+# dashboard itself was launched by the supervisor
+@st.cache_resource
+def start_backends():
+    # Pools follow the supervisor's backends.json and the admin API on LB_ADMIN_PORT
+    try:
+        backend_registry.start()
+    except OSError as e:
+        print(f"Backend admin API not started: {e}")
+    if os.environ.get('LB_MANAGED_BY_SUPERVISOR'):
+        return None
+    return subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'supervisor.py')])
 
-# URLs for each instance type with network topology visualization
-DATABASE_SERVER_URLS = ["http://localhost:8502", "http://localhost:8503", "http://localhost:8504"]
-WEB_SERVER_URLS = ["http://localhost:8511", "http://localhost:8512", "http://localhost:8513"]
-FILE_SERVER_URLS = ["http://localhost:8701", "http://localhost:8702", "http://localhost:8703"]
+start_backends()
 
-class LoadBalancer:
-    def __init__(self):
-        self.db_counter = 0
-        self.web_counter = 0
-        self.file_counter = 0
-        self.instance_health = {}
-        self.total_requests = 0
-        self.start_time = datetime.now()
-        self.server_load = {  # Track load on each server
-            "Database": {url: 0 for url in DATABASE_SERVER_URLS},
-            "Web": {url: 0 for url in WEB_SERVER_URLS},
-            "File": {url: 0 for url in FILE_SERVER_URLS},
-        }
-        
-    def check_health(self, url):
-        """Check if an instance is healthy by making a request and monitoring network metrics"""
-        try:
-            response = requests.get(url + "/health", timeout=2)
-            is_healthy = response.status_code == 200
-            self.instance_health[url] = {
-                'healthy': is_healthy,
-                'last_check': datetime.now(),
-                'response_time': response.elapsed.total_seconds(),
-                'latency': round(response.elapsed.total_seconds() * 1000, 2),  # in ms
-                'status': 'Active' if is_healthy else 'Down',
-                'bandwidth': '1 Gbps',  # Simulated network bandwidth
-                'protocol': 'HTTP/1.1'
-            }
-            return is_healthy
-        except requests.RequestException:
-            self.instance_health[url] = {
-                'healthy': False,
-                'last_check': datetime.now(),
-                'response_time': float('inf'),
-                'latency': float('inf'),
-                'status': 'Down',
-                'bandwidth': 'N/A',
-                'protocol': 'N/A'
-            }
-            return False
+# Hold the first render until the backends answer (or warmup.READY_DEADLINE passes), with
+# connections already open and the status snapshot primed, instead of showing them all Down
+@st.cache_resource
+def warm_up_backends():
+    report = background_loop.run(warmup.warm_up(backend_registry.REGISTRY))
+    background_loop.run(backend_registry.MONITOR.refresh())
+    print(f"Dashboard warm-up: {warmup.describe(report)}")
+    return report
 
-    def get_least_loaded_instance(self, urls, counter):
-        """
-        Round Robin with health checking and advanced network monitoring
-        """
-        healthy_instances = []
-        
-        # Check health of instances
-        for url in urls:
-            last_check = self.instance_health.get(url, {}).get('last_check')
-            if not last_check or (datetime.now() - last_check).seconds > 30:
-                self.check_health(url)
-            
-            if self.instance_health.get(url, {}).get('healthy', False):
-                healthy_instances.append(url)
-        
-        if not healthy_instances:
-            raise Exception("No healthy instances available")
-            
-        selected_instance = healthy_instances[counter % len(healthy_instances)]
-        return selected_instance
-
-    def get_next_instance(self, request_type):
-        """Get the next available instance based on request type with load statistics"""
-        try:
-            self.total_requests += 1
-            if request_type == "Database Request":
-                instance = self.get_least_loaded_instance(DATABASE_SERVER_URLS, self.db_counter)
-                self.db_counter += 1
-                self.server_load["Database"][instance] += 1  # Increment load
-            elif request_type == "Web Request":
-                instance = self.get_least_loaded_instance(WEB_SERVER_URLS, self.web_counter)
-                self.web_counter += 1
-                self.server_load["Web"][instance] += 1  # Increment load
-            else:  # File Request
-                instance = "http://localhost:8704"  # Directly redirect to file load balancer
-                self.server_load["File"][instance] += 1  # Increment load
-            return instance
-        except Exception as e:
-            return None
+with st.spinner("Waiting for the backends to become ready..."):
+    startup_report = warm_up_backends()
 
 # Add this line to allow selection of load balancing strategy
 load_balancer_option = st.sidebar.selectbox(
@@ -108,64 +56,103 @@ if 'load_balancer' not in st.session_state:
     else:
         st.session_state.load_balancer = LoadBalancer()
 
-# Add this after the imports
-def create_network_sidebar():
-    """Create a simple sidebar showing server status"""
-    st.sidebar.title("Server Status Monitor")
-    
-    # Web Servers Status
-    st.sidebar.markdown("### Web Servers")
-    for idx, url in enumerate(WEB_SERVER_URLS, 1):
-        try:
-            requests.get(url, timeout=1)
-            status = "🟢 Up"
-        except:
-            status = "🔴 Down"
-        st.sidebar.text(f"Instance {idx}: {status}")
+# Backend health comes from the admin API's status snapshot, probed once per interval for every
+# session, so the status sections below refresh on their own without rerunning the script
+STATUS_URL = f"http://localhost:{backend_registry.ADMIN_PORT}/status"
+REFRESH_SECONDS = 1
+
+def fetch_status():
+    """The latest status snapshot; an unchanged one is answered with 304 and reused from the session"""
+    cached = st.session_state.get('status_snapshot')
+    if cached and time.monotonic() - cached['fetched'] < REFRESH_SECONDS / 2:
+        return cached['data']  # another fragment of this run already asked
+    headers = {'If-None-Match': cached['etag']} if cached else {}
+    try:
+        response = web_client.get_client().get(STATUS_URL, headers=headers, timeout=1)
+    except Exception:
+        return cached['data'] if cached else None
+    if response.status_code == 304 and cached:
+        cached['fetched'] = time.monotonic()
+        return cached['data']
+    if response.status_code != 200:
+        return cached['data'] if cached else None
+    st.session_state.status_snapshot = {'etag': response.headers.get('ETag'), 'data': response.json(),
+                                        'fetched': time.monotonic()}
+    return st.session_state.status_snapshot['data']
 
-    # Database Servers Status
-    st.sidebar.markdown("### Database Servers")
-    for idx, url in enumerate(DATABASE_SERVER_URLS, 1):
-        try:
-            requests.get(url, timeout=1)
-            status = "🟢 Up"
-        except:
-            status = "🔴 Down"
-        st.sidebar.text(f"Instance {idx}: {status}")
+def status_label(backend):
+    if not backend['healthy']:
+        return "🔴 Down"
+    return "🟡 Draining" if backend['state'] == 'draining' else "🟢 Up"
 
-    # File Servers Status
-    st.sidebar.markdown("### File Servers")
-    for idx, url in enumerate(FILE_SERVER_URLS, 1):
-        try:
-            requests.get(url, timeout=1)
-            status = "🟢 Up"
-        except:
-            status = "🔴 Down"
-        st.sidebar.text(f"Instance {idx}: {status}")
+@st.fragment(run_every=REFRESH_SECONDS)
+def create_network_sidebar():
+    """Create a simple sidebar showing server status"""
+    st.title("Server Status Monitor")
+    status = fetch_status()
+    if status is None:
+        st.warning("Backend status unavailable")
+    else:
+        for pool, title in (("Web", "Web Servers"), ("Database", "Database Servers"), ("File", "File Servers")):
+            st.markdown(f"### {title}")
+            for idx, backend in enumerate(status["pools"].get(pool, []), 1):
+                st.text(f"Instance {idx}: {status_label(backend)}")
 
     # Simple network info
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### Network Info")
-    st.sidebar.text("Load Balancing: Round Robin")
-    st.sidebar.text(f"Total Requests: {st.session_state.load_balancer.total_requests}")
+    st.markdown("---")
+    st.markdown("### Network Info")
+    st.text(f"Load Balancing: {load_balancer_option}")
+    st.text(f"Total Requests: {st.session_state.load_balancer.total_requests}")
+    st.caption(f"Startup: {warmup.describe(startup_report)}")
+
+def create_profiling_sidebar():
+    """Phase timings of the routing code, and the sampling profiler toggle"""
+    with st.sidebar.expander("Routing Profiler"):
+        profiling.TIMERS.enabled = st.toggle("Record phase timers", value=profiling.TIMERS.enabled)
+        phases = profiling.TIMERS.snapshot()
+        if phases:
+            st.table([{"phase": name, **stats} for name, stats in phases.items()])
+        elif not profiling.TIMERS.enabled:
+            st.caption("Phase timers are off; switch them on to time the routing code")
+        else:
+            st.caption("No requests routed yet")
+        if st.button("Reset timers", disabled=not phases):
+            profiling.TIMERS.reset()
+        seconds = st.number_input("Profile for (seconds)", min_value=1, max_value=profiling.MAX_PROFILE_SECONDS,
+                                  value=profiling.DEFAULT_PROFILE_SECONDS)
+        if st.button("Start sampling profiler", disabled=profiling.PROFILER.running):
+            try:
+                path = profiling.PROFILER.start(seconds)
+                st.info(f"Profiling for {seconds}s, writing {path}")
+            except RuntimeError as e:
+                st.warning(str(e))
+        status = profiling.PROFILER.status()
+        if status["last_path"]:
+            st.caption(f"Last profile (collapsed stacks for flamegraph.pl or speedscope): {status['last_path']}")
 
 # Add this line after initializing the load balancer
-create_network_sidebar()
+with st.sidebar:
+    create_network_sidebar()
+create_profiling_sidebar()
 
 # Network Topology and Load Balancer Dashboard
 st.title(" Network Load Balancer Dashboard")
 #st.markdown("### Network Topology and Request Distribution System")
 
 # Display network statistics
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.metric("Total Requests Processed", st.session_state.load_balancer.total_requests)
-with col2:
-    uptime = datetime.now() - st.session_state.load_balancer.start_time
-    st.metric("System Uptime", f"{uptime.seconds//3600}h {(uptime.seconds//60)%60}m")
-with col3:
-    st.metric("Active Nodes", sum(1 for url in (DATABASE_SERVER_URLS + WEB_SERVER_URLS + FILE_SERVER_URLS) 
-                                 if st.session_state.load_balancer.instance_health.get(url, {}).get('healthy', False)))
+@st.fragment(run_every=REFRESH_SECONDS)
+def network_statistics():
+    status = fetch_status()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Requests Processed", st.session_state.load_balancer.total_requests)
+    with col2:
+        uptime = datetime.now() - st.session_state.load_balancer.start_time
+        st.metric("System Uptime", f"{uptime.seconds//3600}h {(uptime.seconds//60)%60}m")
+    with col3:
+        st.metric("Active Nodes", f"{status['healthy']}/{status['total']}" if status else "N/A")
+
+network_statistics()
 
 # Request Type Selection with Network Protocol Information
 st.markdown("### Request Distribution Configuration")
@@ -175,13 +162,38 @@ request_type = st.selectbox(
     help="Choose the type of network service to access"
 )
 
+# One limiter shared by every session, so limits hold across reruns and browser tabs
+@st.cache_resource
+def get_rate_limiter():
+    return rate_limiter.RateLimiter()
+
+if 'client_id' not in st.session_state:
+    st.session_state.client_id = str(uuid.uuid4())
+
+# Routing decisions are logged to <LB_TRACE_DIR>/dashboard.trace when LB_TRACE_DIR is set
+@st.cache_resource
+def get_trace_recorder():
+    return request_trace.recorder_from_env('dashboard')
+
 # Network Traffic Control
 def get_next_instance(request_type):
     """Get the next available instance based on request type with load statistics"""
+    trace = get_trace_recorder()
+    start = time.monotonic()
+    decision = get_rate_limiter().check(st.session_state.client_id, request_type)
+    if not decision.allowed:
+        if trace:
+            trace.record(request_type, None, time.monotonic() - start, request_trace.OUTCOMES.index("rate_limited"),
+                         429, client=st.session_state.client_id)
+        raise rate_limiter.RateLimited(decision)
     if load_balancer_option == "Least Connections":
-        return st.session_state.load_balancer.get_next_instance(request_type)
+        instance = st.session_state.load_balancer.get_next_instance(request_type)
     else:
-        return st.session_state.load_balancer.get_next_instance(request_type)
+        instance = st.session_state.load_balancer.get_next_instance(request_type)
+    if trace:
+        trace.record(request_type, instance, time.monotonic() - start,
+                     request_trace.OUTCOMES.index("ok" if instance else "no_backend"), client=st.session_state.client_id)
+    return instance
 
 # Update the routing logic to use the selected load balancer
 if st.button("Route Request", help="Initialize network routing to selected service"):
@@ -224,37 +236,26 @@ if st.button("Route Request", help="Initialize network routing to selected servi
         else:
             st.error("🚫 Network Error: No healthy instances available in the subnet")
             st.warning("Please verify network connectivity and server status")
+    except rate_limiter.RateLimited as e:
+        st.warning(f"⏳ Too many {request_type}s: try again in {e.decision.retry_after:.1f} seconds")
     except Exception as e:
         st.error(f"🔥 Critical Network Error: {str(e)}")
  
 # Dashboard for current server status
-st.markdown("### Current Server Status Dashboard")
-col1, col2, col3 = st.columns(3)
-
-# Display Database Server Status
-with col1:
-    st.markdown("#### Database Servers")
-    for url in DATABASE_SERVER_URLS:
-        is_healthy = st.session_state.load_balancer.check_health(url)
-        load = st.session_state.load_balancer.server_load["Database"].get(url, 0)
-        status = "🟢 Up" if is_healthy else "🔴 Down"
-        st.info(f"{url}: {status} | Load: {load} requests")
-
-# Display Web Server Status
-with col2:
-    st.markdown("#### Web Servers")
-    for url in WEB_SERVER_URLS:
-        is_healthy = st.session_state.load_balancer.check_health(url)
-        load = st.session_state.load_balancer.server_load["Web"].get(url, 0)
-        status = "🟢 Up" if is_healthy else "🔴 Down"
-        st.info(f"{url}: {status} | Load: {load} requests")
-
-# Display File Server Status
-with col3:
-    st.markdown("#### File Servers")
-    for url in FILE_SERVER_URLS:
-        is_healthy = st.session_state.load_balancer.check_health(url)
-        load = st.session_state.load_balancer.server_load["File"].get(url, 0)
-        status = "🟢 Up" if is_healthy else "🔴 Down"
-        st.info(f"{url}: {status} | Load: {load} requests")
+@st.fragment(run_every=REFRESH_SECONDS)
+def server_status():
+    st.markdown("### Current Server Status Dashboard")
+    status = fetch_status()
+    if status is None:
+        st.warning("Backend status unavailable: is the admin API running?")
+        return
+    columns = st.columns(3)
+    for column, (pool, title) in zip(columns, (("Database", "Database Servers"), ("Web", "Web Servers"),
+                                               ("File", "File Servers"))):
+        with column:
+            st.markdown(f"#### {title}")
+            for backend in status["pools"].get(pool, []):
+                load = st.session_state.load_balancer.server_load[pool].get(backend['url'], 0)
+                st.info(f"{backend['url']}: {status_label(backend)} | Load: {load} requests")
 
+server_status()
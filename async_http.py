@@ -0,0 +1,318 @@
+import asyncio
+import json
+import string
+import threading
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+# Event loops of the servers started in this process, keyed by port
+_running_servers = {}
+_running_lock = threading.Lock()
+
+# Bytes read from the connection at a time when streaming a request body
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class BadRequest(Exception):
+    """The request cannot be framed; it is answered with `status` and the connection closed"""
+
+    def __init__(self, status, reason):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+def _body_framing(headers):
+    """
+    Check how the body is delimited: returns True for a chunked body, else False.
+
+    Only the chunked transfer coding is supported (501 otherwise); it overrides a
+    Content-Length, which is dropped. A Content-Length that is not a single
+    number is refused, since the end of the body would be guessed.
+    """
+    coding = headers.get('transfer-encoding')
+    if coding is not None:
+        if coding.strip().lower() != 'chunked':
+            raise BadRequest(501, f"Unsupported Transfer-Encoding: {coding}")
+        headers.pop('content-length', None)
+        return True
+    length = headers.get('content-length')
+    if length is not None and not (length.isascii() and length.isdigit()):
+        raise BadRequest(400, "Invalid Content-Length")
+    return False
+
+
+class Request:
+    """
+    A parsed HTTP/1.1 request whose body is read lazily from the connection.
+
+    The body is delimited by Content-Length or, when `chunked`, by the chunked
+    transfer coding, which is decoded here so handlers only see the payload.
+    """
+
+    def __init__(self, method, path, query, headers, reader, target=None, client=None, chunked=False):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.target = target or path  # path plus the raw query string, as sent by the client
+        self.client = client  # peer IP address
+        self.headers = headers
+        self.chunked = chunked
+        self._reader = reader
+        self._remaining = 0 if chunked else int(headers.get('content-length') or 0)
+        self._chunk_left = 0  # bytes of the current chunk not read yet
+        self._chunks_done = not chunked
+        self.malformed = False  # set when the chunked framing was broken; the connection must then close
+
+    async def read(self):
+        """Read the whole request body"""
+        if self.chunked:
+            return b''.join([chunk async for chunk in self.iter_chunks()])
+        data = await self._reader.readexactly(self._remaining)
+        self._remaining = 0
+        return data
+
+    async def _read_chunked(self):
+        try:
+            async for chunk in self._read_chunks():
+                yield chunk
+        except ValueError:
+            self.malformed = self._chunks_done = True
+            raise
+
+    async def _read_chunks(self):
+        # One chunk's data at a time; the size line before it and the CRLF after it are consumed here
+        while not self._chunks_done:
+            if self._chunk_left == 0:
+                size = (await self._reader.readline()).split(b';')[0].strip().decode('latin-1')
+                if not size or any(c not in string.hexdigits for c in size):
+                    raise ValueError("Invalid chunk size")
+                self._chunk_left = int(size, 16)
+                if self._chunk_left == 0:
+                    while (await self._reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass  # trailer fields are not used
+                    self._chunks_done = True
+                    return
+            chunk = await self._reader.read(min(READ_CHUNK_SIZE, self._chunk_left))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b'', self._chunk_left)
+            self._chunk_left -= len(chunk)
+            if self._chunk_left == 0 and await self._reader.readline() not in (b'\r\n', b'\n'):
+                raise ValueError("Chunk data is longer than its size")
+            yield chunk
+
+    async def iter_chunks(self):
+        """Yield the body in pieces of at most READ_CHUNK_SIZE bytes as it arrives"""
+        if self.chunked:
+            async for chunk in self._read_chunked():
+                yield chunk
+            return
+        while self._remaining > 0:
+            chunk = await self._reader.read(min(READ_CHUNK_SIZE, self._remaining))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b'', self._remaining)
+            self._remaining -= len(chunk)
+            yield chunk
+
+    async def iter_lines(self):
+        """
+        Yield the body line by line as it arrives, without buffering all of it.
+
+        Reads never go past Content-Length (a line reader would wait for a newline
+        the client never sends); text after the last newline is the final line.
+        """
+        pending = b''
+        async for chunk in self.iter_chunks():
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line + b'\n'
+        if pending:
+            yield pending
+
+    async def json(self):
+        body = await self.read()
+        return json.loads(body) if body else None
+
+    async def discard_body(self):
+        """Drop whatever the handler did not read so the connection can be reused"""
+        if self.chunked:
+            async for _ in self._read_chunked():
+                pass
+        elif self._remaining:
+            await self._reader.readexactly(self._remaining)
+            self._remaining = 0
+
+
+def _encode_body(payload):
+    if isinstance(payload, (bytes, bytearray)):
+        return bytes(payload), 'application/octet-stream'
+    return json.dumps(payload).encode(), 'application/json'
+
+
+def _head(status, headers):
+    head = f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    return head.encode('latin-1') + b"\r\n"
+
+
+async def _write_stream(writer, status, chunks, extra_headers, keep_alive):
+    """Send an async iterator of str/bytes chunks with chunked transfer encoding"""
+    headers = {
+        'Content-Type': 'application/octet-stream',
+        'Transfer-Encoding': 'chunked',
+        'Access-Control-Allow-Origin': '*',
+        'Connection': 'keep-alive' if keep_alive else 'close',
+    }
+    headers.update(extra_headers)
+    writer.write(_head(status, headers))
+    try:
+        async for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                await writer.drain()  # back-pressure: never buffer more than one chunk
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+    finally:
+        # Release what the producer holds (a cursor, an upstream connection) even if the client left
+        if hasattr(chunks, 'aclose'):
+            await chunks.aclose()
+
+
+async def _write_response(writer, status, payload, extra_headers, keep_alive):
+    if hasattr(payload, '__aiter__'):
+        await _write_stream(writer, status, payload, extra_headers, keep_alive)
+        return
+    body, content_type = _encode_body(payload)
+    headers = {
+        'Content-Type': content_type,
+        'Content-Length': str(len(body)),
+        'Access-Control-Allow-Origin': '*',
+        'Connection': 'keep-alive' if keep_alive else 'close',
+    }
+    headers.update(extra_headers)
+    writer.write(_head(status, headers) + body)
+    await writer.drain()
+
+
+def _find_handler(routes, method, path):
+    """Exact (method, path) route, else the longest matching (method, "/prefix/*") route"""
+    handler = routes.get((method, path))
+    prefix = path
+    while handler is None and prefix not in ('', '/'):
+        prefix = prefix.rsplit('/', 1)[0]
+        handler = routes.get((method, prefix + '/*'))
+    return handler
+
+
+async def _dispatch(routes, request):
+    """Run the handler for a request and normalise its result to (status, payload, headers)"""
+    handler = _find_handler(routes, request.method, request.path)
+    if handler is None:
+        if any(path == request.path for _, path in routes):
+            return 405, {"error": "Method not allowed"}, {}
+        return 404, {"error": "Not found"}, {}
+    try:
+        result = await handler(request)
+    except (ValueError, KeyError) as e:
+        return 400, {"error": str(e)}, {}
+    except Exception as e:
+        return 500, {"error": str(e)}, {}
+    if len(result) == 2:
+        return result[0], result[1], {}
+    return result
+
+
+async def _handle_connection(routes, reader, writer):
+    """Serve requests on one persistent connection until the client closes it"""
+    peer = writer.get_extra_info('peername')
+    client = peer[0] if peer else None
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, target, version = request_line.decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            framed_twice = 'transfer-encoding' in headers and 'content-length' in headers
+            try:
+                chunked = _body_framing(headers)
+            except BadRequest as e:
+                # The body's end is unknown, so nothing after it on this connection can be trusted
+                await _write_response(writer, e.status, {"error": e.reason}, {}, False)
+                break
+
+            url = urlsplit(target)
+            request = Request(method, url.path, dict(parse_qsl(url.query)), headers, reader, target, client, chunked)
+            status, payload, extra_headers = await _dispatch(routes, request)
+            await request.discard_body()
+
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+            # RFC 9112, 6.3: close after a message framed both ways, and after one whose framing broke
+            keep_alive = keep_alive and not framed_twice and not request.malformed
+            await _write_response(writer, status, payload, extra_headers, keep_alive)
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass  # malformed request or client went away mid-request
+    finally:
+        writer.close()
+
+
+async def start_server(routes, host, port):
+    """
+    Start serving `routes` on the running loop.
+
+    `routes` maps (method, path) to an async handler taking a Request and returning
+    (status, payload) or (status, payload, headers); dict/list payloads are sent as JSON
+    and async iterators are streamed with chunked transfer encoding. A path ending in
+    "/*" matches every path under that prefix.
+    """
+    return await asyncio.start_server(
+        lambda reader, writer: _handle_connection(routes, reader, writer), host, port
+    )
+
+
+def start_in_thread(routes, host, port, on_start=()):
+    """
+    Serve `routes` from a daemon thread with its own event loop and return that loop.
+
+    Safe to call on every Streamlit rerun: a port is only bound once per process.
+    `on_start` coroutine functions are scheduled on the loop once the server is up.
+    """
+    with _running_lock:
+        if port in _running_servers:
+            return _running_servers[port]
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(start_server(routes, host, port))
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                return
+            for coroutine_function in on_start:
+                loop.create_task(coroutine_function())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name=f"async-http-{port}", daemon=True).start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        _running_servers[port] = loop
+        return loop
@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+import urllib.request
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import shared_metrics
+from latency_histogram import LatencyHistogram
+
+# Load of one pool over the last interval; in_flight and queue_depth are pool totals
+PoolSample = namedtuple('PoolSample', 'instances in_flight queue_depth p99_ms')
+
+# One scaling decision, kept for display and logging
+ScalingEvent = namedtuple('ScalingEvent', 'time tier action instances reason')
+
+DEFAULT_INTERVAL = 2.0
+
+
+class ScalingPolicy:
+    """
+    When a pool should grow or shrink.
+
+    Each signal has a high and a low threshold: the pool grows when any signal
+    stays above its high mark for `sustain` consecutive samples and shrinks only
+    when every signal stays below its low mark for as long. The gap between the
+    marks plus the cooldowns keeps the pool from flapping around one threshold.
+    in_flight and queue_depth thresholds are per instance.
+    """
+
+    def __init__(self, min_instances=1, max_instances=8,
+                 in_flight_high=4.0, in_flight_low=1.0,
+                 queue_high=2.0, queue_low=0.25,
+                 p99_high_ms=2500.0, p99_low_ms=1000.0,
+                 sustain=3, scale_up_cooldown=15.0, scale_down_cooldown=60.0):
+        self.min_instances = min_instances
+        self.max_instances = max_instances
+        self.in_flight_high = in_flight_high
+        self.in_flight_low = in_flight_low
+        self.queue_high = queue_high
+        self.queue_low = queue_low
+        self.p99_high_ms = p99_high_ms
+        self.p99_low_ms = p99_low_ms
+        self.sustain = sustain
+        self.scale_up_cooldown = scale_up_cooldown
+        self.scale_down_cooldown = scale_down_cooldown
+
+    def pressure(self, sample):
+        """+1 with the signal that is too high, -1 when everything is idle, else 0"""
+        instances = max(sample.instances, 1)
+        in_flight = sample.in_flight / instances
+        queue_depth = sample.queue_depth / instances
+        if queue_depth > self.queue_high:
+            return 1, f"queue {queue_depth:.1f}/instance"
+        if in_flight > self.in_flight_high:
+            return 1, f"in-flight {in_flight:.1f}/instance"
+        if self.p99_high_ms is not None and sample.p99_ms > self.p99_high_ms:
+            return 1, f"p99 {sample.p99_ms:.0f} ms"
+        if in_flight < self.in_flight_low and queue_depth <= self.queue_low and \
+                (self.p99_low_ms is None or sample.p99_ms < self.p99_low_ms):
+            return -1, f"in-flight {in_flight:.1f}/instance, p99 {sample.p99_ms:.0f} ms"
+        return 0, None
+
+
+class HealthSource:
+    """Samples pools whose /health answers JSON with in_flight, queued and p99_ms"""
+
+    def __init__(self, timeout=1.0, max_workers=16):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="autoscaler-health")
+
+    def _read(self, instance):
+        try:
+            with urllib.request.urlopen(instance.health_url, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except (OSError, ValueError):
+            return {}
+
+    def sample(self, instances):
+        reports = list(self._executor.map(self._read, instances))
+        return PoolSample(
+            instances=len(instances),
+            in_flight=sum(r.get('in_flight', 0) for r in reports),
+            queue_depth=sum(r.get('queued', 0) for r in reports),
+            p99_ms=max((r.get('p99_ms', 0.0) for r in reports), default=0.0),
+        )
+
+
+class SharedTableSource:
+    """
+    Samples the web pool from the shared-memory metrics table.
+
+    Instance N writes slot N - 1. Requests beyond the simulated workers of an
+    instance are waiting, so they count as its queue. p99 covers only the
+    requests completed since the previous sample.
+    """
+
+    def __init__(self, table, workers=None, phase='total'):
+        self.table = table
+        self.workers = workers if workers is not None else int(os.environ.get('WEB_LOAD_WORKERS', 4))
+        self.phase = phase
+        self._previous_counts = {}
+
+    def _window(self, slot):
+        counts = array('q', self.table.histogram(slot, self.phase).counts)
+        previous = self._previous_counts.get(slot)
+        self._previous_counts[slot] = counts
+        if previous is None:
+            return LatencyHistogram()
+        return LatencyHistogram(counts=array('q', (now - before for now, before in zip(counts, previous))))
+
+    def sample(self, instances):
+        slots = [instance.number - 1 for instance in instances]
+        in_flight = [self.table.in_flight(slot) for slot in slots]
+        window = LatencyHistogram.merged(self._window(slot) for slot in slots)
+        return PoolSample(
+            instances=len(instances),
+            in_flight=sum(in_flight),
+            queue_depth=sum(max(0, n - self.workers) for n in in_flight),
+            p99_ms=window.percentile(99),
+        )
+
+    def forget(self, instance):
+        """Drop a retired instance's baseline; a later instance with its number claims the slot afresh"""
+        self._previous_counts.pop(instance.number - 1, None)
+
+
+class _TierState:
+    def __init__(self, now):
+        self.over = 0
+        self.under = 0
+        # Starting the pool counts as a scale-up, so it is not shrunk straight away
+        self.last_scale_up = now
+        self.last_scale_down = float('-inf')
+
+
+class Autoscaler:
+    """
+    Grows and shrinks backend pools from their load.
+
+    Every `interval` seconds each tier's source is sampled and its policy
+    decides; instances are added and removed one at a time through `scaler`
+    (a Supervisor, or anything with the same instances/spawn/retire interface).
+    Starting instances count towards the pool size but not towards the load
+    sample, so a scale-up is not repeated while the new instance boots.
+    """
+
+    def __init__(self, scaler, policies, sources, interval=DEFAULT_INTERVAL, clock=time.monotonic, on_event=None):
+        self.scaler = scaler
+        self.policies = policies
+        self.sources = sources
+        self.interval = interval
+        self.clock = clock
+        self.on_event = on_event
+        self.events = deque(maxlen=200)
+        self.last_samples = {}
+        self._states = {tier: _TierState(clock()) for tier in policies}
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _record(self, now, tier, action, reason):
+        event = ScalingEvent(now, tier, action, len(self._live(tier)), reason)
+        self.events.append(event)
+        if self.on_event:
+            self.on_event(event)
+
+    def _live(self, tier):
+        return [i for i in self.scaler.instances[tier] if i.state not in ('stopped', 'draining')]
+
+    def tick(self):
+        """Sample every pool once and apply at most one scaling step per pool"""
+        now = self.clock()
+        for tier, policy in self.policies.items():
+            state = self._states[tier]
+            live = self._live(tier)
+            if len(live) < policy.min_instances:
+                self.scaler.spawn(tier)
+                state.last_scale_up = now
+                self._record(now, tier, 'up', f"below minimum of {policy.min_instances}")
+                continue
+
+            ready = [i for i in live if i.state == 'ready']
+            sample = self.sources[tier].sample(ready)
+            self.last_samples[tier] = sample
+            direction, reason = policy.pressure(sample)
+            state.over = state.over + 1 if direction > 0 else 0
+            state.under = state.under + 1 if direction < 0 else 0
+
+            if state.over >= policy.sustain and len(live) < policy.max_instances and \
+                    now - state.last_scale_up >= policy.scale_up_cooldown:
+                self.scaler.spawn(tier)
+                state.over = 0
+                state.last_scale_up = now
+                self._record(now, tier, 'up', reason)
+            elif state.under >= policy.sustain and len(live) > policy.min_instances and \
+                    now - max(state.last_scale_up, state.last_scale_down) >= policy.scale_down_cooldown:
+                retired = self.scaler.retire(tier)
+                state.under = 0
+                state.last_scale_down = now
+                forget = getattr(self.sources[tier], 'forget', None)
+                if retired is not None and forget:
+                    forget(retired)
+                self._record(now, tier, 'down', reason)
+
+    def run_forever(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Autoscaler tick failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_forever, name="autoscaler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+
+
+def default_policies(max_instances=8):
+    """Policies for the supervisor's pools; web p99 includes the simulated 0.1-2 s load"""
+    return {
+        'database': ScalingPolicy(max_instances=max_instances, p99_high_ms=250.0, p99_low_ms=50.0),
+        'web': ScalingPolicy(max_instances=max_instances, in_flight_low=2.0,
+                             p99_high_ms=4000.0, p99_low_ms=2500.0),
+        'file': ScalingPolicy(max_instances=max_instances, in_flight_high=2.0, in_flight_low=0.5,
+                              p99_high_ms=5000.0, p99_low_ms=1000.0),
+    }
+
+
+def default_sources():
+    health = HealthSource()
+    return {
+        'database': health,
+        'web': SharedTableSource(shared_metrics.get_table()),
+        'file': health,
+    }
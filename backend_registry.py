@@ -0,0 +1,263 @@
+import json
+import os
+import threading
+from collections import namedtuple
+
+import async_http
+import profiling
+import status_monitor
+
+# Default pools, used until the supervisor's state file or the admin API says otherwise
+DEFAULT_POOLS = {
+    "Database": ["http://localhost:8502", "http://localhost:8503", "http://localhost:8504"],
+    "Web": ["http://localhost:8511", "http://localhost:8512", "http://localhost:8513"],
+    "File": ["http://localhost:8701", "http://localhost:8702", "http://localhost:8703"],
+}
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backends.json')
+ADMIN_PORT = int(os.environ.get('LB_ADMIN_PORT', 8600))
+WATCH_INTERVAL = 1.0
+
+# state is 'active' or 'draining'; source is 'config' (defaults / watched file) or 'admin'
+Backend = namedtuple('Backend', 'pool url name state source')
+
+
+class Snapshot:
+    """
+    An immutable view of every pool at one registry version.
+
+    Routing code takes one snapshot per decision and reads it without locks;
+    membership changes build a new snapshot instead of mutating this one.
+    """
+
+    def __init__(self, version, pools):
+        self.version = version
+        self.pools = pools  # {pool: (Backend, ...)}
+        self._active = {pool: tuple(b.url for b in backends if b.state == 'active')
+                        for pool, backends in pools.items()}
+
+    def urls(self, pool):
+        """URLs that may receive new requests"""
+        return self._active.get(pool, ())
+
+    def backends(self, pool):
+        """Every registered backend of the pool, draining ones included"""
+        return self.pools.get(pool, ())
+
+    def find(self, url):
+        for backends in self.pools.values():
+            for backend in backends:
+                if backend.url == url:
+                    return backend
+        return None
+
+    def as_dict(self):
+        return {"version": self.version,
+                "pools": {pool: [b._asdict() for b in backends] for pool, backends in self.pools.items()}}
+
+
+class BackendRegistry:
+    """
+    Pool membership with register, drain and deregister.
+
+    Writers serialise on a lock and publish a new Snapshot with a higher
+    version; readers only ever load the current snapshot reference, so
+    routing never waits on, or sees half of, a membership change.
+    """
+
+    def __init__(self, pools=None):
+        self._lock = threading.Lock()
+        self._drain_timers = {}
+        self._snapshot = Snapshot(0, {})
+        self.replace_config(pools if pools is not None else DEFAULT_POOLS)
+
+    def snapshot(self):
+        return self._snapshot
+
+    def _publish(self, pools):
+        self._snapshot = Snapshot(self._snapshot.version + 1, {pool: tuple(b) for pool, b in pools.items()})
+        return self._snapshot
+
+    def _copy(self):
+        return {pool: list(backends) for pool, backends in self._snapshot.pools.items()}
+
+    def register(self, pool, url, name=None, source='admin'):
+        """Add a backend (or reactivate a draining one); returns the new snapshot"""
+        with self._lock:
+            self._cancel_drain(url)
+            pools = self._copy()
+            backends = pools.setdefault(pool, [])
+            existing = next((b for b in backends if b.url == url), None)
+            if existing is not None:
+                if existing.state == 'active' and (name is None or name == existing.name):
+                    return self._snapshot
+                backends[backends.index(existing)] = existing._replace(state='active', name=name or existing.name)
+            else:
+                backends.append(Backend(pool, url, name or f"{pool} Server {len(backends) + 1}", 'active', source))
+            return self._publish(pools)
+
+    def deregister(self, pool, url):
+        with self._lock:
+            self._cancel_drain(url)
+            pools = self._copy()
+            remaining = [b for b in pools.get(pool, []) if b.url != url]
+            if len(remaining) == len(pools.get(pool, [])):
+                return self._snapshot
+            pools[pool] = remaining
+            return self._publish(pools)
+
+    def drain(self, pool, url, timeout=None):
+        """Stop sending new requests to a backend; deregister it after `timeout` seconds if given"""
+        with self._lock:
+            pools = self._copy()
+            backends = pools.get(pool, [])
+            for index, backend in enumerate(backends):
+                if backend.url == url and backend.state != 'draining':
+                    backends[index] = backend._replace(state='draining')
+                    snapshot = self._publish(pools)
+                    break
+            else:
+                return self._snapshot
+            if timeout is not None:
+                timer = threading.Timer(timeout, self.deregister, args=(pool, url))
+                timer.daemon = True
+                self._drain_timers[url] = timer
+                timer.start()
+            return snapshot
+
+    def _cancel_drain(self, url):
+        timer = self._drain_timers.pop(url, None)
+        if timer is not None:
+            timer.cancel()
+
+    def replace_config(self, pools):
+        """
+        Make the config-sourced backends match `pools`, {pool: [url or {"url", "name", "state"}]}.
+
+        Backends registered over the admin API are left alone; backends that
+        keep their URL keep their identity, so balancer state keyed by URL survives.
+        """
+        with self._lock:
+            current = self._copy()
+            updated = {}
+            for pool in set(current) | set(pools):
+                entries = [e if isinstance(e, dict) else {"url": e} for e in pools.get(pool, [])]
+                wanted = {e["url"]: e for e in entries}
+                kept = [b for b in current.get(pool, []) if b.source == 'admin' and b.url not in wanted]
+                existing = {b.url: b for b in current.get(pool, [])}
+                for position, entry in enumerate(entries, 1):
+                    old = existing.get(entry["url"])
+                    name = entry.get("name") or (old.name if old else f"{pool} Server {position}")
+                    kept.append(Backend(pool, entry["url"], name, entry.get("state", "active"), 'config'))
+                updated[pool] = kept
+            if updated == {pool: list(b) for pool, b in self._snapshot.pools.items()}:
+                return self._snapshot
+            return self._publish(updated)
+
+
+class ConfigWatcher:
+    """Applies a pools JSON file (the supervisor's backends.json) to a registry whenever it changes"""
+
+    def __init__(self, registry, path=DEFAULT_CONFIG_PATH, interval=WATCH_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._mtime = None
+        self._stopping = threading.Event()
+
+    def poll(self):
+        """Reload the file if it changed; returns True when it was applied"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            with open(self.path) as f:
+                pools = json.load(f)
+        except (OSError, ValueError):
+            return False  # mid-replace or malformed; try again next interval
+        self._mtime = mtime
+        self.registry.replace_config(pools)
+        return True
+
+    def run_forever(self):
+        while not self._stopping.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        self.poll()
+        threading.Thread(target=self.run_forever, name="backend-config-watcher", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+
+
+class AdminAPI:
+    """
+    Membership changes over HTTP:
+
+        GET  /backends                      current snapshot
+        POST /backends/register             {"pool", "url", "name"?}
+        POST /backends/drain                {"pool", "url", "timeout"?}
+        POST /backends/deregister           {"pool", "url"}
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def routes(self):
+        return {
+            ('GET', '/backends'): self.list_backends,
+            ('POST', '/backends/register'): self.register,
+            ('POST', '/backends/drain'): self.drain,
+            ('POST', '/backends/deregister'): self.deregister,
+        }
+
+    async def list_backends(self, request):
+        return 200, self.registry.snapshot().as_dict()
+
+    @staticmethod
+    async def _target(request):
+        payload = await request.json()
+        if not payload.get('pool') or not payload.get('url'):
+            raise ValueError("pool and url are required")
+        return payload
+
+    async def register(self, request):
+        payload = await self._target(request)
+        snapshot = self.registry.register(payload['pool'], payload['url'], payload.get('name'))
+        return 200, {"version": snapshot.version}
+
+    async def drain(self, request):
+        payload = await self._target(request)
+        timeout = payload.get('timeout')
+        snapshot = self.registry.drain(payload['pool'], payload['url'], None if timeout is None else float(timeout))
+        return 200, {"version": snapshot.version}
+
+    async def deregister(self, request):
+        payload = await self._target(request)
+        snapshot = self.registry.deregister(payload['pool'], payload['url'])
+        return 200, {"version": snapshot.version}
+
+
+# Process-wide registry shared by every balancer in the process
+REGISTRY = BackendRegistry()
+MONITOR = status_monitor.StatusMonitor(REGISTRY)
+_watcher = None
+
+
+def start(config_path=DEFAULT_CONFIG_PATH, admin_port=ADMIN_PORT):
+    """Watch the config file and serve the admin API for REGISTRY, once per process"""
+    global _watcher
+    if _watcher is None:
+        _watcher = ConfigWatcher(REGISTRY, config_path).start()
+    if admin_port:
+        # The admin port also serves the routing diagnostics of this process (profiling.DebugAPI)
+        # and the dashboard's backend status snapshot (status_monitor.StatusMonitor)
+        routes = {**AdminAPI(REGISTRY).routes(), **profiling.DebugAPI().routes(),
+                  **MONITOR.routes()}
+        async_http.start_in_thread(routes, 'localhost', admin_port)
+    return REGISTRY
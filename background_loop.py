@@ -0,0 +1,25 @@
+import asyncio
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_loop():
+    """A process-wide asyncio loop running in a daemon thread, started on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="background-loop", daemon=True).start()
+        return _loop
+
+
+def submit(coroutine):
+    """Schedule a coroutine on the background loop and return a concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_loop())
+
+
+def run(coroutine, timeout=None):
+    """Run a coroutine on the background loop and block the calling thread for its result"""
+    return submit(coroutine).result(timeout)
@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import math
+import os
+import time
+from collections import defaultdict
+
+import httpx
+
+import admission
+import async_http
+import backend_registry
+import bulkhead
+import hedging
+import rate_limiter
+import request_trace
+import slow_start
+import warmup
+from database_api import api_url_for
+
+PROXY_PORT = int(os.environ.get('LB_PROXY_PORT', 8610))
+
+# URL prefix -> pool; /database/entries is forwarded to <database backend>/entries
+PREFIXES = {'/database': 'Database', '/web': 'Web', '/file': 'File'}
+
+# Requests one backend of each pool serves at once before the rest queue at the balancer
+PER_BACKEND_CONCURRENCY = {'Database': 8, 'Web': int(os.environ.get('WEB_LOAD_WORKERS', 4)), 'File': 2}
+
+# Per-request deadline in seconds, overridable with an X-Request-Timeout header
+DEFAULT_TIMEOUTS = {'Database': 2.0, 'Web': 10.0, 'File': 30.0}
+
+# Pools whose slow GETs are duplicated to a second backend (see hedging.py), e.g. "Web"
+HEDGE_POOLS = [pool for pool in os.environ.get('LB_HEDGE_POOLS', '').split(',') if pool]
+
+# Only requests that are safe to send twice are hedged
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# Bodies up to this size are read whole; larger ones are relayed chunk by chunk through the pool's bulkhead,
+# so a big upload or download never sits in memory or keeps the shared loop busy copying it
+MAX_BUFFERED_BODY = async_http.READ_CHUNK_SIZE
+
+# Headers that describe one connection and must not be forwarded
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te',
+                      'trailers', 'transfer-encoding', 'upgrade', 'host', 'content-length'}
+
+
+class BalancerProxy:
+    """
+    Forwarding balancer for the three pools.
+
+    Requests under /database, /web and /file go to the pool's backend with the
+    fewest requests in flight, taken from the current registry snapshot. Each
+    request is admitted first: when the pool is saturated it waits in a bounded
+    priority queue, and it is answered 503 with Retry-After as soon as it is
+    clear it cannot be served before its deadline. Within a pool, reads go
+    first and bulk transfers last (see admission.request_class). GETs to a
+    hedged pool that outlast its p95 are also sent to a second backend, and
+    the first answer wins.
+    New and re-added backends ramp up to their share (see slow_start.py).
+    Each pool forwards through its own bulkhead (see bulkhead.py): a separate
+    event loop and connection-limited client, so one overloaded pool cannot
+    hold up the others' requests.
+    Before taking traffic, warm_up() waits for the backends and opens
+    connections to them (see warmup.py).
+    """
+
+    def __init__(self, registry=None, controller=None, limiter=None, hedge_pools=HEDGE_POOLS,
+                 hedge_budget=hedging.HEDGE_BUDGET, slow_start_seconds=slow_start.SLOW_START_SECONDS, trace=None,
+                 bulkhead_connections=None):
+        self.registry = registry or backend_registry.REGISTRY
+        self.admission = controller or admission.AdmissionController(PER_BACKEND_CONCURRENCY)
+        self.limiter = limiter or rate_limiter.RateLimiter()
+        self.hedging = {pool: hedging.HedgePolicy(budget=hedge_budget) for pool in hedge_pools}
+        self.slow_start = {pool: slow_start.SlowStart(slow_start_seconds) for pool in PREFIXES.values()}
+        self.trace = trace  # request_trace.TraceRecorder, or None
+        # Per pool, like the hedging and slow-start state, so each is only touched on its pool's bulkhead loop
+        self.in_flight = {pool: defaultdict(int) for pool in PREFIXES.values()}
+        self.forwarded = 0
+        self.errors = 0
+        self.startup = None  # warm-up report; /proxy/health answers 503 until it is set
+        connections = {**bulkhead.DEFAULT_CONNECTIONS, **(bulkhead_connections or {})}
+        self.bulkheads = {pool: bulkhead.Bulkhead(pool, connections[pool]) for pool in PREFIXES.values()}
+
+    def routes(self):
+        routes = {
+            ('GET', '/proxy/health'): self.health,
+            ('GET', '/proxy/stats'): self.stats,
+        }
+        for prefix in PREFIXES:
+            for method in ('GET', 'POST', 'PUT', 'PATCH', 'DELETE'):
+                routes[(method, prefix + '/*')] = self.forward
+        return routes
+
+    def choose(self, pool, snapshot, exclude=()):
+        """Backend of `pool` with the fewest forwarded requests still running"""
+        ramp = self.slow_start[pool]
+        weights = ramp.weights(snapshot.urls(pool))
+        # Fewest in flight first; a backend still ramping up passes part of its turns to the next
+        ranked = sorted((url for url in snapshot.urls(pool) if url not in exclude),
+                        key=lambda url: self.in_flight[pool][url])
+        return ramp.pick(ranked, weights)
+
+    async def warm_up(self, deadline=warmup.READY_DEADLINE, connections=warmup.WARM_CONNECTIONS):
+        """Wait for the registered backends and leave `connections` open to each in its pool's bulkhead"""
+        async def warm(pool, bulkhead):
+            return await warmup.warm_up(self.registry, bulkhead.client, deadline, connections, pools=(pool,))
+
+        reports = await asyncio.gather(*(bulkhead.call(warm(pool, bulkhead))
+                                         for pool, bulkhead in self.bulkheads.items()))
+        self.startup = warmup.combine(reports)
+        print(f"Balancer proxy warm-up: {warmup.describe(self.startup)}")
+        return self.startup
+
+    async def health(self, request):
+        if self.startup is None:
+            return 503, {"status": "Starting"}, {'Retry-After': '1'}
+        return 200, {"status": "Healthy"}
+
+    async def _pool_stats(self, pool):
+        # Runs on the pool's bulkhead loop, the only thread that changes this state
+        policy = self.hedging.get(pool)
+        return {
+            "in_flight": dict(self.in_flight[pool]),
+            "hedging": policy.stats() if policy else None,
+            "slow_start": self.slow_start[pool].ramping(),
+            "bulkhead": self.bulkheads[pool].stats(),
+        }
+
+    async def stats(self, request):
+        pools = await asyncio.gather(*(bulkhead.call(self._pool_stats(pool))
+                                       for pool, bulkhead in self.bulkheads.items()))
+        pools = dict(zip(self.bulkheads, pools))
+        return 200, {
+            "forwarded": self.forwarded,
+            "errors": self.errors,
+            "in_flight": {url: count for pool in pools.values() for url, count in pool["in_flight"].items()},
+            "admission": self.admission.stats(),
+            "rate_limiter": self.limiter.stats(),
+            "hedging": {pool: stats["hedging"] for pool, stats in pools.items() if pool in self.hedging},
+            "slow_start": {pool: stats["slow_start"] for pool, stats in pools.items()},
+            "trace": self.trace.stats() if self.trace else None,
+            "bulkheads": {pool: stats["bulkhead"] for pool, stats in pools.items()},
+            "startup": self.startup,
+        }
+
+    async def forward(self, request):
+        if self.trace is None:
+            return await self._forward(request)
+        start = time.monotonic()
+        response = await self._forward(request)
+        status = response[0]
+        backend = response[2].get('X-Backend') if len(response) > 2 else None
+        pool = PREFIXES['/' + request.path.split('/')[1]]
+        # Targets are logged without their query string, so the trace's string table stays small
+        self.trace.record(f"{pool} Request", backend, time.monotonic() - start,
+                          request_trace.outcome_for(status, backend), status, f"{request.method} {request.path}",
+                          request.headers.get('x-client-id') or request.client)
+        return response
+
+    async def _forward(self, request):
+        prefix = '/' + request.path.split('/')[1]
+        pool = PREFIXES[prefix]
+        # Clients are told apart by X-Client-Id when a front end sets it, else by address
+        decision = self.limiter.check(request.headers.get('x-client-id') or request.client, f"{pool} Request")
+        if not decision.allowed:
+            return 429, {"error": f"Rate limit exceeded ({decision.scope})"}, \
+                {'Retry-After': str(max(1, math.ceil(decision.retry_after)))}
+        snapshot = self.registry.snapshot()
+        self.admission.set_capacity(pool, len(snapshot.urls(pool)))
+        if not snapshot.urls(pool):
+            return 503, {"error": f"No {pool} backends available"}, {'Retry-After': '5'}
+        timeout = float(request.headers.get('x-request-timeout', DEFAULT_TIMEOUTS[pool]))
+        # Within the pool, reads go ahead of writes and writes ahead of bulk transfers, unless X-Priority says otherwise
+        priority = request.headers.get('x-priority') or admission.request_class(request.method, request.path)
+        try:
+            async with self.admission.admit(pool, timeout, priority) as admitted:
+                return await self._send(pool, request, prefix, admitted.deadline)
+        except admission.Rejected as e:
+            return 503, {"error": e.reason}, {'Retry-After': str(e.retry_after)}
+
+    async def _send(self, pool, request, prefix, deadline):
+        # Pick backends only once admitted, from the newest membership
+        snapshot = self.registry.snapshot()
+        if not snapshot.urls(pool):
+            return 503, {"error": f"No {pool} backends available"}, {'Retry-After': '5'}
+        path = request.target[len(prefix):] or '/'
+        headers = {k: v for k, v in request.headers.items() if k not in HOP_BY_HOP_HEADERS}
+        length = int(request.headers.get('content-length') or 0)
+        if request.chunked or length > MAX_BUFFERED_BODY:
+            # The pool's bulkhead pulls the upload from this loop one chunk at a time as it sends it
+            body = bulkhead.Relay(request.iter_chunks(), asyncio.get_running_loop())
+            if not request.chunked:
+                headers['content-length'] = str(length)  # sent as is rather than re-chunked
+        else:
+            body = await request.read()
+        try:
+            # The exchange runs on the pool's bulkhead; only the pool's own state is touched there
+            (url, response), streamed = await self.bulkheads[pool].open(self._exchange, deadline, pool, snapshot,
+                                                                          request.method, path, headers, body)
+        except httpx.TimeoutException:
+            self.errors += 1
+            return 504, {"error": f"No {pool} backend answered before the deadline"}
+        except httpx.HTTPError as e:
+            self.errors += 1
+            return 502, {"error": f"{pool} backend failed: {e}"}
+        self.forwarded += 1
+        # httpx has already decoded the body, so its original encoding no longer applies
+        response_headers = {k: v for k, v in response.headers.items()
+                            if k.lower() not in HOP_BY_HOP_HEADERS and k.lower() != 'content-encoding'}
+        response_headers['X-Backend'] = url
+        return response.status_code, response.content if streamed is None else streamed, response_headers
+
+    async def _exchange(self, client, deadline, pool, snapshot, method, path, headers, body):
+        """
+        Send the request to the chosen backend (hedged if the pool is) and return ((url, response), response)
+        while a large body is still to be relayed, or ((url, response), None) once a small one has been read.
+        """
+        async def send(url):
+            base = api_url_for(url) if pool == 'Database' else url
+            self.in_flight[pool][url] += 1
+            start = time.monotonic()
+            try:
+                outgoing = client.build_request(method, base + path, headers=headers, content=body,
+                                                timeout=max(deadline - time.monotonic(), 0.001))
+                response = await client.send(outgoing, stream=True)
+            finally:
+                self.in_flight[pool][url] -= 1
+            # Ramps pause while the backend answers much slower than its peers
+            self.slow_start[pool].record(url, (time.monotonic() - start) * 1000)
+            return response
+
+        # A relayed upload can only be sent once
+        policy = self.hedging.get(pool) if method in IDEMPOTENT_METHODS and isinstance(body, bytes) else None
+        if policy is None:
+            url = self.choose(pool, snapshot)
+            response = await send(url)
+        else:
+            url, response = await hedging.hedged(policy, send, lambda exclude: self.choose(pool, snapshot, exclude),
+                                                 discard=lambda response: response.aclose())
+        length = response.headers.get('content-length', '')
+        if method == 'HEAD' or response.status_code in (204, 304) or \
+                (length.isdigit() and int(length) <= MAX_BUFFERED_BODY):
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+            return (url, response), None
+        return (url, response), response
+
+
+def start_in_background(port=PROXY_PORT, host='localhost'):
+    """Start the proxy once per process (safe on every Streamlit rerun)"""
+    proxy = BalancerProxy(trace=request_trace.recorder_from_env('proxy'))
+    return async_http.start_in_thread(proxy.routes(), host, port, on_start=[proxy.warm_up])
+
+
+async def serve(port, host='localhost', hedge_pools=HEDGE_POOLS, hedge_budget=hedging.HEDGE_BUDGET,
+                slow_start_seconds=slow_start.SLOW_START_SECONDS, ready_deadline=warmup.READY_DEADLINE,
+                warm_connections=warmup.WARM_CONNECTIONS):
+    proxy = BalancerProxy(hedge_pools=hedge_pools, hedge_budget=hedge_budget, slow_start_seconds=slow_start_seconds,
+                          trace=request_trace.recorder_from_env('proxy'))
+    # Listen only once the backends are up and connected, so the first requests are not cold
+    await proxy.warm_up(ready_deadline, warm_connections)
+    server = await async_http.start_server(proxy.routes(), host, port)
+    print(f"Balancer proxy started on port {port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Forwarding load balancer with admission control")
+    parser.add_argument('port', type=int, nargs='?', default=PROXY_PORT)
+    parser.add_argument('--config', default=backend_registry.DEFAULT_CONFIG_PATH,
+                        help="Pools file to follow (the supervisor's backends.json)")
+    parser.add_argument('--hedge', action='append', choices=list(PREFIXES.values()), default=list(HEDGE_POOLS),
+                        help="Hedge slow GETs to this pool (repeatable)")
+    parser.add_argument('--hedge-budget', type=float, default=hedging.HEDGE_BUDGET,
+                        help="Extra requests allowed for hedging, as a fraction of requests")
+    parser.add_argument('--slow-start', type=float, default=slow_start.SLOW_START_SECONDS,
+                        help="Seconds for a new or re-added backend to ramp up to its full share (0 to disable)")
+    parser.add_argument('--ready-deadline', type=float, default=warmup.READY_DEADLINE,
+                        help="Seconds to wait for the backends at startup before taking traffic anyway")
+    parser.add_argument('--warm-connections', type=int, default=warmup.WARM_CONNECTIONS,
+                        help="Keep-alive connections opened to each backend at startup")
+    args = parser.parse_args()
+    backend_registry.start(args.config, admin_port=None)
+    asyncio.run(serve(args.port, hedge_pools=args.hedge, hedge_budget=args.hedge_budget,
+                      slow_start_seconds=args.slow_start, ready_deadline=args.ready_deadline,
+                      warm_connections=args.warm_connections))
@@ -0,0 +1,233 @@
+"""
+Offline comparison of the balancing strategies.
+
+Runs the real routing code (LoadBalancer and LoadBalancerLeastConnections,
+with the backend registry and slow start they use) against synthetic Poisson
+arrivals or a recorded arrival trace, and models each backend's queues
+instead of live servers. Requests that finish before an arrival are taken
+off the balancer's server_load before it routes that arrival, so Least
+Connections sees the requests each backend is still serving. Every strategy
+sees the same arrivals and service times, so differences come from routing
+alone:
+
+    python balancer_simulator.py
+    python balancer_simulator.py --requests 2000000 --utilization 0.8 --speeds 1,1,0.5
+    python balancer_simulator.py --arrivals trace.csv --web-model lognormal:median=0.3,sigma=1.0
+
+A trace has one request per line: arrival time in seconds, then optionally
+the pool ("Web" or "Database"; Web if omitted).
+"""
+import argparse
+import heapq
+import random
+import time
+from datetime import datetime
+
+import numpy as np
+
+import backend_registry
+import load_model
+from load_balancer_least_connections import LoadBalancerLeastConnections
+from load_balancer_round_robin import LoadBalancer
+
+STRATEGIES = {"Round Robin": LoadBalancer, "Least Connections": LoadBalancerLeastConnections}
+
+# Pools the dashboard routes itself (File requests go straight to the file balancer)
+REQUEST_TYPES = {"Web": "Web Request", "Database": "Database Request"}
+
+# Defaults follow the live services: web pages take 0.1-2 s on WEB_LOAD_WORKERS workers
+DEFAULT_MODELS = {"Web": "uniform:low=0.1,high=2.0", "Database": "exponential:mean=0.01"}
+DEFAULT_WORKERS = {"Web": 4, "Database": 8}
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def service_times(model, rng, count):
+    """`count` samples of a load_model model as a NumPy array"""
+    if isinstance(model, load_model.UniformModel):
+        return rng.uniform(model.low, model.high, count)
+    if isinstance(model, load_model.ConstantModel):
+        return np.full(count, model.seconds)
+    if isinstance(model, load_model.ExponentialModel):
+        return rng.exponential(model.mean, count)
+    if isinstance(model, load_model.LogNormalModel):
+        return rng.lognormal(model.mu, model.sigma, count)
+    if isinstance(model, load_model.BimodalModel):
+        pauses = (rng.random(count) < model.pause_probability) * model.pause * rng.uniform(0.5, 1.5, count)
+        return rng.exponential(model.fast_mean, count) + pauses
+    # Any other model (e.g. a recorded trace) is sampled one value at a time
+    python_rng = random.Random(int(rng.integers(1 << 32)))
+    return np.fromiter((model.sample(python_rng) for _ in range(count)), float, count)
+
+
+def read_arrivals(path):
+    """(times, pools) from a trace file of "seconds[,pool]" lines, sorted by time"""
+    times, pools = [], []
+    with open(path) as f:
+        for line in f:
+            fields = [field.strip() for field in line.split(',')]
+            if not fields[0]:
+                continue
+            times.append(float(fields[0]))
+            pools.append(fields[1] if len(fields) > 1 and fields[1] else "Web")
+    order = np.argsort(times, kind='stable')
+    return np.asarray(times)[order], np.asarray(pools, dtype=object)[order]
+
+
+def poisson_arrivals(rates, count, rng):
+    """(times, pools) for `count` requests split across pools in proportion to `rates`"""
+    names = list(rates)
+    total = sum(rates.values())
+    times = np.cumsum(rng.exponential(1 / total, count))
+    pools = np.asarray(names, dtype=object)[rng.choice(len(names), count, p=[rates[n] / total for n in names])]
+    return times, pools
+
+
+class SimulatedPool:
+    """
+    Queues of one pool's backends, advanced one request at a time.
+
+    A backend with `workers` workers is modelled as that many FIFO lanes that
+    take its requests in turn; a lane's departures follow the Lindley
+    recursion D[i] = max(A[i], D[i-1]) + S[i]. A shared queue would start a
+    request on whichever worker frees first, so the lanes slightly overstate
+    waiting. Plain lists rather than arrays: per-request NumPy scalars cost
+    more than they save.
+    """
+
+    def __init__(self, urls, workers, speeds):
+        self.urls = list(urls)
+        self.workers = workers
+        self.speeds = [speeds[i % len(speeds)] for i in range(len(self.urls))]
+        self.free_at = [[0.0] * workers for _ in self.urls]  # last departure per lane
+        self.assigned = [0] * len(self.urls)
+        self.busy = [0.0] * len(self.urls)
+
+    def serve(self, backend, arrival, service):
+        """Departure time of a request arriving at `arrival` at `backend` (an index into urls)"""
+        service /= self.speeds[backend]
+        lanes = self.free_at[backend]
+        lane = self.assigned[backend] % self.workers
+        self.assigned[backend] += 1
+        self.busy[backend] += service
+        lanes[lane] = max(arrival, lanes[lane]) + service
+        return lanes[lane]
+
+
+def simulated(strategy):
+    """The strategy class with its network health checks replaced by healthy results"""
+    class Simulated(strategy):
+        def check_health(self, url):
+            self.instance_health[url] = {'healthy': True, 'last_check': datetime.now(), 'latency': 0.0}
+            return True
+
+    Simulated.__name__ = f"Simulated{strategy.__name__}"
+    return Simulated
+
+
+def simulate(strategy, times, pools, services, backends, workers, speeds):
+    """Route every request with `strategy` and return per-pool results"""
+    urls = {pool: [f"http://sim-{pool.lower()}-{i + 1}" for i in range(backends)] for pool in REQUEST_TYPES}
+    balancer = simulated(strategy)()
+    balancer.registry = backend_registry.BackendRegistry(
+        {pool: urls.get(pool, []) for pool in ("Database", "Web", "File")})
+    queues = {pool: SimulatedPool(urls[pool], workers[pool], speeds) for pool in REQUEST_TYPES}
+    index = {url: i for pool in REQUEST_TYPES for i, url in enumerate(urls[pool])}
+    latencies = {pool: [] for pool in REQUEST_TYPES}
+    failed = 0
+    in_service = []  # heap of (departure, pool, url) for requests not finished yet
+
+    started = time.perf_counter()
+    get_next_instance = balancer.get_next_instance
+    server_load = balancer.server_load
+    for arrival, pool, service in zip(times.tolist(), pools.tolist(), services.tolist()):
+        # Everything that finished before this arrival leaves its backend first
+        while in_service and in_service[0][0] <= arrival:
+            _, done_pool, done_url = heapq.heappop(in_service)
+            server_load[done_pool][done_url] -= 1
+        # Routing is the strategy's own Python code, one decision per request
+        url = get_next_instance(REQUEST_TYPES[pool])
+        backend = index.get(url, -1)
+        if backend < 0:
+            failed += 1
+            continue
+        departure = queues[pool].serve(backend, arrival, service)
+        latencies[pool].append(departure - arrival)
+        heapq.heappush(in_service, (departure, pool, url))
+    elapsed = time.perf_counter() - started
+
+    # Utilization is measured until the last request finishes, so an overloaded backend reads 100%
+    span = max([times[-1]] + [max(map(max, queue.free_at)) for queue in queues.values()]) - times[0]
+    results = {}
+    for pool, queue in queues.items():
+        if not latencies[pool]:
+            continue
+        values = np.asarray(latencies[pool]) * 1000
+        utilization = np.asarray(queue.busy) / (queue.workers * span)
+        assigned = np.asarray(queue.assigned)
+        shares = assigned / max(assigned.sum(), 1)
+        results[pool] = {
+            "requests": int(assigned.sum()),
+            "percentiles": dict(zip(PERCENTILES, np.percentile(values, PERCENTILES))),
+            "utilization": utilization,
+            # Busiest backend's share of requests relative to an even split (1.0 is perfect balance)
+            "imbalance": float(shares.max() * len(shares)),
+        }
+    return results, failed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare balancing strategies offline")
+    parser.add_argument('--strategies', nargs='+', choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument('--requests', type=int, default=1_000_000, help="Synthetic requests to simulate")
+    parser.add_argument('--arrivals', help="Recorded arrival trace instead of Poisson arrivals")
+    parser.add_argument('--utilization', type=float, default=0.7,
+                        help="Offered load per pool as a fraction of its capacity (synthetic arrivals)")
+    parser.add_argument('--backends', type=int, default=3, help="Backends per pool")
+    parser.add_argument('--speeds', default="1",
+                        help="Relative backend speeds, cycled over each pool's backends, e.g. 1,1,0.5")
+    parser.add_argument('--web-model', default=DEFAULT_MODELS["Web"], help="load_model spec for web requests")
+    parser.add_argument('--database-model', default=DEFAULT_MODELS["Database"])
+    parser.add_argument('--web-workers', type=int, default=DEFAULT_WORKERS["Web"])
+    parser.add_argument('--database-workers', type=int, default=DEFAULT_WORKERS["Database"])
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    models = {"Web": load_model.parse_model_spec(args.web_model),
+              "Database": load_model.parse_model_spec(args.database_model)}
+    workers = {"Web": args.web_workers, "Database": args.database_workers}
+    speeds = [float(speed) for speed in args.speeds.split(',')]
+
+    if args.arrivals:
+        times, pools = read_arrivals(args.arrivals)
+    else:
+        # Each pool is offered the same fraction of what its backends can serve
+        rates = {}
+        for pool, model in models.items():
+            mean = service_times(model, np.random.default_rng(args.seed), 100_000).mean()
+            capacity = sum(speeds[i % len(speeds)] for i in range(args.backends)) * workers[pool] / mean
+            rates[pool] = args.utilization * capacity
+        times, pools = poisson_arrivals(rates, args.requests, rng)
+    services = np.empty(len(times))
+    for pool, model in models.items():
+        mask = pools == pool
+        services[mask] = service_times(model, rng, int(mask.sum()))
+
+    print(f"{len(times):,} requests over {times[-1] - times[0]:,.0f} simulated seconds, "
+          f"{args.backends} backends per pool, speeds {args.speeds}")
+    print(f"{'strategy':>18} {'pool':>9} " + " ".join(f"{f'p{p:g} ms':>9}" for p in PERCENTILES)
+          + f" {'utilization':>20} {'imbalance':>9}")
+    for name in args.strategies:
+        results, failed, elapsed = simulate(STRATEGIES[name], times, pools, services,
+                                            args.backends, workers, speeds)
+        for pool, r in results.items():
+            utilization = "/".join(f"{u:.0%}" for u in r["utilization"])
+            print(f"{name:>18} {pool:>9} " + " ".join(f"{v:9.0f}" for v in r["percentiles"].values())
+                  + f" {utilization:>20} {r['imbalance']:9.2f}")
+        print(f"{'':>18} {'':>9} {len(times) / elapsed:,.0f} requests/s simulated"
+              + (f", {failed:,} not routed" if failed else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import asyncio
+import queue
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import background_loop
+import dns_cache
+import web_client
+
+DEFAULT_GLOBAL_CONCURRENCY = 100
+DEFAULT_PER_HOST_CONCURRENCY = 6
+# While a batch runs the page shows only this many of the latest rows, so each redraw costs the
+# same however long the batch is; the full table is rendered once at the end
+LIVE_ROWS = 200
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
+}
+
+
+def parse_urls(text):
+    """One URL per line (CSV rows use their first column); scheme defaults to http://"""
+    urls = []
+    for line in text.splitlines():
+        url = line.split(',')[0].strip()
+        if not url or url.startswith('#'):
+            continue
+        if not url.startswith(('http://', 'https://')):
+            url = 'http://' + url
+        urls.append(url)
+    return urls
+
+
+async def probe(url):
+    """Fetch one URL and describe the outcome as a table row"""
+    row = {'url': url, 'status': None, 'protocol': None, 'ip_address': None,
+           'dns_ms': None, 'latency_ms': None, 'error': None}
+    start = time.perf_counter()
+    try:
+        host = urlparse(url).hostname
+        addresses, _ = await dns_cache.RESOLVER.lookup(host)
+        row['ip_address'] = addresses[0]
+        row['dns_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        response = await web_client.get_async_client().get(url, headers=HEADERS, follow_redirects=True)
+        row['status'] = response.status_code
+        row['protocol'] = response.http_version
+    except Exception as e:
+        row['error'] = str(e) or type(e).__name__
+    row['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return row
+
+
+class BatchRun:
+    """
+    Probes many URLs concurrently on the background loop.
+
+    At most `global_limit` requests are in flight overall and `per_host_limit`
+    per host. Rows land in `results` (a thread-safe queue) as they complete, so
+    the Streamlit thread can render progress while the batch is still running.
+    """
+
+    def __init__(self, urls, global_limit=DEFAULT_GLOBAL_CONCURRENCY,
+                 per_host_limit=DEFAULT_PER_HOST_CONCURRENCY):
+        self.urls = urls
+        self.global_limit = global_limit
+        self.per_host_limit = per_host_limit
+        self.results = queue.Queue()
+        self.completed = 0
+        self.started = time.perf_counter()
+        self.future = background_loop.submit(self._run())
+
+    async def _run(self):
+        global_slots = asyncio.Semaphore(self.global_limit)
+        host_slots = defaultdict(lambda: asyncio.Semaphore(self.per_host_limit))
+
+        async def bounded(url):
+            async with host_slots[urlparse(url).hostname], global_slots:
+                row = await probe(url)
+            self.completed += 1
+            self.results.put(row)
+
+        await asyncio.gather(*(bounded(url) for url in self.urls))
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    def drain(self, timeout=0.25):
+        """Rows finished since the last call, waiting up to `timeout` for the first one"""
+        rows = []
+        try:
+            rows.append(self.results.get(timeout=timeout))
+            while True:
+                rows.append(self.results.get_nowait())
+        except queue.Empty:
+            pass
+        return rows
+
+    def throughput(self):
+        elapsed = time.perf_counter() - self.started
+        return self.completed / elapsed if elapsed else 0.0
@@ -0,0 +1,114 @@
+"""
+Goodput under overload with and without admission control.
+
+Drives an in-process backend (a fixed number of workers with simulated
+service times, like load_model.LoadSimulator) with open-loop Poisson
+arrivals at a multiple of its capacity, in real time. Clients give up at
+their deadline but, as with a real server, work already handed to the
+backend still runs. Goodput counts requests answered before their deadline:
+
+    python -m benchmarks.admission_overload
+    python -m benchmarks.admission_overload --load 3 --deadline 0.5
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import admission
+import load_model
+from latency_histogram import LatencyHistogram
+
+
+class Backend:
+    def __init__(self, workers, model, rng):
+        self.workers = asyncio.Semaphore(workers)
+        self.model = model
+        self.rng = rng
+
+    async def serve(self):
+        async with self.workers:
+            await asyncio.sleep(self.model.sample(self.rng))
+
+
+async def run(args, use_admission):
+    rng = random.Random(args.seed)
+    model = load_model.parse_model_spec(args.model)
+    backend = Backend(args.workers, model, rng)
+    controller = admission.AdmissionController({'Web': args.workers}, queue_size=args.queue_size)
+    controller.set_capacity('Web', 1)
+    capacity = args.workers / args.mean_service
+    rate = args.load * capacity
+    results = {'good': 0, 'late': 0, 'rejected': 0}
+    latencies = LatencyHistogram()
+    work = set()
+
+    async def client():
+        start = time.monotonic()
+        try:
+            if use_admission:
+                async with controller.admit('Web', timeout=args.deadline):
+                    await backend.serve()
+            else:
+                # The backend keeps working on a request after its client gives up
+                task = asyncio.ensure_future(backend.serve())
+                work.add(task)
+                task.add_done_callback(work.discard)
+                await asyncio.wait_for(asyncio.shield(task), args.deadline)
+        except admission.Rejected:
+            results['rejected'] += 1
+            return
+        except asyncio.TimeoutError:
+            results['late'] += 1
+            return
+        elapsed = time.monotonic() - start
+        if elapsed <= args.deadline:
+            results['good'] += 1
+            latencies.record(elapsed * 1000)
+        else:
+            results['late'] += 1
+
+    clients = []
+    started = time.monotonic()
+    next_arrival = started
+    while next_arrival < started + args.duration:
+        await asyncio.sleep(max(0.0, next_arrival - time.monotonic()))
+        clients.append(asyncio.ensure_future(client()))
+        next_arrival += rng.expovariate(rate)
+    await asyncio.gather(*clients)
+    for task in list(work):
+        task.cancel()
+    offered = len(clients)
+    return {
+        'offered_rps': offered / args.duration,
+        'goodput_rps': results['good'] / args.duration,
+        'capacity_rps': capacity,
+        'late': results['late'],
+        'rejected': results['rejected'],
+        'p50': latencies.percentile(50),
+        'p99': latencies.percentile(99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Goodput under overload with and without admission control")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--mean-service', type=float, default=0.02, help="Mean service time in seconds")
+    parser.add_argument('--load', type=float, default=2.0, help="Offered load as a multiple of capacity")
+    parser.add_argument('--deadline', type=float, default=0.25, help="Client timeout in seconds")
+    parser.add_argument('--queue-size', type=int, default=admission.DEFAULT_QUEUE_SIZE)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    args.model = f"exponential:mean={args.mean_service}"
+
+    print(f"{'':>16} {'offered/s':>10} {'goodput/s':>10} {'capacity/s':>10} {'late':>7} {'rejected':>8} "
+          f"{'p50 ms':>7} {'p99 ms':>7}")
+    for name, use_admission in (('no admission', False), ('admission', True)):
+        r = asyncio.run(run(args, use_admission))
+        print(f"{name:>16} {r['offered_rps']:10.0f} {r['goodput_rps']:10.0f} {r['capacity_rps']:10.0f} "
+              f"{r['late']:7d} {r['rejected']:8d} {r['p50']:7.1f} {r['p99']:7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Autoscaler under a traffic step, in simulated time.
+
+Runs the real Autoscaler and ScalingPolicy against a discrete-event model of
+the web pool (each instance has a fixed number of workers and a FIFO queue,
+new instances take a while to boot) and prints per-interval latency for a
+fixed pool and an autoscaled one:
+
+    python -m benchmarks.autoscaler_step
+    python -m benchmarks.autoscaler_step --base-rps 4 --step-rps 20 --model lognormal:median=0.5
+"""
+import argparse
+import heapq
+import itertools
+import random
+from collections import deque
+
+import autoscaler
+import load_model
+from latency_histogram import LatencyHistogram
+
+
+class SimInstance:
+    def __init__(self, number, ready_at):
+        self.number = number
+        self.state = 'starting'
+        self.ready_at = ready_at
+        self.busy = 0
+        self.queue = deque()  # arrival times of requests waiting for a worker
+
+    @property
+    def outstanding(self):
+        return self.busy + len(self.queue)
+
+
+class SimCluster:
+    """Simulated web pool with the Supervisor's instances/spawn/retire interface"""
+
+    def __init__(self, initial, workers, boot_seconds, model, seed):
+        self.workers = workers
+        self.boot_seconds = boot_seconds
+        self.model = model
+        self.rng = random.Random(seed)
+        self.now = 0.0
+        self.instances = {'web': []}
+        self.events = []
+        self._sequence = itertools.count()
+        self.window = LatencyHistogram()  # since the last autoscaler sample
+        self.report = LatencyHistogram()  # since the last printed row
+        for instance in self.spawn('web', initial):
+            instance.state = 'ready'
+
+    def schedule(self, at, kind, data=None):
+        heapq.heappush(self.events, (at, next(self._sequence), kind, data))
+
+    def spawn(self, tier, count=1):
+        pool = self.instances[tier]
+        created = []
+        for _ in range(count):
+            instance = SimInstance(max((i.number for i in pool), default=0) + 1, self.now + self.boot_seconds)
+            pool.append(instance)
+            created.append(instance)
+            self.schedule(instance.ready_at, 'ready', instance)
+        return created
+
+    def retire(self, tier):
+        pool = self.instances[tier]
+        instance = max(pool, key=lambda i: i.number)
+        pool.remove(instance)
+        instance.state = 'stopped'
+        # Waiting requests move to the remaining instances; running ones finish
+        waiting = list(instance.queue)
+        instance.queue.clear()
+        for arrived in waiting:
+            self.dispatch(arrived)
+        return instance
+
+    def ready(self):
+        return [i for i in self.instances['web'] if i.state == 'ready']
+
+    def dispatch(self, arrived):
+        instance = min(self.ready(), key=lambda i: i.outstanding)
+        if instance.busy < self.workers:
+            self._start(instance, arrived)
+        else:
+            instance.queue.append(arrived)
+
+    def _start(self, instance, arrived):
+        instance.busy += 1
+        self.schedule(self.now + self.model.sample(self.rng), 'done', (instance, arrived))
+
+    def complete(self, instance, arrived):
+        instance.busy -= 1
+        latency_ms = (self.now - arrived) * 1000
+        self.window.record(latency_ms)
+        self.report.record(latency_ms)
+        if instance.queue:
+            self._start(instance, instance.queue.popleft())
+
+
+class SimSource:
+    """Autoscaler source reading the simulated instances directly"""
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+
+    def sample(self, instances):
+        window, self.cluster.window = self.cluster.window, LatencyHistogram()
+        return autoscaler.PoolSample(
+            instances=len(instances),
+            in_flight=sum(i.outstanding for i in instances),
+            queue_depth=sum(len(i.queue) for i in instances),
+            p99_ms=window.percentile(99),
+        )
+
+
+def run(args, autoscale):
+    cluster = SimCluster(args.initial, args.workers, args.boot, load_model.parse_model_spec(args.model), args.seed)
+    policy = autoscaler.default_policies(args.max_instances)['web']
+    scaler = autoscaler.Autoscaler(cluster, {'web': policy}, {'web': SimSource(cluster)},
+                                   interval=autoscaler.DEFAULT_INTERVAL, clock=lambda: cluster.now)
+    step_end = args.step_at + args.step_for
+
+    def rate(t):
+        return args.step_rps if args.step_at <= t < step_end else args.base_rps
+
+    cluster.schedule(0.0, 'arrival')
+    if autoscale:
+        cluster.schedule(scaler.interval, 'tick')
+    cluster.schedule(args.report_every, 'report')
+    rows = []
+    while cluster.events:
+        cluster.now, _, kind, data = heapq.heappop(cluster.events)
+        if cluster.now > args.duration:
+            break
+        if kind == 'arrival':
+            cluster.dispatch(cluster.now)
+            cluster.schedule(cluster.now + cluster.rng.expovariate(rate(cluster.now)), 'arrival')
+        elif kind == 'done':
+            cluster.complete(*data)
+        elif kind == 'ready':
+            if data.state == 'starting':
+                data.state = 'ready'
+        elif kind == 'tick':
+            scaler.tick()
+            cluster.schedule(cluster.now + scaler.interval, 'tick')
+        elif kind == 'report':
+            ready = cluster.ready()
+            rows.append((cluster.now, rate(cluster.now - 1e-9), len(ready), sum(len(i.queue) for i in ready),
+                         cluster.report.percentile(50), cluster.report.percentile(99)))
+            cluster.report = LatencyHistogram()
+            cluster.schedule(cluster.now + args.report_every, 'report')
+    return rows, scaler.events if autoscale else []
+
+
+def recovery_seconds(rows, args, threshold_ms):
+    """Seconds from the step until p99 first falls back under the threshold during the step"""
+    for t, _, _, _, _, p99 in rows:
+        if args.step_at < t <= args.step_at + args.step_for and p99 <= threshold_ms:
+            return t - args.step_at
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the autoscaler under a traffic step")
+    parser.add_argument('--model', default='uniform', help="Service time model, as WEB_LOAD_MODEL")
+    parser.add_argument('--workers', type=int, default=4, help="Workers per instance")
+    parser.add_argument('--initial', type=int, default=2, help="Instances at the start")
+    parser.add_argument('--max-instances', type=int, default=10)
+    parser.add_argument('--boot', type=float, default=5.0, help="Seconds a new instance takes to turn ready")
+    parser.add_argument('--base-rps', type=float, default=5.0)
+    parser.add_argument('--step-rps', type=float, default=15.0)
+    parser.add_argument('--step-at', type=float, default=60.0)
+    parser.add_argument('--step-for', type=float, default=180.0)
+    parser.add_argument('--duration', type=float, default=420.0)
+    parser.add_argument('--report-every', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    threshold_ms = autoscaler.default_policies()['web'].p99_high_ms
+    fixed, _ = run(args, autoscale=False)
+    scaled, events = run(args, autoscale=True)
+
+    print(f"{'t (s)':>6} {'rps':>5} | {'fixed: ready':>12} {'queue':>6} {'p50 ms':>8} {'p99 ms':>8} | "
+          f"{'scaled: ready':>13} {'queue':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for (t, rps, n1, q1, p50_1, p99_1), (_, _, n2, q2, p50_2, p99_2) in zip(fixed, scaled):
+        print(f"{t:6.0f} {rps:5.1f} | {n1:12d} {q1:6d} {p50_1:8.0f} {p99_1:8.0f} | "
+              f"{n2:13d} {q2:6d} {p50_2:8.0f} {p99_2:8.0f}")
+    print()
+    for event in events:
+        print(f"  t={event.time:6.1f}s {event.action:>4} to {event.instances} ({event.reason})")
+    print()
+    for name, rows in (('fixed', fixed), ('autoscaled', scaled)):
+        recovered = recovery_seconds(rows, args, threshold_ms)
+        during = [p99 for t, *_, p99 in rows if args.step_at + args.step_for - 60 < t <= args.step_at + args.step_for]
+        print(f"{name:>10}: p99 over the last 60 s of the step {max(during, default=0):8.0f} ms, "
+              f"back under {threshold_ms:.0f} ms " +
+              (f"{recovered:.0f} s after the step" if recovered is not None else "never during the step"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Tail latency with and without request hedging.
+
+Sends open-loop Poisson traffic through hedging.hedged() to in-process
+backends (a fixed number of workers each, service times from load_model), in
+real time with service times scaled down by --time-scale; latencies are
+reported at full scale. A cancelled loser keeps running on its backend, as a
+real server would, so "extra load" is the work the hedges actually added:
+
+    python -m benchmarks.hedging_tail
+    python -m benchmarks.hedging_tail --models bimodal --budget 0.1 --utilization 0.6
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import hedging
+import load_model
+from latency_histogram import LatencyHistogram
+
+DEFAULT_MODELS = ("uniform:low=0.1,high=2.0", "bimodal", "lognormal:median=0.3,sigma=1.0")
+
+
+class Backend:
+    def __init__(self, name, workers, model, rng, scale):
+        self.name = name
+        self.workers = asyncio.Semaphore(workers)
+        self.model = model
+        self.rng = rng
+        self.scale = scale
+        self.in_flight = 0
+        self.started = 0
+
+    async def _serve(self):
+        self.in_flight += 1
+        try:
+            async with self.workers:
+                await asyncio.sleep(self.model.sample(self.rng) * self.scale)
+        finally:
+            self.in_flight -= 1
+
+    async def send(self):
+        self.started += 1
+        # The backend does not notice the client going away, so the work runs to the end
+        await asyncio.shield(asyncio.ensure_future(self._serve()))
+
+
+async def run(args, model_spec, hedge):
+    rng = random.Random(args.seed)
+    model = load_model.parse_model_spec(model_spec)
+    backends = {f"backend-{i}": Backend(f"backend-{i}", args.workers, model, rng, args.time_scale)
+                for i in range(args.backends)}
+    # The policy works on the scaled latencies it observes, like the proxy would
+    policy = hedging.HedgePolicy(budget=args.budget) if hedge else None
+    latencies = LatencyHistogram()
+
+    def choose(exclude):
+        candidates = [name for name in backends if name not in exclude]
+        return min(candidates, key=lambda name: backends[name].in_flight) if candidates else None
+
+    async def send(name):
+        await backends[name].send()
+
+    async def client():
+        start = time.monotonic()
+        if policy is None:
+            await send(choose(()))
+        else:
+            await hedging.hedged(policy, send, choose)
+        latencies.record((time.monotonic() - start) / args.time_scale * 1000)
+
+    mean_service = sum(model.sample(random.Random(i)) for i in range(2000)) / 2000
+    capacity = args.backends * args.workers / (mean_service * args.time_scale)
+    rate = args.utilization * capacity
+    clients = []
+    next_arrival = time.monotonic()
+    for _ in range(args.requests):
+        await asyncio.sleep(max(0.0, next_arrival - time.monotonic()))
+        clients.append(asyncio.ensure_future(client()))
+        next_arrival += rng.expovariate(rate)
+    await asyncio.gather(*clients)
+    # Let abandoned losers finish so their work is counted
+    while any(backend.in_flight for backend in backends.values()):
+        await asyncio.sleep(0.01)
+    started = sum(backend.started for backend in backends.values())
+    return {
+        'p50': latencies.percentile(50),
+        'p99': latencies.percentile(99),
+        'p999': latencies.percentile(99.9),
+        'extra_load': started / args.requests - 1,
+        'hedged': policy.hedged if policy else 0,
+        'wins': policy.hedge_wins if policy else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail latency with and without request hedging")
+    parser.add_argument('--models', nargs='+', default=list(DEFAULT_MODELS), help="load_model specs")
+    parser.add_argument('--backends', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4, help="Workers per backend")
+    parser.add_argument('--utilization', type=float, default=0.5, help="Offered load as a fraction of capacity")
+    parser.add_argument('--budget', type=float, default=hedging.HEDGE_BUDGET)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--time-scale', type=float, default=0.02, help="Service times are multiplied by this")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'model':>34} {'':>9} {'p50 ms':>8} {'p99 ms':>8} {'p99.9 ms':>9} {'extra load':>10} "
+          f"{'hedged':>7} {'won':>5}")
+    for spec in args.models:
+        for name, hedge in (('no hedge', False), ('hedge', True)):
+            r = asyncio.run(run(args, spec, hedge))
+            print(f"{spec:>34} {name:>9} {r['p50']:8.0f} {r['p99']:8.0f} {r['p999']:9.0f} "
+                  f"{r['extra_load']:10.1%} {r['hedged']:7d} {r['wins']:5d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Rate limiter checks per second and memory per tracked client.
+
+    python -m benchmarks.rate_limiter_checks
+    python -m benchmarks.rate_limiter_checks --clients 1000000 --max-entries 250000
+"""
+import argparse
+import time
+import tracemalloc
+
+import rate_limiter
+
+REQUEST_TYPES = list(rate_limiter.REQUEST_TYPE_LIMITS)
+
+
+def checks_per_second(limiter, keys, checks):
+    types = REQUEST_TYPES
+    count = len(keys)
+    start = time.perf_counter()
+    for i in range(checks):
+        limiter.check(keys[i % count], types[i % 3])
+    return checks / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark of the token-bucket rate limiter")
+    parser.add_argument('--clients', type=int, default=300_000, help="Distinct clients in the large run")
+    parser.add_argument('--max-entries', type=int, default=rate_limiter.DEFAULT_MAX_ENTRIES)
+    parser.add_argument('--checks', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    for label, clients in (("1 client", 1), ("1k clients", 1000), (f"{args.clients:,} clients", args.clients)):
+        keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(clients)]
+        limiter = rate_limiter.RateLimiter(max_entries=args.max_entries)
+        rate = checks_per_second(limiter, keys, max(args.checks, clients))
+        stats = limiter.stats()
+
+        # Memory is measured on a second, traced run (tracing slows the checks down)
+        tracemalloc.start()
+        traced = rate_limiter.RateLimiter(max_entries=args.max_entries)
+        checks_per_second(traced, keys, max(args.checks, clients))
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        entries = len(traced.clients) + sum(len(t) for t in traced.types.values())
+        print(f"{label:>18}: {rate:12,.0f} checks/s | {entries:9,} buckets "
+              f"{memory / 2**20:7.1f} MiB ({memory / max(entries, 1):5.0f} B/bucket, keys excluded) | "
+              f"{stats['limited']:,} limited, {stats['evictions']:,} evicted")
+
+    # Churn past the table bound: memory must stay flat while old clients are evicted
+    keys = [f"client-{i}" for i in range(args.max_entries * 2)]
+    limiter = rate_limiter.RateLimiter(max_entries=args.max_entries)
+    rate = checks_per_second(limiter, keys, len(keys))
+    print(f"{'churn 2x bound':>18}: {rate:12,.0f} checks/s | {len(limiter.clients):9,} clients kept "
+          f"(bound {args.max_entries:,}), {limiter.stats()['evictions']:,} evicted")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Cost of request_trace.TraceRecorder.record() on the request path.
+
+Records decisions at a steady rate with the background writer running, and
+reports the time per record() call over an empty call with the same
+arguments, then reads the trace back through the memory map:
+
+    python -m benchmarks.trace_overhead
+    python -m benchmarks.trace_overhead --rate 50000 --seconds 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import request_trace
+
+BACKENDS = [f"http://localhost:{8511 + i}" for i in range(6)]
+TYPES = ["Web Request", "Database Request", "File Request"]
+
+
+def call_cost(function, count):
+    """Seconds per call, measured in bursts of `count`"""
+    start = time.perf_counter()
+    for i in range(count):
+        function(TYPES[i % 3], BACKENDS[i % 6], 0.0123, 0, 200, "GET /web/", "client-17")
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of recording a routing decision")
+    parser.add_argument('--rate', type=int, default=100_000, help="Decisions per second")
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bench.trace")
+    recorder = request_trace.TraceRecorder(path)
+    baseline = call_cost(lambda *fields: None, 100_000)
+
+    # Bursts of 1 ms worth of decisions, paced to the target rate
+    burst = max(1, args.rate // 1000)
+    costs = []
+    started = time.perf_counter()
+    next_burst = started
+    while time.perf_counter() - started < args.seconds:
+        costs.append(call_cost(recorder.record, burst))
+        next_burst += burst / args.rate
+        time.sleep(max(0.0, next_burst - time.perf_counter()))
+    recorder.close()
+    costs.sort()
+    stats = recorder.stats()
+    print(f"record(): {(costs[len(costs) // 2] - baseline) * 1e9:.0f} ns median, "
+          f"{(costs[int(len(costs) * 0.99)] - baseline) * 1e9:.0f} ns p99 (per call, over an empty call) "
+          f"at {args.rate:,}/s; {stats['written']:,} written, {stats['dropped']:,} dropped")
+
+    reader = request_trace.TraceReader(path)
+    start = time.perf_counter()
+    count = sum(1 for _ in reader)
+    elapsed = time.perf_counter() - start
+    print(f"read back {count:,} records ({os.path.getsize(path) / max(count, 1):.0f} B each) "
+          f"at {count / elapsed:,.0f} records/s")
+    reader.close()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import csv
+import io
+import itertools
+import json
+import sys
+import time
+from datetime import datetime
+
+import database_store
+import sharded_store
+
+FORMATS = ("csv", "ndjson")
+
+store = sharded_store if sharded_store.SHARDING_ENABLED else database_store
+
+
+def guess_format(filename, default="csv"):
+    if filename.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if filename.endswith(".csv"):
+        return "csv"
+    return default
+
+
+class RowParser:
+    """
+    Turns CSV or NDJSON lines into (name, age, timestamp, instance_id) tuples.
+
+    Lines may arrive in any number of chunks; for CSV the first non-empty line is
+    the header. Missing timestamps default to the ingest time and missing
+    instance ids to the ingesting instance.
+    """
+
+    def __init__(self, fmt, instance_id):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.fmt = fmt
+        self.instance_id = instance_id
+        self.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.fieldnames = None
+        self.line_number = 0
+
+    def _row(self, record):
+        name = record.get("name")
+        if not name:
+            raise ValueError(f"line {self.line_number}: name is required")
+        age = record.get("age")
+        return (
+            name,
+            int(age) if age not in (None, "") else 0,
+            record.get("timestamp") or self.timestamp,
+            record.get("instance_id") or self.instance_id,
+        )
+
+    def parse(self, lines):
+        rows = []
+        if self.fmt == "ndjson":
+            for line in lines:
+                self.line_number += 1
+                if line.strip():
+                    rows.append(self._row(json.loads(line)))
+            return rows
+
+        for values in csv.reader(lines):
+            self.line_number += 1
+            if not values:
+                continue
+            if self.fieldnames is None:
+                self.fieldnames = [name.strip() for name in values]
+                continue
+            rows.append(self._row(dict(zip(self.fieldnames, values))))
+        return rows
+
+
+def format_rows(rows, fmt, header=False):
+    """Serialise entry row tuples (in database_store.ENTRY_COLUMNS order) to CSV or NDJSON text"""
+    if fmt == "ndjson":
+        return "".join(json.dumps(dict(zip(database_store.ENTRY_COLUMNS, row))) + "\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(database_store.ENTRY_COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def ingest(lines, fmt, instance_id, batch_size=database_store.BULK_BATCH_SIZE):
+    """Stream lines into the store batch by batch; returns the number of rows written"""
+    parser = RowParser(fmt, instance_id)
+    lines = iter(lines)
+    with store.BulkWriter() as writer:
+        while True:
+            chunk = list(itertools.islice(lines, batch_size))
+            if not chunk:
+                break
+            writer.write_batch(parser.parse(chunk))
+        return writer.rows_written
+
+
+def export(out, fmt, instance_id=None, chunk_size=database_store.BULK_BATCH_SIZE):
+    """Write entries to a text stream chunk by chunk; returns the number of rows written"""
+    written = 0
+    for rows in store.iter_entries(chunk_size, instance_id):
+        out.write(format_rows(rows, fmt, header=written == 0))
+        written += len(rows)
+    if written == 0 and fmt == "csv":
+        out.write(format_rows([], fmt, header=True))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk ingest into and export from the entries table")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="Load CSV or NDJSON rows (use - for stdin)")
+    ingest_parser.add_argument("file")
+    ingest_parser.add_argument("--format", choices=FORMATS)
+    ingest_parser.add_argument("--instance-id", default="Bulk Import")
+    ingest_parser.add_argument("--batch-size", type=int, default=database_store.BULK_BATCH_SIZE)
+
+    export_parser = commands.add_parser("export", help="Dump entries as CSV or NDJSON (use - for stdout)")
+    export_parser.add_argument("file")
+    export_parser.add_argument("--format", choices=FORMATS)
+    export_parser.add_argument("--instance-id", help="Only export entries from this instance")
+    export_parser.add_argument("--chunk-size", type=int, default=database_store.BULK_BATCH_SIZE)
+
+    args = parser.parse_args()
+    fmt = args.format or guess_format(args.file)
+    store.init_db()
+    start = time.perf_counter()
+
+    if args.command == "ingest":
+        source = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8")
+        with source:
+            count = ingest(source, fmt, args.instance_id, args.batch_size)
+    else:
+        target = sys.stdout if args.file == "-" else open(args.file, "w", newline="", encoding="utf-8")
+        with target:
+            count = export(target, fmt, args.instance_id, args.chunk_size)
+
+    elapsed = time.perf_counter() - start
+    print(f"{args.command}: {count} rows in {elapsed:.2f}s ({count / elapsed if elapsed else 0:,.0f} rows/s)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+
+from admission import Rejected
+
+# Connections (and so requests in flight) each pool's bulkhead allows to its backends at once
+DEFAULT_CONNECTIONS = {
+    'Database': int(os.environ.get('LB_BULKHEAD_DATABASE', 32)),
+    'Web': int(os.environ.get('LB_BULKHEAD_WEB', 16)),
+    'File': int(os.environ.get('LB_BULKHEAD_FILE', 8)),
+}
+
+_DONE = object()
+
+
+class Relay:
+    """
+    An async iterator that belongs to one event loop, iterated from another.
+
+    Each item is fetched with a call onto `loop`, so a body crosses between
+    loops one chunk at a time and neither side buffers the whole of it.
+    aclose(), also run once the items are exhausted, calls the `close`
+    coroutine function on `loop` if one is given, else closes the iterator.
+    """
+
+    def __init__(self, chunks, loop, close=None):
+        self._chunks = chunks
+        self._loop = loop
+        self._close = close
+        self._closed = False
+
+    def _on_loop(self, coroutine):
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self._loop))
+
+    async def _next(self):
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return _DONE
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        try:
+            item = await self._on_loop(self._next())
+        except BaseException:
+            await self.aclose()
+            raise
+        if item is _DONE:
+            await self.aclose()
+            raise StopAsyncIteration
+        return item
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._close is not None:
+            await self._on_loop(self._close())
+        elif hasattr(self._chunks, 'aclose'):
+            await self._on_loop(self._chunks.aclose())
+
+
+class Bulkhead:
+    """
+    An isolated worker for one pool's forwarding.
+
+    Each bulkhead has its own event loop thread and its own HTTP client, with at
+    most `limit` connections, so a flood of slow or large requests in one pool
+    queues behind that pool's own connections and loop instead of delaying the
+    others. Work is handed over with run(), or with open() when a response
+    body is too large to buffer and is relayed chunk by chunk instead; a
+    request that cannot get a connection before its deadline is rejected
+    rather than left waiting.
+
+    Counters are updated on the bulkhead's loop only; read them there too, with
+    call(), so a snapshot is never taken halfway through an update.
+    """
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self.peak = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.saturated_seconds = 0.0  # time spent with every connection in use
+        self._saturated_since = None
+        self._loop = None
+        self._slots = None
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name=f"bulkhead-{self.name.lower()}",
+                                 daemon=True).start()
+            return self._loop
+
+    @property
+    def client(self):
+        # Created on first use from the bulkhead's own loop, which it belongs to
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.limit, max_keepalive_connections=self.limit),
+                timeout=None,  # every request carries its own deadline
+            )
+        return self._client
+
+    async def call(self, coroutine):
+        """Run `coroutine` on the bulkhead's loop, outside the connection limit, and await it from any loop"""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self.loop))
+
+    async def run(self, function, deadline, *args):
+        """Await function(client, deadline, *args) on the bulkhead's loop once one of its `limit` slots is free"""
+        return await self.call(self._run(function, deadline, args))
+
+    async def open(self, function, deadline, *args):
+        """
+        Like run(), for a function returning (result, response): an httpx response opened with
+        stream=True whose body is still to be read, or None. Returns (result, body), body being a
+        Relay of the response's bytes for the caller's loop; the slot stays taken until it has
+        been read or closed.
+        """
+        return await self.call(self._open(function, deadline, args))
+
+    async def _run(self, function, deadline, args):
+        release = await self._acquire(deadline)
+        try:
+            return await function(self.client, deadline, *args)
+        finally:
+            release()
+
+    async def _open(self, function, deadline, args):
+        release = await self._acquire(deadline)
+        try:
+            result, response = await function(self.client, deadline, *args)
+        except BaseException:
+            release()
+            raise
+        if response is None:
+            release()
+            return result, None
+
+        async def close():
+            try:
+                await response.aclose()
+            finally:
+                release()
+        return result, Relay(response.aiter_bytes(), self.loop, close)
+
+    async def _acquire(self, deadline):
+        """Take a slot by `deadline`; returns the function that frees it"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.limit)
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), max(deadline - started, 0.0))
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Rejected(f"{self.name} bulkhead is saturated", 1) from None
+        finally:
+            self.waiting -= 1
+        now = time.monotonic()
+        self.wait_seconds += now - started
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        if self.active == self.limit:
+            self._saturated_since = now
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            if self._saturated_since is not None:
+                self.saturated_seconds += time.monotonic() - self._saturated_since
+                self._saturated_since = None
+            self.active -= 1
+            self.completed += 1
+            self._slots.release()
+        return release
+
+    def stats(self):
+        saturated = self.saturated_seconds
+        if self._saturated_since is not None:
+            saturated += time.monotonic() - self._saturated_since
+        started = self.completed + self.active
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "peak": self.peak,
+            "utilization": round(self.active / self.limit, 3) if self.limit else 0.0,
+            "saturated_seconds": round(saturated, 3),
+            "mean_wait_ms": round(self.wait_seconds / started * 1000, 3) if started else 0.0,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
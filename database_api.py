@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import async_http
+import bulk_io
+import database_store
+import sharded_store
+from request_stats import RequestStats
+
+# The JSON API of a database instance listens on its Streamlit port plus this offset
+API_PORT_OFFSET = 1000
+
+# Largest page a single GET /entries may ask for
+MAX_PAGE_SIZE = 1000
+
+# How often the event loop checks how late it is being scheduled
+LAG_PROBE_INTERVAL = 0.25
+
+store = sharded_store if sharded_store.SHARDING_ENABLED else database_store
+
+
+def api_url_for(url):
+    """Map a database instance's Streamlit URL to the URL of its JSON API"""
+    parts = urlsplit(url)
+    netloc = f"{parts.hostname}:{parts.port + API_PORT_OFFSET}"
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+def encode_cursor(cursor):
+    """Pagination cursors travel as opaque URL-safe strings"""
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+    if not isinstance(cursor, list):
+        raise ValueError("Invalid cursor")
+    return tuple(cursor)
+
+
+def positive_int(request, name, default):
+    """Query parameter `name` as an integer of at least 1; ValueError (a 400) otherwise"""
+    value = request.query.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return number
+
+
+class DatabaseAPI:
+    """JSON endpoints of one database instance, served by async_http"""
+
+    def __init__(self, instance_id):
+        self.instance_id = instance_id
+        self.started = time.time()
+        self.loop_lag_ms = 0.0
+        self.max_loop_lag_ms = 0.0
+        self.requests = 0
+        # Load reported by /health for the autoscaler: requests being served and
+        # SQLite calls waiting for a thread-pool worker
+        self.stats = RequestStats()
+        self.queued = 0
+        self._queued_lock = threading.Lock()
+
+    def routes(self):
+        return {
+            ('GET', '/health'): self.health,
+            ('GET', '/entries'): self._tracked(self.list_entries),
+            ('POST', '/entries'): self._tracked(self.create_entries),
+            ('POST', '/entries/bulk'): self._tracked(self.bulk_ingest),
+            ('GET', '/entries/export'): self._tracked(self.bulk_export),
+        }
+
+    def _tracked(self, handler):
+        async def tracked(request):
+            with self.stats.track():
+                return await handler(request)
+        return tracked
+
+    async def _run(self, func, *args, **kwargs):
+        """SQLite calls block, so they run on the default thread pool"""
+        loop = asyncio.get_running_loop()
+
+        def call():
+            with self._queued_lock:
+                self.queued -= 1
+            return func(*args, **kwargs)
+
+        with self._queued_lock:
+            self.queued += 1
+        return await loop.run_in_executor(None, call)
+
+    async def monitor_loop_lag(self):
+        """Track how far behind schedule the event loop runs, a proxy for overload"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_PROBE_INTERVAL
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.loop_lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.max_loop_lag_ms = max(self.max_loop_lag_ms, self.loop_lag_ms)
+
+    async def health(self, request):
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            data_version = await self._run(store.data_version)
+            database_ok = True
+        except Exception as e:
+            data_version = None
+            database_ok = False
+            error = str(e)
+        body = {
+            "status": "Healthy" if database_ok else "Unhealthy",
+            "instance_id": self.instance_id,
+            "database": "ok" if database_ok else error,
+            "db_latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "data_version": data_version,
+            "loop_lag_ms": round(self.loop_lag_ms, 2),
+            "max_loop_lag_ms": round(self.max_loop_lag_ms, 2),
+            "uptime_s": round(time.time() - self.started, 1),
+            "queued": self.queued,
+            **self.stats.snapshot(),
+        }
+        return (200 if database_ok else 503), body
+
+    async def list_entries(self, request):
+        self.requests += 1
+        limit = min(positive_int(request, 'limit', database_store.PAGE_SIZE), MAX_PAGE_SIZE)
+        rows, next_cursor = await self._run(
+            store.get_entries_page,
+            after=decode_cursor(request.query.get('after')),
+            limit=limit,
+            instance_id=request.query.get('instance_id'),
+        )
+        return 200, {"entries": rows, "next": encode_cursor(next_cursor)}
+
+    async def create_entries(self, request):
+        """Accept one {"name", "age"} object or a list of them"""
+        self.requests += 1
+        payload = await request.json()
+        entries = payload if isinstance(payload, list) else [payload]
+        # Validate everything before writing anything, so a bad item is a 400 with nothing stored
+        rows = []
+        for entry in entries:
+            if not isinstance(entry, dict):
+                raise ValueError("each entry must be a JSON object")
+            if not entry.get('name'):
+                raise ValueError("name is required")
+            try:
+                age = int(entry.get('age', 0))
+            except (TypeError, ValueError):
+                raise ValueError("age must be an integer") from None
+            rows.append((str(entry['name']), age))
+        # One transaction for the whole list: a failure part-way stores none of it
+        await self._run(store.add_entries, rows, self.instance_id)
+        return 201, {"created": len(entries)}
+
+    async def bulk_ingest(self, request):
+        """
+        Stream a CSV (text/csv) or NDJSON body into the store.
+
+        Lines are parsed and inserted batch by batch while the body is still
+        arriving, so memory stays bounded by one batch whatever the upload size.
+        """
+        self.requests += 1
+        content_type = request.headers.get('content-type', '')
+        fmt = request.query.get('format') or ('ndjson' if 'json' in content_type else 'csv')
+        batch_size = positive_int(request, 'batch_size', database_store.BULK_BATCH_SIZE)
+        parser = bulk_io.RowParser(fmt, self.instance_id)
+        writer = await self._run(store.BulkWriter)
+        start = time.perf_counter()
+        try:
+            lines = []
+            async for line in request.iter_lines():
+                lines.append(line.decode('utf-8'))
+                if len(lines) >= batch_size:
+                    await self._run(lambda chunk=lines: writer.write_batch(parser.parse(chunk)))
+                    lines = []
+            await self._run(lambda: writer.write_batch(parser.parse(lines)))
+        except Exception:
+            await self._run(writer.close, False)
+            raise
+        await self._run(writer.close)
+        elapsed = time.perf_counter() - start
+        return 201, {"created": writer.rows_written, "seconds": round(elapsed, 3)}
+
+    async def bulk_export(self, request):
+        """Stream the table as CSV or NDJSON, one cursor chunk at a time"""
+        self.requests += 1
+        fmt = request.query.get('format', 'ndjson')
+        if fmt not in bulk_io.FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        chunk_size = positive_int(request, 'chunk_size', database_store.BULK_BATCH_SIZE)
+        chunks = store.iter_entries(chunk_size, request.query.get('instance_id'))
+
+        async def body():
+            first = True
+            try:
+                while True:
+                    rows = await self._run(next, chunks, None)
+                    if rows is None:
+                        break
+                    yield bulk_io.format_rows(rows, fmt, header=first)
+                    first = False
+                if first and fmt == 'csv':
+                    yield bulk_io.format_rows([], fmt, header=True)
+            finally:
+                await self._run(chunks.close)
+
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        return 200, body(), {'Content-Type': content_type}
+
+
+async def serve(port, instance_id, host='localhost'):
+    store.init_db()
+    api = DatabaseAPI(instance_id)
+    server = await async_http.start_server(api.routes(), host, port)
+    print(f"Database API for {instance_id} started on port {port}")
+    asyncio.get_running_loop().create_task(api.monitor_loop_lag())
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="JSON data API for a database instance")
+    parser.add_argument('--port', type=int, default=8502 + API_PORT_OFFSET)
+    # The supervisor runs this beside each database_instance.py page, with the same INSTANCE_NUMBER
+    parser.add_argument('--instance-id',
+                        default=f"Database Server - Instance {int(os.environ.get('INSTANCE_NUMBER', 1))}")
+    args = parser.parse_args()
+    asyncio.run(serve(args.port, args.instance_id))
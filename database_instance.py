@@ -0,0 +1,94 @@
+import streamlit as st
+import os
+import pandas as pd
+import database_store
+import sharded_store
+from query_cache import RESULT_CACHE
+
+# Unique instance identifier, numbered by supervisor.py (or the database_instanceN.py shims)
+INSTANCE_NUMBER = int(os.environ.get("INSTANCE_NUMBER", 1))
+INSTANCE_ID = f"Database Server - Instance {INSTANCE_NUMBER}"
+
+# DATABASE_SHARDING=1 gives each instance its own shard file to write; pages read all of them
+store = sharded_store if sharded_store.SHARDING_ENABLED else database_store
+
+# Initialize database (creates the table or migrates it to the indexed schema)
+store.init_db()
+
+# The JSON API (real /health, paged reads, inserts) on port + 1000 is its own process,
+# database_api.py, which the supervisor starts with this page
+
+# Streamlit UI for the database server instance
+st.title(INSTANCE_ID)
+st.write("This is a dedicated database server instance.")
+
+# Database entry form
+with st.form("database_entry_form"):
+    name = st.text_input("Name")
+    age = st.number_input("Age", min_value=0)
+    submitted = st.form_submit_button("Submit")
+
+    if submitted and name:  # Basic validation
+        store.add_entry(name, age, INSTANCE_ID)
+        st.success(f"Data submitted to {INSTANCE_ID}.")
+
+# Results are reused across reruns until a write moves the data version
+data_version = store.data_version()
+
+# Metrics come from the trigger-maintained totals instead of loading the whole table
+stats = RESULT_CACHE.get_or_compute((store.__name__, "stats"), data_version, store.get_entry_stats)
+total_entries = sum(entries for entries, _ in stats.values())
+total_age = sum(age_total for _, age_total in stats.values())
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    st.metric("Total Entries", total_entries)
+with col2:
+    avg_age = total_age / total_entries if total_entries else 0
+    st.metric("Average Age", f"{avg_age:.1f}")
+with col3:
+    entries_from_this_instance = stats.get(INSTANCE_ID, (0, 0))[0]
+    st.metric("Entries from this Instance", entries_from_this_instance)
+
+# Display entries one page at a time using keyset pagination
+st.subheader("All Database Entries")
+only_this_instance = st.checkbox("Only entries from this instance")
+filter_id = INSTANCE_ID if only_this_instance else None
+
+# Stack of cursors for the pages visited so far; the top one is the current page
+if st.session_state.get('page_filter') != filter_id:
+    st.session_state.page_filter = filter_id
+    st.session_state.page_cursors = [None]
+
+def load_page(cursor, instance_id):
+    rows, next_cursor = store.get_entries_page(after=cursor, instance_id=instance_id)
+    return pd.DataFrame(rows), next_cursor
+
+current_cursor = st.session_state.page_cursors[-1]
+page, next_cursor = RESULT_CACHE.get_or_compute(
+    (store.__name__, "page", current_cursor, filter_id), data_version,
+    lambda: load_page(current_cursor, filter_id)
+)
+
+if not page.empty:
+    st.dataframe(page, hide_index=True)
+    st.caption(f"Page {len(st.session_state.page_cursors)}")
+    prev_col, next_col = st.columns(2)
+    with prev_col:
+        if st.button("Previous page", disabled=len(st.session_state.page_cursors) == 1):
+            st.session_state.page_cursors.pop()
+            st.rerun()
+    with next_col:
+        if st.button("Next page", disabled=next_cursor is None):
+            st.session_state.page_cursors.append(next_cursor)
+            st.rerun()
+else:
+    st.info("No entries in the database yet.")
+
+# Query-result cache effectiveness for this instance process
+cache_stats = RESULT_CACHE.stats()
+st.sidebar.markdown("### Result Cache")
+st.sidebar.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}",
+                  help=f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
+st.sidebar.text(f"Entries: {cache_stats['entries']} | Evictions: {cache_stats['evictions']}")
+st.sidebar.text(f"Memory: {cache_stats['bytes'] / 1024:.0f} / {cache_stats['max_bytes'] / 1024:.0f} KiB")
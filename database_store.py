@@ -0,0 +1,226 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+# Path of the SQLite file shared by the database instances
+DATABASE_PATH = 'shared_database.db'
+
+# Bumped every time a migration is added to MIGRATIONS
+SCHEMA_VERSION = 1
+
+# Default number of rows shown per page of the entries table
+PAGE_SIZE = 50
+
+ENTRY_COLUMNS = ["id", "name", "age", "timestamp", "instance_id"]
+
+# Rows per executemany call and per transaction for bulk ingest and export
+BULK_BATCH_SIZE = 5000
+BULK_TRANSACTION_ROWS = 200000
+
+# Long-lived read-only connections used to poll PRAGMA data_version, one per database file
+_version_connections = {}
+_version_lock = threading.Lock()
+
+
+def _migrate_to_v1(conn):
+    """Give entries a rowid-backed key, (instance_id, timestamp) indexes and running totals"""
+    # Fresh databases start from the original layout so both paths share one migration
+    conn.execute('''CREATE TABLE IF NOT EXISTS entries
+                    (name TEXT, age INTEGER, timestamp TEXT, instance_id TEXT)''')
+    conn.execute('''CREATE TABLE entries_v1
+                    (id INTEGER PRIMARY KEY, name TEXT, age INTEGER,
+                     timestamp TEXT, instance_id TEXT)''')
+    # Keep the implicit rowid as the new key so existing row order is preserved
+    conn.execute('''INSERT INTO entries_v1 (id, name, age, timestamp, instance_id)
+                    SELECT rowid, name, age, timestamp, instance_id FROM entries''')
+    conn.execute("DROP TABLE entries")
+    conn.execute("ALTER TABLE entries_v1 RENAME TO entries")
+    conn.execute("CREATE INDEX idx_entries_instance_timestamp ON entries (instance_id, timestamp)")
+    conn.execute("CREATE INDEX idx_entries_timestamp ON entries (timestamp)")
+
+    # Per-instance totals kept up to date by triggers, so the page metrics never scan entries
+    conn.execute('''CREATE TABLE entry_stats
+                    (instance_id TEXT PRIMARY KEY, entries INTEGER NOT NULL,
+                     age_total INTEGER NOT NULL)''')
+    conn.execute('''INSERT INTO entry_stats (instance_id, entries, age_total)
+                    SELECT instance_id, COUNT(*), COALESCE(SUM(age), 0)
+                    FROM entries GROUP BY instance_id''')
+    conn.execute('''CREATE TRIGGER entries_stats_insert AFTER INSERT ON entries
+                    BEGIN
+                        INSERT INTO entry_stats (instance_id, entries, age_total)
+                        VALUES (NEW.instance_id, 1, COALESCE(NEW.age, 0))
+                        ON CONFLICT(instance_id) DO UPDATE SET
+                            entries = entries + 1,
+                            age_total = age_total + excluded.age_total;
+                    END''')
+    conn.execute('''CREATE TRIGGER entries_stats_delete AFTER DELETE ON entries
+                    BEGIN
+                        UPDATE entry_stats SET entries = entries - 1,
+                                               age_total = age_total - COALESCE(OLD.age, 0)
+                        WHERE instance_id = OLD.instance_id;
+                    END''')
+
+
+# Migration applied to move a database from (index) to (index + 1)
+MIGRATIONS = [_migrate_to_v1]
+
+
+def init_db(path=DATABASE_PATH):
+    """Create the entries table and migrate older layouts to the current schema"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        # Several instances start at once; the write lock makes only one of them migrate
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for migrate in MIGRATIONS[version:]:
+                migrate(conn)
+            if version < SCHEMA_VERSION:
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+def data_version(path=DATABASE_PATH):
+    """
+    Counter that changes whenever any other connection commits to the database.
+
+    The probe connection never writes, so every insert (add_entry opens its own
+    connection) and every other process's commit moves the value.
+    """
+    with _version_lock:
+        conn = _version_connections.get(path)
+        if conn is None:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            _version_connections[path] = conn
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def add_entry(name, age, instance_id, path=DATABASE_PATH):
+    """Insert a single entry stamped with the current time"""
+    conn = sqlite3.connect(path)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute("INSERT INTO entries (name, age, timestamp, instance_id) VALUES (?, ?, ?, ?)",
+                 (name, age, timestamp, instance_id))
+    conn.commit()
+    conn.close()
+
+
+def add_entries(entries, instance_id, path=DATABASE_PATH):
+    """Insert (name, age) pairs stamped with the current time in one transaction: all of them or none"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT INTO entries (name, age, timestamp, instance_id) VALUES (?, ?, ?, ?)",
+                             [(name, age, timestamp, instance_id) for name, age in entries])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+def get_entries_page(after=None, limit=PAGE_SIZE, instance_id=None, path=DATABASE_PATH):
+    """
+    Keyset (seek) pagination over entries ordered by (timestamp, id).
+
+    `after` is the cursor returned for the previous page, or None for the first page.
+    Returns (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    clauses = []
+    params = []
+    if instance_id is not None:
+        clauses.append("instance_id = ?")
+        params.append(instance_id)
+    if after is not None:
+        # Row-value comparison lets SQLite seek straight into the timestamp index
+        clauses.append("(timestamp, id) > (?, ?)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    conn = sqlite3.connect(path)
+    # Fetch one extra row to learn whether another page exists without a COUNT(*)
+    rows = conn.execute(f"SELECT {', '.join(ENTRY_COLUMNS)} FROM entries {where} "
+                        "ORDER BY timestamp, id LIMIT ?", (*params, limit + 1)).fetchall()
+    conn.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = (last[3], last[0])
+    return [dict(zip(ENTRY_COLUMNS, row)) for row in rows], next_cursor
+
+
+def get_entry_stats(path=DATABASE_PATH):
+    """Return {instance_id: (entries, age_total)} from the trigger-maintained totals"""
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT instance_id, entries, age_total FROM entry_stats").fetchall()
+    conn.close()
+    return {instance_id: (entries, age_total) for instance_id, entries, age_total in rows}
+
+
+class BulkWriter:
+    """
+    Batched inserts for backfills: one executemany per batch, many batches per transaction.
+
+    Rows are (name, age, timestamp, instance_id) tuples. The connection may be driven
+    from different threads (e.g. an asyncio executor) as long as calls do not overlap.
+    """
+
+    def __init__(self, path=DATABASE_PATH, transaction_rows=BULK_TRANSACTION_ROWS):
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.transaction_rows = transaction_rows
+        self.rows_in_transaction = 0
+        self.rows_written = 0
+
+    def write_batch(self, rows):
+        if not rows:
+            return
+        if self.rows_in_transaction == 0:
+            self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany(
+            "INSERT INTO entries (name, age, timestamp, instance_id) VALUES (?, ?, ?, ?)", rows
+        )
+        self.rows_in_transaction += len(rows)
+        self.rows_written += len(rows)
+        if self.rows_in_transaction >= self.transaction_rows:
+            self.conn.execute("COMMIT")
+            self.rows_in_transaction = 0
+
+    def close(self, commit=True):
+        if self.rows_in_transaction:
+            self.conn.execute("COMMIT" if commit else "ROLLBACK")
+            self.rows_in_transaction = 0
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+
+def iter_entries(chunk_size=BULK_BATCH_SIZE, instance_id=None, path=DATABASE_PATH):
+    """Stream entries ordered by (timestamp, id) as lists of row tuples, chunk_size rows at a time"""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    try:
+        if instance_id is None:
+            cursor = conn.execute(f"SELECT {', '.join(ENTRY_COLUMNS)} FROM entries ORDER BY timestamp, id")
+        else:
+            cursor = conn.execute(f"SELECT {', '.join(ENTRY_COLUMNS)} FROM entries WHERE instance_id = ? "
+                                  "ORDER BY timestamp, id", (instance_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
@@ -0,0 +1,130 @@
+import asyncio
+import socket
+import time
+
+import background_loop
+
+# How long successful and failed lookups are remembered, in seconds
+DEFAULT_TTL = 60.0
+DEFAULT_NEGATIVE_TTL = 10.0
+
+
+async def system_lookup(host):
+    """Every address of `host` in the OS resolver's preference order, without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    return tuple(dict.fromkeys(info[4][0] for info in infos))
+
+
+class StubLookup:
+    """Resolver stand-in for tests and offline runs: fixed answers (an address or several) after an optional delay"""
+
+    def __init__(self, addresses, delay=0.0):
+        self.addresses = addresses
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, host):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if host not in self.addresses:
+            raise socket.gaierror(socket.EAI_NONAME, f"Unknown host {host}")
+        addresses = self.addresses[host]
+        return (addresses,) if isinstance(addresses, str) else tuple(addresses)
+
+
+class AsyncResolver:
+    """
+    DNS cache with TTLs, negative caching and lookup coalescing.
+
+    Concurrent requests for a host that is not cached share one in-flight lookup,
+    so a burst of N requests costs a single query. Every address of a host is
+    kept, in preference order, so connections can fall back from one that is
+    unreachable to the next. All state lives on the background loop; other
+    threads go through resolve_blocking.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL, lookup=system_lookup):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lookup = lookup
+        self._cache = {}  # host -> (expires_at, addresses or None, error, lookup_ms)
+        self._in_flight = {}  # host -> Future
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_ms = 0.0
+
+    async def lookup(self, host):
+        """Return (addresses, status): a tuple of addresses, and 'hit', 'miss' or 'coalesced'"""
+        now = time.monotonic()
+        entry = self._cache.get(host)
+        if entry is not None and entry[0] > now:
+            _, addresses, error, lookup_ms = entry
+            self.saved_ms += lookup_ms
+            if error is not None:
+                self.negative_hits += 1
+                raise error
+            self.hits += 1
+            return addresses, 'hit'
+
+        future = self._in_flight.get(host)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future), 'coalesced'
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[host] = future
+        start = time.perf_counter()
+        try:
+            addresses = await self._lookup(host)
+        except OSError as e:
+            lookup_ms = (time.perf_counter() - start) * 1000
+            self._cache[host] = (time.monotonic() + self.negative_ttl, None, e, lookup_ms)
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        except BaseException as e:
+            # Waiters share this future, so it must settle however the lookup ends
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()
+            else:
+                future.cancel()  # the leading request was cancelled (or the loop is stopping)
+            raise
+        finally:
+            del self._in_flight[host]
+        lookup_ms = (time.perf_counter() - start) * 1000
+        self._cache[host] = (time.monotonic() + self.ttl, addresses, None, lookup_ms)
+        future.set_result(addresses)
+        return addresses, 'miss'
+
+    async def resolve(self, host):
+        addresses, _ = await self.lookup(host)
+        return addresses
+
+    def resolve_blocking(self, host):
+        """Resolve from a non-async thread (Streamlit script, httpx connection setup)"""
+        return background_loop.run(self.resolve(host))
+
+    def lookup_blocking(self, host):
+        return background_loop.run(self.lookup(host))
+
+    def stats(self):
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': (self.hits + self.negative_hits + self.coalesced) / lookups if lookups else 0.0,
+            'saved_ms': round(self.saved_ms, 2),
+            'cached_hosts': len(self._cache),
+        }
+
+
+# Process-wide resolver shared by every web instance session and the HTTP client
+RESOLVER = AsyncResolver()
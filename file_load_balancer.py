@@ -2,16 +2,23 @@ import streamlit as st
 import requests
 from datetime import datetime
 
+import backend_registry
+
 class FileLoadBalancer:
     def __init__(self):
-        self.FILE_INSTANCES = [
-            {"url": "http://localhost:8701", "name": "File Server 1"},
-            {"url": "http://localhost:8702", "name": "File Server 2"},
-            {"url": "http://localhost:8703", "name": "File Server 3"}
-        ]
+        # File servers come from the backend registry, so pool changes need no restart
+        self.registry = backend_registry.REGISTRY
         self.counter = 0
         self.instance_health = {}
 
+    @property
+    def FILE_INSTANCES(self):
+        """Active file servers of the current registry snapshot"""
+        return [
+            {"url": backend.url, "name": backend.name}
+            for backend in self.registry.snapshot().backends("File") if backend.state == 'active'
+        ]
+
     def check_health(self, url):
         try:
             response = requests.get(f"{url}/health", timeout=2)
@@ -30,6 +37,13 @@ class FileLoadBalancer:
         self.counter += 1
         return selected
 
+# Follow the supervisor's backends.json once per process (the dashboard hosts the admin API)
+@st.cache_resource
+def start_registry():
+    return backend_registry.start(admin_port=None)
+
+start_registry()
+
 # Initialize load balancer
 if 'file_balancer' not in st.session_state:
     st.session_state.file_balancer = FileLoadBalancer()
@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+from latency_histogram import LatencyHistogram
+
+# A request is duplicated once it has run longer than this percentile of the pool's latency
+HEDGE_PERCENTILE = 95
+
+# Hedges allowed per request (0.05 = at most 5% extra load), and how many may be saved up
+HEDGE_BUDGET = 0.05
+MAX_SAVED_HEDGES = 10
+
+# No hedging until the pool has this many samples, so a cold start does not hedge at random
+MIN_SAMPLES = 50
+
+# Latency is tracked over the last one to two windows; the delay is recomputed at most this often
+WINDOW_SECONDS = 30
+REFRESH_SECONDS = 1.0
+
+
+class HedgePolicy:
+    """
+    When to send a duplicate request, for one pool.
+
+    The hedge delay follows the pool's observed p95, so only the slowest ~5%
+    of requests are candidates, and a token budget earned per request caps the
+    extra load even when the whole pool slows down at once.
+    """
+
+    def __init__(self, percentile=HEDGE_PERCENTILE, budget=HEDGE_BUDGET, min_samples=MIN_SAMPLES,
+                 window_seconds=WINDOW_SECONDS, clock=time.monotonic):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self._current = LatencyHistogram()
+        self._previous = LatencyHistogram()
+        self._window_started = clock()
+        self._delay = None
+        self._delay_computed = None
+        self._tokens = 0.0
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.over_budget = 0
+
+    def _rotate(self, now):
+        elapsed = now - self._window_started
+        if elapsed < self.window_seconds:
+            return
+        self._previous = self._current if elapsed < 2 * self.window_seconds else LatencyHistogram()
+        self._current = LatencyHistogram()
+        self._window_started = now
+
+    def record(self, latency_ms):
+        self._rotate(self.clock())
+        self._current.record(latency_ms)
+
+    def delay(self):
+        """Seconds to wait before hedging, or None while there are too few samples"""
+        now = self.clock()
+        if self._delay_computed is None or now - self._delay_computed >= REFRESH_SECONDS:
+            # A percentile scans every bucket, so it is cached rather than computed per request
+            self._rotate(now)
+            window = LatencyHistogram.merged([self._previous, self._current])
+            self._delay = window.percentile(self.percentile) / 1000 if window.count >= self.min_samples else None
+            self._delay_computed = now
+        return self._delay
+
+    def admit(self):
+        """Count a request and earn its share of the hedge budget"""
+        self.requests += 1
+        self._tokens = min(self._tokens + self.budget, MAX_SAVED_HEDGES)
+
+    def try_hedge(self):
+        if self._tokens < 1:
+            self.over_budget += 1
+            return False
+        self._tokens -= 1
+        self.hedged += 1
+        return True
+
+    def stats(self):
+        delay = self.delay()
+        return {
+            "delay_ms": None if delay is None else round(delay * 1000, 1),
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "over_budget": self.over_budget,
+            "extra_load": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+async def hedged(policy, send, choose, discard=None):
+    """
+    Run `send(url)` on `choose(())` and, if it has not answered within the
+    policy's delay, on `choose((first_url,))` as well. Returns (url, result)
+    of the first attempt to succeed and cancels the other; if both fail the
+    last error is raised. Without a second backend or budget it just waits.
+    A losing attempt that also succeeded has its result passed to the
+    `discard` coroutine function, e.g. to close a streamed response.
+    """
+    async def attempt(url):
+        start = time.monotonic()
+        try:
+            result = await send(url)
+        except asyncio.CancelledError:
+            # A cancelled loser ran at least this long; keeping it holds slow backends in the percentile
+            policy.record((time.monotonic() - start) * 1000)
+            raise
+        policy.record((time.monotonic() - start) * 1000)
+        return url, result
+
+    first = choose(())
+    policy.admit()
+    pending = {asyncio.ensure_future(attempt(first))}
+    try:
+        delay = policy.delay()
+        if delay is not None:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                second = choose((first,))
+                if second is not None and policy.try_hedge():
+                    pending.add(asyncio.ensure_future(attempt(second)))
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [task for task in done if task.exception() is None]
+            if succeeded:
+                for task in succeeded[1:]:
+                    if discard is not None:
+                        await discard(task.result()[1])
+                url, result = succeeded[0].result()
+                if url != first:
+                    policy.hedge_wins += 1
+                return url, result
+            if not pending:
+                return done.pop().result()  # every attempt failed: raise the error
+            # One attempt failed while the other is still running: wait for that one
+    finally:
+        for task in pending:
+            task.cancel()
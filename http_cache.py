@@ -0,0 +1,248 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+import web_client
+
+# Memory budget for cached bodies, and optional on-disk overflow (WEB_CACHE_SPILL_DIR)
+DEFAULT_MAX_BYTES = int(os.environ.get('WEB_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+DEFAULT_SPILL_MAX_BYTES = 256 * 1024 * 1024
+
+# Responses cacheable by default when they carry freshness information (RFC 9111, 4.2.2)
+CACHEABLE_STATUSES = {200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501}
+
+# Cap on heuristic freshness for responses with only Last-Modified
+MAX_HEURISTIC_FRESHNESS = 24 * 3600
+
+
+def parse_cache_control(value):
+    """'max-age=60, no-cache' -> {'max-age': '60', 'no-cache': None}"""
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _delta_seconds(value):
+    """A delta-seconds value (RFC 9111, 1.2.2) as an int, or None when it is not one"""
+    value = (value or '').strip()
+    return int(value) if value.isascii() and value.isdigit() else None
+
+
+def _http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class CachedResponse:
+    """A stored response; exposes the attributes fetch_metrics reads from an httpx.Response"""
+
+    def __init__(self, url, status_code, http_version, headers, content, vary_values):
+        self.url = url
+        self.status_code = status_code
+        self.http_version = http_version
+        self.headers = headers
+        self.content = content
+        self.vary_values = vary_values
+        self.size = len(content) + sum(len(k) + len(v) for k, v in headers.items())
+        self.refresh(headers)
+
+    def refresh(self, headers):
+        """(Re)compute freshness from response headers, e.g. after a 304"""
+        self.headers.update(headers)
+        self.stored_at = time.time()
+        directives = parse_cache_control(self.headers.get('cache-control'))
+        self.no_cache = 'no-cache' in directives
+        # A backend's malformed header must not fail the fetch: an invalid Age counts as 0 (only the
+        # first of a list is used) and an invalid max-age makes the response stale (RFC 9111, 5.1 and 4.2.1)
+        age = _delta_seconds(self.headers.get('age', '').split(',')[0]) or 0
+        if 'max-age' in directives:
+            lifetime = _delta_seconds(directives['max-age']) or 0
+        elif 'expires' in self.headers:
+            expires = _http_date(self.headers['expires'])
+            date = _http_date(self.headers.get('date')) or self.stored_at
+            lifetime = (expires - date) if expires is not None else 0
+        elif 'last-modified' in self.headers:
+            # Heuristic freshness: 10% of the time since the resource last changed
+            modified = _http_date(self.headers['last-modified'])
+            date = _http_date(self.headers.get('date')) or self.stored_at
+            lifetime = min((date - modified) / 10, MAX_HEURISTIC_FRESHNESS) if modified else 0
+        else:
+            lifetime = 0
+        self.expires_at = self.stored_at + lifetime - age
+
+    @property
+    def fresh(self):
+        return not self.no_cache and time.time() < self.expires_at
+
+    def validators(self):
+        """Conditional request headers for revalidation"""
+        headers = {}
+        if 'etag' in self.headers:
+            headers['If-None-Match'] = self.headers['etag']
+        if 'last-modified' in self.headers:
+            headers['If-Modified-Since'] = self.headers['last-modified']
+        return headers
+
+
+class ResponseCache:
+    """
+    Private HTTP cache in front of web_client.timed_get.
+
+    Follows Cache-Control (max-age, no-store, no-cache), Expires, Vary and
+    heuristic freshness, revalidates stale entries with ETag / Last-Modified and
+    keeps bodies in a byte-bounded LRU that can overflow to a spill directory.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, spill_dir=None, spill_max_bytes=DEFAULT_SPILL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.current_bytes = 0
+        self.spill_bytes = 0
+        self._entries = OrderedDict()  # url -> CachedResponse
+        self._spilled = OrderedDict()  # url -> size on disk
+        self._lock = threading.Lock()
+        self.counts = {'HIT': 0, 'REVALIDATED': 0, 'MISS': 0, 'BYPASS': 0}
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, url):
+        return os.path.join(self.spill_dir, hashlib.sha1(url.encode()).hexdigest())
+
+    def _lookup(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                return entry
+            if url not in self._spilled:
+                return None
+            self.spill_bytes -= self._spilled.pop(url)
+        try:
+            with open(self._spill_path(url), 'rb') as f:
+                entry = pickle.load(f)
+            os.remove(self._spill_path(url))
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+        self._store(url, entry)  # promote back into memory
+        return entry
+
+    def _store(self, url, entry):
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self.current_bytes -= old.size
+            if entry.size > self.max_bytes:
+                return
+            self._entries[url] = entry
+            self.current_bytes += entry.size
+            evicted = []
+            while self.current_bytes > self.max_bytes:
+                evicted_url, evicted_entry = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_entry.size
+                evicted.append((evicted_url, evicted_entry))
+        if self.spill_dir:
+            for evicted_url, evicted_entry in evicted:
+                self._spill(evicted_url, evicted_entry)
+
+    def _spill(self, url, entry):
+        with open(self._spill_path(url), 'wb') as f:
+            pickle.dump(entry, f)
+        with self._lock:
+            self.spill_bytes += entry.size - self._spilled.pop(url, 0)
+            self._spilled[url] = entry.size
+            while self.spill_bytes > self.spill_max_bytes and self._spilled:
+                old_url, old_size = self._spilled.popitem(last=False)
+                self.spill_bytes -= old_size
+                try:
+                    os.remove(self._spill_path(old_url))
+                except OSError:
+                    pass
+
+    def _forget(self, url):
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is not None:
+                self.current_bytes -= entry.size
+
+    def _cacheable(self, response):
+        directives = parse_cache_control(response.headers.get('cache-control'))
+        if 'no-store' in directives or response.headers.get('vary', '').strip() == '*':
+            return False
+        if response.status_code not in CACHEABLE_STATUSES:
+            return False
+        return any(key in directives for key in ('max-age', 'no-cache')) or \
+            any(key in response.headers for key in ('expires', 'last-modified', 'etag'))
+
+    def fetch(self, url, headers=None):
+        """
+        GET through the cache.
+
+        Returns (response, timings, cache_status) where cache_status is HIT,
+        REVALIDATED, MISS or BYPASS and response is an httpx.Response or CachedResponse.
+        """
+        headers = headers or {}
+        start = time.perf_counter()
+        entry = self._lookup(url)
+        if entry is not None and entry.vary_values != self._vary_values(entry.headers, headers):
+            entry = None
+
+        if entry is not None and entry.fresh:
+            return entry, self._local_timings(start), self._count('HIT')
+
+        request_headers = dict(headers)
+        if entry is not None:
+            request_headers.update(entry.validators())
+        response, timings = web_client.timed_get(url, headers=request_headers)
+
+        if entry is not None and response.status_code == 304:
+            entry.refresh({k.lower(): v for k, v in response.headers.items()})
+            self._store(url, entry)
+            return entry, timings, self._count('REVALIDATED')
+
+        if not self._cacheable(response):
+            self._forget(url)
+            return response, timings, self._count('BYPASS')
+
+        response_headers = {k.lower(): v for k, v in response.headers.items()}
+        self._store(url, CachedResponse(url, response.status_code, response.http_version, response_headers,
+                                        response.content, self._vary_values(response_headers, headers)))
+        return response, timings, self._count('MISS')
+
+    @staticmethod
+    def _vary_values(response_headers, request_headers):
+        """Request header values named by Vary, used as a secondary cache key"""
+        lowered = {k.lower(): v for k, v in request_headers.items()}
+        names = [name.strip().lower() for name in response_headers.get('vary', '').split(',') if name.strip()]
+        return tuple(lowered.get(name) for name in names)
+
+    @staticmethod
+    def _local_timings(start):
+        return {'connect': 0.0, 'tls': 0.0, 'ttfb': 0.0,
+                'total': round((time.perf_counter() - start) * 1000, 3), 'connection_reused': 'N/A'}
+
+    def _count(self, status):
+        with self._lock:
+            self.counts[status] += 1
+        return status
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self.counts.values())
+            served_locally = self.counts['HIT'] + self.counts['REVALIDATED']
+            return dict(self.counts, entries=len(self._entries), bytes=self.current_bytes,
+                        max_bytes=self.max_bytes, spilled=len(self._spilled),
+                        hit_rate=served_locally / lookups if lookups else 0.0)
+
+
+# Process-wide cache shared by every session of a web instance
+CACHE = ResponseCache(spill_dir=os.environ.get('WEB_CACHE_SPILL_DIR'))
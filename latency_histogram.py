@@ -0,0 +1,110 @@
+from array import array
+
+# Values are stored in microseconds. Each power-of-two range is split into
+# 2**(SUB_BUCKET_BITS - 1) equal sub-buckets, so any recorded value is off by
+# less than 1 / 2**(SUB_BUCKET_BITS - 1) (under 1.6% with 7 bits).
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+# Largest trackable latency; bigger values are clamped into the top bucket
+DEFAULT_MAX_VALUE_MS = 3_600_000
+
+DEFAULT_PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket_index(value_us):
+    """Log-linear bucket for a non-negative integer number of microseconds"""
+    exponent = value_us.bit_length() - SUB_BUCKET_BITS
+    if exponent <= 0:
+        return value_us
+    return exponent * SUB_BUCKET_HALF + (value_us >> exponent)
+
+
+def bucket_bounds(index):
+    """Inclusive [low, high] microsecond range covered by a bucket"""
+    if index < SUB_BUCKET_COUNT:
+        return index, index
+    exponent = index // SUB_BUCKET_HALF - 1
+    mantissa = index - exponent * SUB_BUCKET_HALF
+    return mantissa << exponent, ((mantissa + 1) << exponent) - 1
+
+
+def bucket_count_for(max_value_ms):
+    return bucket_index(int(max_value_ms * 1000)) + 1
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-bucketed latency histogram.
+
+    Recording is O(1) and memory is fixed (about 1.7k counters for a one-hour
+    range), percentiles are within ~1.6% of the true value, and histograms with
+    the same range can be merged by adding counters.
+    """
+
+    def __init__(self, max_value_ms=DEFAULT_MAX_VALUE_MS, counts=None):
+        self.max_value_ms = max_value_ms
+        self.bucket_count = bucket_count_for(max_value_ms)
+        # `counts` may be an external buffer (e.g. shared memory) of bucket_count int64s
+        self.counts = counts if counts is not None else array('q', bytes(8 * self.bucket_count))
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, value_ms):
+        value_us = max(int(value_ms * 1000), 0)
+        self.counts[min(bucket_index(value_us), self.bucket_count - 1)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def merge(self, other):
+        """Add another histogram's counts into this one"""
+        if other.bucket_count != self.bucket_count:
+            raise ValueError("Cannot merge histograms with different ranges")
+        for index, value in enumerate(other.counts):
+            if value:
+                self.counts[index] += value
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        return self
+
+    @classmethod
+    def merged(cls, histograms, max_value_ms=DEFAULT_MAX_VALUE_MS):
+        result = cls(max_value_ms)
+        for histogram in histograms:
+            result.merge(histogram)
+        return result
+
+    def percentile(self, percentile):
+        """Latency in ms at or below which `percentile` percent of recorded values fall"""
+        total = sum(self.counts)
+        if not total:
+            return 0.0
+        rank = max(1, round(total * percentile / 100))
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                # Report the bucket midpoint, never beyond the largest value seen
+                estimate = (low + high) / 2 / 1000
+                return min(estimate, self.max_ms) if self.max_ms else estimate
+        return self.max_ms
+
+    def percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        return {p: self.percentile(p) for p in percentiles}
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+
+def format_percentiles(histogram, percentiles=DEFAULT_PERCENTILES):
+    """'p50 12.1 | p90 40.3 | p99 120.0 | p99.9 410.2 ms' for compact display"""
+    if not sum(histogram.counts):
+        return "no samples"
+    values = histogram.percentiles(percentiles)
+    return " | ".join(f"p{p:g} {v:.1f}" for p, v in values.items()) + " ms"
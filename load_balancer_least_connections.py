@@ -1,27 +1,57 @@
 import requests
 from datetime import datetime
+from collections import defaultdict
 
-# URLs for each instance type with network topology visualization
-DATABASE_SERVER_URLS = ["http://localhost:8502", "http://localhost:8503", "http://localhost:8504"]
-WEB_SERVER_URLS = ["http://localhost:8511", "http://localhost:8512", "http://localhost:8513"]
-FILE_SERVER_URLS = ["http://localhost:8701", "http://localhost:8702", "http://localhost:8703"]
+import backend_registry
+import profiling
+import slow_start
+from database_api import api_url_for
+
+# Default URLs for each instance type; live membership comes from the backend registry
+DATABASE_SERVER_URLS = backend_registry.DEFAULT_POOLS["Database"]
+WEB_SERVER_URLS = backend_registry.DEFAULT_POOLS["Web"]
+FILE_SERVER_URLS = backend_registry.DEFAULT_POOLS["File"]
+POOLS = ("Database", "Web", "File")
 
 class LoadBalancerLeastConnections:
     def __init__(self):
         self.instance_health = {}
         self.total_requests = 0
         self.start_time = datetime.now()
-        self.server_load = {  # Track load on each server
-            "Database": {url: 0 for url in DATABASE_SERVER_URLS},
-            "Web": {url: 0 for url in WEB_SERVER_URLS},
-            "File": {url: 0 for url in FILE_SERVER_URLS},
-        }
+        # Pool membership is read from registry snapshots; per-URL state outlives membership changes
+        self.registry = backend_registry.REGISTRY
+        self.server_load = {pool: defaultdict(int) for pool in POOLS}  # Track load on each server
+        self.slow_start = {pool: slow_start.SlowStart(on_ramp=lambda url, pool=pool: self._catch_up(pool, url))
+                           for pool in POOLS}
+
+    @property
+    def pools(self):
+        """{pool: [url, ...]} of the backends currently taking new requests"""
+        snapshot = self.registry.snapshot()
+        return {pool: list(snapshot.urls(pool)) for pool in POOLS}
+
+    def add_backend(self, pool, url, name=None):
+        """Start routing to a new backend of `pool` ("Database", "Web" or "File")"""
+        self.registry.register(pool, url, name)
+
+    def remove_backend(self, pool, url):
+        """Stop routing to a backend; its health and load history are kept by URL"""
+        self.registry.deregister(pool, url)
 
     def check_health(self, url):
         """Check if an instance is healthy by making a request and monitoring network metrics"""
+        timers = profiling.TIMERS
+        start = timers.start()
+        # Database instances expose a real liveness check on their JSON API
+        backend = self.registry.snapshot().find(url)
+        health_url = api_url_for(url) if backend and backend.pool == "Database" else url
         try:
-            response = requests.get(url + "/health", timeout=2)
+            response = requests.get(health_url + "/health", timeout=2)
+            start = timers.lap("check_health:request", start)
             is_healthy = response.status_code == 200
+            if backend:
+                # A backend that comes back up ramps up slowly instead of taking a full share at once
+                self.slow_start[backend.pool].update(url, is_healthy, response.elapsed.total_seconds() * 1000)
             self.instance_health[url] = {
                 'healthy': is_healthy,
                 'last_check': datetime.now(),
@@ -31,8 +61,12 @@ class LoadBalancerLeastConnections:
                 'bandwidth': '1 Gbps',  # Simulated network bandwidth
                 'protocol': 'HTTP/1.1'
             }
+            timers.lap("check_health:update", start)
             return is_healthy
         except requests.RequestException:
+            start = timers.lap("check_health:request", start)
+            if backend:
+                self.slow_start[backend.pool].update(url, False)
             self.instance_health[url] = {
                 'healthy': False,
                 'last_check': datetime.now(),
@@ -42,36 +76,68 @@ class LoadBalancerLeastConnections:
                 'bandwidth': 'N/A',
                 'protocol': 'N/A'
             }
+            timers.lap("check_health:update", start)
             return False
 
-    def get_least_loaded_instance(self, urls):
-        """Get the instance with the least load"""
-        least_loaded_instance = None
-        least_load = float('inf')
-        
+    def _load(self, url):
+        return sum(loads.get(url, 0) for loads in self.server_load.values())
+
+    def _catch_up(self, pool, url):
+        """Start a new or recovered instance level with the least loaded of its peers"""
+        # Otherwise its low count would make it the least loaded for every request until it caught up
+        peers = [self._load(u) for u in self.registry.snapshot().urls(pool) if u != url]
+        if peers:
+            self.server_load[pool][url] += max(0, min(peers) - self._load(url))
+
+    def get_least_loaded_instance(self, urls, pool):
+        """Get the healthy instance with the least load"""
+        timers = profiling.TIMERS
+        start = timers.start()
+        healthy_instances = []
+
+        # Check health of instances, as Round Robin does, so a down instance is skipped and a recovered one ramps up
         for url in urls:
-            load = self.server_load["Database"].get(url, 0) if "Database" in url else \
-                   self.server_load["Web"].get(url, 0) if "Web" in url else \
-                   self.server_load["File"].get(url, 0)
-            if load < least_load:
-                least_load = load
-                least_loaded_instance = url
-        
-        return least_loaded_instance
+            last_check = self.instance_health.get(url, {}).get('last_check')
+            if not last_check or (datetime.now() - last_check).seconds > 30:
+                self.check_health(url)
+
+            if self.instance_health.get(url, {}).get('healthy', False):
+                healthy_instances.append(url)
+
+        start = timers.lap("get_least_loaded_instance:health", start)
+        if not healthy_instances:
+            raise Exception("No healthy instances available")
+
+        ramp = self.slow_start[pool]
+        weights = ramp.weights(urls)
+        start = timers.lap("get_least_loaded_instance:weights", start)
+        # Least loaded first; an instance still ramping up passes part of its turns to the next
+        ranked = sorted(healthy_instances, key=self._load)
+        start = timers.lap("get_least_loaded_instance:rank", start)
+        instance = ramp.pick(ranked, weights)
+        timers.lap("get_least_loaded_instance:pick", start)
+        return instance
 
     def get_next_instance(self, request_type):
         """Get the next available instance based on request type with load statistics"""
         try:
+            timers = profiling.TIMERS
+            start = timers.start()
+            snapshot = self.registry.snapshot()  # one consistent membership view per decision
+            start = timers.lap("get_next_instance:snapshot", start)
             self.total_requests += 1
             if request_type == "Database Request":
-                instance = self.get_least_loaded_instance(DATABASE_SERVER_URLS)
+                instance = self.get_least_loaded_instance(snapshot.urls("Database"), "Database")
+                start = timers.lap("get_next_instance:select", start)
                 self.server_load["Database"][instance] += 1  # Increment load
             elif request_type == "Web Request":
-                instance = self.get_least_loaded_instance(WEB_SERVER_URLS)
+                instance = self.get_least_loaded_instance(snapshot.urls("Web"), "Web")
+                start = timers.lap("get_next_instance:select", start)
                 self.server_load["Web"][instance] += 1  # Increment load
             else:  # File Request
                 instance = "http://localhost:8704"  # Directly redirect to file load balancer
                 self.server_load["File"][instance] += 1  # Increment load
+            timers.lap("get_next_instance:bookkeeping", start)
             return instance
         except Exception as e:
             return None 
\ No newline at end of file
@@ -0,0 +1,139 @@
+import requests
+from datetime import datetime
+from collections import defaultdict
+
+import backend_registry
+import profiling
+import slow_start
+from database_api import api_url_for
+
+# Default URLs for each instance type; live membership comes from the backend registry
+DATABASE_SERVER_URLS = backend_registry.DEFAULT_POOLS["Database"]
+WEB_SERVER_URLS = backend_registry.DEFAULT_POOLS["Web"]
+FILE_SERVER_URLS = backend_registry.DEFAULT_POOLS["File"]
+POOLS = ("Database", "Web", "File")
+
+class LoadBalancer:
+    def __init__(self):
+        self.db_counter = 0
+        self.web_counter = 0
+        self.file_counter = 0
+        self.instance_health = {}
+        self.total_requests = 0
+        self.start_time = datetime.now()
+        # Pool membership is read from registry snapshots; per-URL state outlives membership changes
+        self.registry = backend_registry.REGISTRY
+        self.server_load = {pool: defaultdict(int) for pool in POOLS}  # Track load on each server
+        self.slow_start = {pool: slow_start.SlowStart() for pool in POOLS}
+        
+    @property
+    def pools(self):
+        """{pool: [url, ...]} of the backends currently taking new requests"""
+        snapshot = self.registry.snapshot()
+        return {pool: list(snapshot.urls(pool)) for pool in POOLS}
+
+    def add_backend(self, pool, url, name=None):
+        """Start routing to a new backend of `pool` ("Database", "Web" or "File")"""
+        self.registry.register(pool, url, name)
+
+    def remove_backend(self, pool, url):
+        """Stop routing to a backend; its health and load history are kept by URL"""
+        self.registry.deregister(pool, url)
+
+    def check_health(self, url):
+        """Check if an instance is healthy by making a request and monitoring network metrics"""
+        timers = profiling.TIMERS
+        start = timers.start()
+        # Database instances expose a real liveness check on their JSON API
+        backend = self.registry.snapshot().find(url)
+        health_url = api_url_for(url) if backend and backend.pool == "Database" else url
+        try:
+            response = requests.get(health_url + "/health", timeout=2)
+            start = timers.lap("check_health:request", start)
+            is_healthy = response.status_code == 200
+            if backend:
+                # A backend that comes back up ramps up slowly instead of taking a full share at once
+                self.slow_start[backend.pool].update(url, is_healthy, response.elapsed.total_seconds() * 1000)
+            self.instance_health[url] = {
+                'healthy': is_healthy,
+                'last_check': datetime.now(),
+                'response_time': response.elapsed.total_seconds(),
+                'latency': round(response.elapsed.total_seconds() * 1000, 2),  # in ms
+                'status': 'Active' if is_healthy else 'Down',
+                'bandwidth': '1 Gbps',  # Simulated network bandwidth
+                'protocol': 'HTTP/1.1'
+            }
+            timers.lap("check_health:update", start)
+            return is_healthy
+        except requests.RequestException:
+            start = timers.lap("check_health:request", start)
+            if backend:
+                self.slow_start[backend.pool].update(url, False)
+            self.instance_health[url] = {
+                'healthy': False,
+                'last_check': datetime.now(),
+                'response_time': float('inf'),
+                'latency': float('inf'),
+                'status': 'Down',
+                'bandwidth': 'N/A',
+                'protocol': 'N/A'
+            }
+            timers.lap("check_health:update", start)
+            return False
+
+    def get_least_loaded_instance(self, urls, counter, pool):
+        """
+        Round Robin with health checking and advanced network monitoring
+        """
+        timers = profiling.TIMERS
+        start = timers.start()
+        healthy_instances = []
+        
+        # Check health of instances
+        for url in urls:
+            last_check = self.instance_health.get(url, {}).get('last_check')
+            if not last_check or (datetime.now() - last_check).seconds > 30:
+                self.check_health(url)
+            
+            if self.instance_health.get(url, {}).get('healthy', False):
+                healthy_instances.append(url)
+        
+        start = timers.lap("get_least_loaded_instance:health", start)
+        if not healthy_instances:
+            raise Exception("No healthy instances available")
+            
+        # Instances still ramping up pass on part of their turns to the next one in the rotation
+        first = counter % len(healthy_instances)
+        rotation = healthy_instances[first:] + healthy_instances[:first]
+        ramp = self.slow_start[pool]
+        weights = ramp.weights(urls)
+        start = timers.lap("get_least_loaded_instance:weights", start)
+        selected_instance = ramp.pick(rotation, weights)
+        timers.lap("get_least_loaded_instance:pick", start)
+        return selected_instance
+
+    def get_next_instance(self, request_type):
+        """Get the next available instance based on request type with load statistics"""
+        try:
+            timers = profiling.TIMERS
+            start = timers.start()
+            snapshot = self.registry.snapshot()  # one consistent membership view per decision
+            start = timers.lap("get_next_instance:snapshot", start)
+            self.total_requests += 1
+            if request_type == "Database Request":
+                instance = self.get_least_loaded_instance(snapshot.urls("Database"), self.db_counter, "Database")
+                start = timers.lap("get_next_instance:select", start)
+                self.db_counter += 1
+                self.server_load["Database"][instance] += 1  # Increment load
+            elif request_type == "Web Request":
+                instance = self.get_least_loaded_instance(snapshot.urls("Web"), self.web_counter, "Web")
+                start = timers.lap("get_next_instance:select", start)
+                self.web_counter += 1
+                self.server_load["Web"][instance] += 1  # Increment load
+            else:  # File Request
+                instance = "http://localhost:8704"  # Directly redirect to file load balancer
+                self.server_load["File"][instance] += 1  # Increment load
+            timers.lap("get_next_instance:bookkeeping", start)
+            return instance
+        except Exception as e:
+            return None
@@ -0,0 +1,164 @@
+import asyncio
+import math
+import os
+import random
+import time
+
+import background_loop
+
+
+class UniformModel:
+    """Service time drawn uniformly from [low, high] seconds (the original simulate_server_load)"""
+
+    def __init__(self, low=0.1, high=2.0):
+        self.low = float(low)
+        self.high = float(high)
+
+    def sample(self, rng):
+        return rng.uniform(self.low, self.high)
+
+
+class ConstantModel:
+    """Every request takes the same time"""
+
+    def __init__(self, seconds=0.5):
+        self.seconds = float(seconds)
+
+    def sample(self, rng):
+        return self.seconds
+
+
+class ExponentialModel:
+    """Memoryless service times with the given mean"""
+
+    def __init__(self, mean=0.5):
+        self.mean = float(mean)
+
+    def sample(self, rng):
+        return rng.expovariate(1 / self.mean)
+
+
+class LogNormalModel:
+    """Heavy-tailed service times; `median` in seconds, `sigma` is the spread of log(time)"""
+
+    def __init__(self, median=0.3, sigma=0.8):
+        self.mu = math.log(float(median))
+        self.sigma = float(sigma)
+
+    def sample(self, rng):
+        return rng.lognormvariate(self.mu, self.sigma)
+
+
+class BimodalModel:
+    """
+    Mostly fast requests with occasional long stalls, like a garbage-collection pause.
+
+    A request is fast (exponential with `fast_mean`) and, with probability
+    `pause_probability`, additionally stalls for 0.5x-1.5x `pause` seconds.
+    """
+
+    def __init__(self, fast_mean=0.15, pause=1.5, pause_probability=0.05):
+        self.fast_mean = float(fast_mean)
+        self.pause = float(pause)
+        self.pause_probability = float(pause_probability)
+
+    def sample(self, rng):
+        seconds = rng.expovariate(1 / self.fast_mean)
+        if rng.random() < self.pause_probability:
+            seconds += self.pause * rng.uniform(0.5, 1.5)
+        return seconds
+
+
+class TraceModel:
+    """Replays recorded service times (seconds, one per line) in order, wrapping around"""
+
+    def __init__(self, path):
+        with open(path) as f:
+            self.samples = [float(line.split(',')[0]) for line in f if line.strip()]
+        if not self.samples:
+            raise ValueError(f"Trace {path} has no samples")
+        self.position = 0
+
+    def sample(self, rng):
+        seconds = self.samples[self.position]
+        self.position = (self.position + 1) % len(self.samples)
+        return seconds
+
+
+MODELS = {
+    'uniform': UniformModel,
+    'constant': ConstantModel,
+    'exponential': ExponentialModel,
+    'lognormal': LogNormalModel,
+    'bimodal': BimodalModel,
+    'trace': TraceModel,
+}
+
+
+def parse_model_spec(spec):
+    """Build a model from "name:key=value,key=value", e.g. "lognormal:median=0.2,sigma=1.0" """
+    name, _, params = spec.partition(':')
+    if name not in MODELS:
+        raise ValueError(f"Unknown load model {name!r}, expected one of {', '.join(MODELS)}")
+    kwargs = dict(pair.split('=', 1) for pair in params.split(',') if pair)
+    return MODELS[name](**kwargs)
+
+
+class LoadSimulator:
+    """
+    Emulates a server with a fixed number of workers on the background event loop.
+
+    Requests beyond `workers` wait for a free worker, so concurrent sessions see
+    queueing as well as service time. The simulated work runs on the loop, so
+    it overlaps whatever the caller does meanwhile (the real fetch); a caller
+    that then waits on the future, as the web page does, still waits for the
+    whole queue wait and service time, like a client of a busy server.
+    """
+
+    def __init__(self, model, workers=4, seed=None):
+        self.model = model
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.in_flight = 0
+        self.completed = 0
+        self._semaphore = None
+
+    async def serve(self):
+        """Occupy a worker for one sampled service time; returns (service_time, queue_wait)"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        queued = time.perf_counter()
+        async with self._semaphore:
+            queue_wait = time.perf_counter() - queued
+            service_time = self.model.sample(self.rng)
+            self.in_flight += 1
+            try:
+                await asyncio.sleep(service_time)
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+        return service_time, queue_wait
+
+    def submit(self):
+        """Start a simulated request and return a future for its (service_time, queue_wait)"""
+        return background_loop.submit(self.serve())
+
+
+# Simulators survive Streamlit reruns, one per instance in the process
+_simulators = {}
+
+
+def get_simulator(instance_number=0):
+    """
+    The process-wide simulator configured from WEB_LOAD_MODEL, WEB_LOAD_WORKERS and WEB_LOAD_SEED.
+
+    The seed is offset by the instance number so instances differ but stay reproducible.
+    """
+    if instance_number not in _simulators:
+        model = parse_model_spec(os.environ.get('WEB_LOAD_MODEL', 'uniform'))
+        workers = int(os.environ.get('WEB_LOAD_WORKERS', 4))
+        seed = os.environ.get('WEB_LOAD_SEED')
+        _simulators[instance_number] = LoadSimulator(
+            model, workers, None if seed is None else int(seed) + instance_number
+        )
+    return _simulators[instance_number]
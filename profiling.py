@@ -0,0 +1,194 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Collapsed-stack files from the sampling profiler go here unless a path is given
+PROFILE_DIR = os.environ.get('LB_PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+
+DEFAULT_PROFILE_SECONDS = 10
+SAMPLE_INTERVAL = 0.005  # 200 samples per second
+MAX_PROFILE_SECONDS = 300
+
+# Phase timers cost a clock read and a dict update per phase on the routing path, so they start off
+# unless LB_PHASE_TIMERS=1; the dashboard and POST /debug/phases can switch them at runtime
+PHASE_TIMERS_ENABLED = os.environ.get('LB_PHASE_TIMERS') == '1'
+
+
+class PhaseTimers:
+    """
+    Count, total and worst time of each named phase of the routing code.
+
+        start = profiling.TIMERS.start()
+        ...
+        start = profiling.TIMERS.lap("get_next_instance:select", start)
+
+    lap() reads the clock once and returns it as the next phase's start, so
+    consecutive phases cost one clock read each. While `enabled` is false
+    both return 0 without reading the clock, and a lap whose start is 0 (a
+    phase begun before the timers were switched on) is not recorded.
+    Updates are not locked: a rare lost increment between threads is an
+    acceptable price for staying off the routing path's critical section.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._phases = {}  # name -> [count, total ns, max ns]
+        self.since = time.time()
+
+    def start(self):
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def lap(self, name, start):
+        if not self.enabled or not start:
+            return 0
+        now = time.perf_counter_ns()
+        elapsed = now - start
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases.setdefault(name, [0, 0, 0])
+        phase[0] += 1
+        phase[1] += elapsed
+        if elapsed > phase[2]:
+            phase[2] = elapsed
+        return now
+
+    def snapshot(self):
+        """{phase: {count, total_ms, mean_us, max_us}}, slowest total first"""
+        phases = sorted(self._phases.items(), key=lambda item: -item[1][1])
+        return {
+            name: {"count": count, "total_ms": round(total / 1e6, 3),
+                   "mean_us": round(total / count / 1e3, 2) if count else 0.0, "max_us": round(worst / 1e3, 2)}
+            for name, (count, total, worst) in phases
+        }
+
+    def reset(self):
+        self._phases = {}
+        self.since = time.time()
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for every thread of the process.
+
+    A background thread reads each thread's stack every `interval` seconds
+    for `seconds`, then writes one "frame;frame;frame count" line per
+    distinct stack: the collapsed format flamegraph.pl, speedscope and
+    inferno read. Sampling only looks at frames, so it costs the profiled
+    threads nothing beyond the GIL the sampler holds while it looks.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_path = None
+        self.running_until = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds=DEFAULT_PROFILE_SECONDS, path=None, interval=SAMPLE_INTERVAL):
+        """Profile for `seconds` in the background; returns the path the stacks will be written to"""
+        seconds = min(float(seconds), MAX_PROFILE_SECONDS)
+        with self._lock:
+            if self.running:
+                raise RuntimeError(f"A profile is already running until {time.ctime(self.running_until)}")
+            if path is None:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                path = os.path.join(PROFILE_DIR, time.strftime(f"profile-%Y%m%d-%H%M%S-{os.getpid()}.collapsed"))
+            self.running_until = time.time() + seconds
+            self._thread = threading.Thread(target=self._run, args=(seconds, path, interval),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return path
+
+    def _run(self, seconds, path, interval):
+        own = threading.get_ident()
+        names = {}
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stacks[(names.get(ident, str(ident)),) + _stack(frame)] += 1
+            time.sleep(interval)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        os.replace(path + '.tmp', path)
+        self.last_path = path
+
+    def status(self):
+        return {"running": self.running, "until": self.running_until if self.running else None,
+                "last_path": self.last_path}
+
+
+def _stack(frame):
+    """Outermost-first frame labels; ';' and spaces would break the collapsed format"""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{os.path.basename(code.co_filename)}:{code.co_name}".replace(';', ':').replace(' ', '_'))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+class DebugAPI:
+    """
+    Routing diagnostics over HTTP (served with the backend admin API):
+
+        GET  /debug/phases            phase timers of the routing code
+        POST /debug/phases            {"enabled"}: switch the phase timers on or off
+        POST /debug/phases/reset
+        POST /debug/profile           {"seconds"?}: start the sampling profiler
+        GET  /debug/profile           whether it runs, and the last file written
+    """
+
+    def __init__(self, timers=None, profiler=None):
+        self.timers = timers or TIMERS
+        self.profiler = profiler or PROFILER
+
+    def routes(self):
+        return {
+            ('GET', '/debug/phases'): self.phases,
+            ('POST', '/debug/phases'): self.switch_phases,
+            ('POST', '/debug/phases/reset'): self.reset_phases,
+            ('GET', '/debug/profile'): self.profile_status,
+            ('POST', '/debug/profile'): self.start_profile,
+        }
+
+    async def phases(self, request):
+        return 200, {"enabled": self.timers.enabled, "since": self.timers.since, "phases": self.timers.snapshot()}
+
+    async def switch_phases(self, request):
+        payload = await request.json() or {}
+        enabled = payload.get('enabled')
+        if not isinstance(enabled, bool):
+            raise ValueError("'enabled' must be true or false")
+        self.timers.enabled = enabled
+        return 200, {"enabled": enabled}
+
+    async def reset_phases(self, request):
+        self.timers.reset()
+        return 200, {"since": self.timers.since}
+
+    async def profile_status(self, request):
+        return 200, self.profiler.status()
+
+    async def start_profile(self, request):
+        payload = await request.json() or {}
+        try:
+            path = self.profiler.start(payload.get('seconds', DEFAULT_PROFILE_SECONDS))
+        except RuntimeError as e:
+            return 409, {"error": str(e)}
+        return 202, {"path": path, "until": self.profiler.running_until}
+
+
+# Process-wide: every balancer in the process reports into the same timers
+TIMERS = PhaseTimers(enabled=PHASE_TIMERS_ENABLED)
+PROFILER = SamplingProfiler()
@@ -0,0 +1,87 @@
+import sys
+import threading
+from collections import OrderedDict
+
+# Default memory budget for cached query results
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def estimate_size(value):
+    """Rough in-memory size of a cached result in bytes"""
+    if hasattr(value, 'memory_usage'):  # pandas DataFrame
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """
+    LRU cache of query results tagged with the data version they were computed at.
+
+    A lookup only hits when the stored version equals the current one, so any
+    committed write invalidates every result computed before it.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (version, value, size)
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, version, compute):
+        """Return the cached result for key at version, running compute() on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+        self._store(key, version, value)
+        return value
+
+    def _store(self, key, version, value):
+        size = estimate_size(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            if size > self.max_bytes:
+                return  # larger than the whole budget, never worth caching
+            self._entries[key] = (version, value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and memory use for display"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# Process-wide cache shared by every session of a database instance
+RESULT_CACHE = QueryCache()
@@ -0,0 +1,177 @@
+import math
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+# Per-client limit across all request types, then per request type (requests/second, burst)
+CLIENT_LIMIT = (10.0, 20)
+REQUEST_TYPE_LIMITS = {
+    "Database Request": (5.0, 10),
+    "Web Request": (5.0, 10),
+    "File Request": (1.0, 3),
+}
+
+# Bounds each table; a bucket costs under 100 bytes plus its key
+DEFAULT_MAX_ENTRIES = 500_000
+DEFAULT_IDLE_SECONDS = 300.0
+
+# Slots examined per insert: idle ones are freed, and when the table is full
+# the least recently used of them makes room (sampled LRU, O(1) per insert)
+SWEEP_SLOTS = 2
+EVICTION_SAMPLES = 8
+
+Decision = namedtuple('Decision', 'allowed retry_after scope')
+
+
+class RateLimited(Exception):
+    def __init__(self, decision):
+        super().__init__(f"Rate limit exceeded ({decision.scope}), retry in {decision.retry_after:.1f}s")
+        self.decision = decision
+
+
+class TokenBucketTable:
+    """
+    Token buckets for many keys in flat arrays.
+
+    Buckets are refilled lazily from the time since their last use, so an
+    idle key costs nothing. Tokens and timestamps live in two array('d')
+    columns indexed through one dict, far smaller than an object per bucket.
+    """
+
+    def __init__(self, rate, burst, max_entries=DEFAULT_MAX_ENTRIES, idle_seconds=DEFAULT_IDLE_SECONDS):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self._index = {}  # key -> slot
+        self._keys = []  # slot -> key, None for a free slot
+        self._tokens = array('d')
+        self._last = array('d')
+        self._free = []
+        self._hand = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._index)
+
+    def _release(self, slot):
+        del self._index[self._keys[slot]]
+        self._keys[slot] = None
+        self.evictions += 1
+
+    def _sweep(self, now):
+        """Free idle slots just ahead of the clock hand"""
+        slots = len(self._keys)
+        for _ in range(min(SWEEP_SLOTS, slots)):
+            slot = self._hand
+            self._hand = (self._hand + 1) % slots
+            if self._keys[slot] is not None and now - self._last[slot] >= self.idle_seconds:
+                self._release(slot)
+                self._free.append(slot)
+
+    def _evict(self):
+        """Reuse the least recently used of a few slots ahead of the clock hand"""
+        slots = len(self._keys)
+        victim = None
+        for _ in range(min(EVICTION_SAMPLES, slots)):
+            slot = self._hand
+            self._hand = (self._hand + 1) % slots
+            if victim is None or self._last[slot] < self._last[victim]:
+                victim = slot
+        self._release(victim)
+        return victim
+
+    def _slot(self, key, now):
+        slot = self._index.get(key)
+        if slot is not None:
+            return slot
+        if self._keys:
+            self._sweep(now)
+        if self._free:
+            slot = self._free.pop()
+        elif len(self._keys) < self.max_entries:
+            slot = len(self._keys)
+            self._keys.append(None)
+            self._tokens.append(0.0)
+            self._last.append(0.0)
+        else:
+            slot = self._evict()
+        # A new (or forgotten) key starts with a full bucket
+        self._keys[slot] = key
+        self._tokens[slot] = self.burst
+        self._last[slot] = now
+        self._index[key] = slot
+        return slot
+
+    def available(self, key, now):
+        """Refill the key's bucket up to `now`; returns (slot, tokens)"""
+        slot = self._slot(key, now)
+        tokens = min(self.burst, self._tokens[slot] + (now - self._last[slot]) * self.rate)
+        self._tokens[slot] = tokens
+        self._last[slot] = now
+        return slot, tokens
+
+    def take(self, slot, cost=1.0):
+        self._tokens[slot] -= cost
+
+    def retry_after(self, tokens, cost=1.0):
+        """Seconds until a bucket holding `tokens` can pay `cost`"""
+        return max(0.0, (cost - tokens) / self.rate) if self.rate else math.inf
+
+    def allow(self, key, cost=1.0, now=None):
+        slot, tokens = self.available(key, time.monotonic() if now is None else now)
+        if tokens < cost:
+            return False, self.retry_after(tokens, cost)
+        self.take(slot, cost)
+        return True, 0.0
+
+
+class RateLimiter:
+    """
+    Per-client limits in front of routing: one bucket per client across all
+    request types, and one per client and request type.
+
+    A request is allowed only if both buckets have a token, and then both pay,
+    so a client rejected for one type keeps its budget for the others.
+    """
+
+    def __init__(self, client_limit=CLIENT_LIMIT, type_limits=REQUEST_TYPE_LIMITS,
+                 max_entries=DEFAULT_MAX_ENTRIES, idle_seconds=DEFAULT_IDLE_SECONDS, clock=time.monotonic):
+        self.clients = TokenBucketTable(*client_limit, max_entries=max_entries, idle_seconds=idle_seconds)
+        self.types = {
+            request_type: TokenBucketTable(rate, burst, max_entries=max_entries, idle_seconds=idle_seconds)
+            for request_type, (rate, burst) in type_limits.items()
+        }
+        self.clock = clock
+        self.allowed = 0
+        self.limited = 0
+        self._lock = threading.Lock()
+
+    def check(self, client, request_type, cost=1.0):
+        """Decision(allowed, retry_after seconds, scope 'client'/'type'/None) for one request"""
+        with self._lock:
+            now = self.clock()
+            client_slot, client_tokens = self.clients.available(client, now)
+            table = self.types.get(request_type)
+            if table is not None:
+                type_slot, type_tokens = table.available(client, now)
+                if type_tokens < cost:
+                    self.limited += 1
+                    return Decision(False, table.retry_after(type_tokens, cost), 'type')
+            if client_tokens < cost:
+                self.limited += 1
+                return Decision(False, self.clients.retry_after(client_tokens, cost), 'client')
+            self.clients.take(client_slot, cost)
+            if table is not None:
+                table.take(type_slot, cost)
+            self.allowed += 1
+            return Decision(True, 0.0, None)
+
+    def stats(self):
+        return {
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "clients": len(self.clients),
+            "evictions": self.clients.evictions + sum(t.evictions for t in self.types.values()),
+        }
@@ -0,0 +1,59 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from latency_histogram import LatencyHistogram
+
+# Latency is reported over the last one to two windows, so old traffic ages out
+WINDOW_SECONDS = 10
+
+
+class RequestStats:
+    """In-flight count and rolling p99 of a server's requests, for its /health report"""
+
+    def __init__(self, window_seconds=WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.in_flight = 0
+        self.requests = 0
+        self._current = LatencyHistogram()
+        self._previous = LatencyHistogram()
+        self._window_started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _rotate(self, now):
+        elapsed = now - self._window_started
+        if elapsed < self.window_seconds:
+            return
+        # After a quiet spell longer than a window the previous window is stale too
+        self._previous = self._current if elapsed < 2 * self.window_seconds else LatencyHistogram()
+        self._current = LatencyHistogram()
+        self._window_started = now
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, latency_ms):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self._rotate(time.monotonic())
+            self._current.record(latency_ms)
+
+    @contextmanager
+    def track(self):
+        start = time.perf_counter()
+        self.begin()
+        try:
+            yield
+        finally:
+            self.end((time.perf_counter() - start) * 1000)
+
+    def p99_ms(self):
+        with self._lock:
+            self._rotate(time.monotonic())
+            window = LatencyHistogram.merged([self._previous, self._current])
+        return window.percentile(99)
+
+    def snapshot(self):
+        return {"in_flight": self.in_flight, "requests": self.requests, "p99_ms": round(self.p99_ms(), 2)}
@@ -0,0 +1,369 @@
+"""
+Request traces: every routing decision in a compact binary log, and a replay tool.
+
+    python request_trace.py show traces/proxy.trace --tail 20
+    python request_trace.py replay traces/proxy.trace --speed 10
+    python request_trace.py replay traces/dashboard.trace --speed max --target http://localhost:8610
+
+Set LB_TRACE_DIR to record: the proxy writes proxy.trace and the dashboard
+dashboard.trace there. Recording costs well under a microsecond per request.
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, deque, namedtuple
+
+from latency_histogram import LatencyHistogram, format_percentiles
+
+TRACE_DIR = os.environ.get('LB_TRACE_DIR')
+
+# File layout: a header, then fixed-width little-endian records
+MAGIC = b'LBTR'
+VERSION = 2
+HEADER = struct.Struct('<4sHHq')  # magic, version, record size, created (ns since the epoch)
+RECORD = struct.Struct('<qIIIIHBB')  # time ns, latency us, client, backend, target, status, type, outcome
+
+# Backend URLs and request targets are stored once in "<trace>.strings" and referenced by number
+STRINGS_SUFFIX = '.strings'
+
+# A trace is rotated once it holds this many distinct strings, so the table's memory stays bounded
+MAX_STRINGS = 1_000_000
+
+REQUEST_TYPES = ("", "Database Request", "Web Request", "File Request")
+OUTCOMES = ("ok", "error", "timeout", "rejected", "rate_limited", "no_backend")
+
+# Records are packed and written by a background thread this often, in one write per batch
+FLUSH_SECONDS = 0.25
+
+# Decisions waiting for the writer; past this the oldest are dropped (and counted) at the next write
+MAX_PENDING = 262_144
+
+# Past this size the trace is moved to "<trace>.1" (replacing the previous one) and a new one begins
+MAX_BYTES = 256 * 2**20
+
+# What a replay sends for records without a target (dashboard decisions), by request type
+DEFAULT_TARGETS = {
+    "Database Request": "GET /database/entries",
+    "Web Request": "GET /web/",
+    "File Request": "GET /file/health",
+}
+DEFAULT_REPLAY_TARGET = "http://localhost:8610"
+
+TraceRecord = namedtuple('TraceRecord', 'time_ns latency_us client backend target status request_type outcome')
+
+
+def outcome_for(status, backend):
+    """Outcome code for a forwarded request's status (and whether a backend answered it)"""
+    if status == 429:
+        return OUTCOMES.index("rate_limited")
+    if status == 504:
+        return OUTCOMES.index("timeout")
+    if status == 503 and backend is None:
+        return OUTCOMES.index("rejected")
+    return OUTCOMES.index("error" if status >= 500 else "ok")
+
+
+class TraceRecorder:
+    """
+    Appends one fixed-width record per routing decision.
+
+    record() only timestamps the decision and appends it to a deque (atomic
+    under the GIL, so no lock on the request path); a background thread
+    interns the strings, packs the records and appends them to the file with
+    one write per batch. Strings are stored once, so a record never grows.
+    """
+
+    def __init__(self, path, flush_seconds=FLUSH_SECONDS, max_bytes=MAX_BYTES, max_pending=MAX_PENDING):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._pending = deque()
+        self.max_pending = max_pending
+        self._types = {name: code for code, name in enumerate(REQUEST_TYPES)}
+        self._clients = {}
+        self._lock = threading.Lock()  # serialises writers of the file, never record()
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0  # batches the writer failed to write (their records count as dropped)
+        self.last_error = None
+        self._open()
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._write_periodically, args=(flush_seconds,), daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size == 0:
+            os.write(self._fd, HEADER.pack(MAGIC, VERSION, RECORD.size, time.time_ns()))
+        else:
+            with open(self.path, 'rb') as f:
+                check_header(f.read(HEADER.size), self.path)
+        self._strings = {string: number for number, string in enumerate(read_strings(self.path))}
+        self._strings_file = open(self.path + STRINGS_SUFFIX, 'a', encoding='utf-8')
+
+    def record(self, request_type, backend, latency_seconds, outcome, status=0, target='', client=''):
+        """Log one decision; `outcome` is an OUTCOMES index"""
+        self._pending.append((time.time_ns(), latency_seconds, client, backend, target, status, request_type, outcome))
+
+    def _intern(self, string):
+        number = self._strings.get(string)
+        if number is None:
+            number = len(self._strings)
+            self._strings[string] = number
+            self._strings_file.write(json.dumps(string) + '\n')
+        return number
+
+    def _client_hash(self, client):
+        if not client:
+            return 0
+        value = self._clients.get(client)
+        if value is None:
+            if len(self._clients) > 100_000:
+                self._clients.clear()
+            value = self._clients[client] = zlib.crc32(client.encode())
+        return value
+
+    def flush(self):
+        """Write every pending record"""
+        with self._lock:
+            if self._fd is None:
+                return
+            pending = self._pending
+            count = len(pending)
+            if not count:
+                return
+            if count > self.max_pending:
+                # The writer fell behind: drop the oldest decisions rather than hold them all
+                for _ in range(count - self.max_pending):
+                    pending.popleft()
+                self.dropped += count - self.max_pending
+                count = self.max_pending
+            if len(self._strings) >= MAX_STRINGS:
+                # One batch adds at most max_pending strings, so ids stay far below 2**32
+                self._rotate()
+            batch = [pending.popleft() for _ in range(count)]
+            buffer = bytearray(count * RECORD.size)
+            intern, types = self._intern, self._types
+            try:
+                for offset, fields in zip(range(0, len(buffer), RECORD.size), batch):
+                    time_ns, latency, client, backend, target, status, request_type, outcome = fields
+                    RECORD.pack_into(buffer, offset, time_ns, min(int(latency * 1e6), 0xFFFFFFFF),
+                                     self._client_hash(client), intern(backend or ''), intern(target),
+                                     min(int(status), 0xFFFF), types.get(request_type, 0), outcome)
+            except Exception:
+                self.dropped += count
+                raise
+            # Strings reach the file before any record that refers to them
+            self._strings_file.flush()
+            os.write(self._fd, buffer)
+            self.written += count
+            if os.fstat(self._fd).st_size >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        os.close(self._fd)
+        self._strings_file.close()
+        os.replace(self.path, self.path + '.1')
+        os.replace(self.path + STRINGS_SUFFIX, self.path + '.1' + STRINGS_SUFFIX)
+        self._open()
+
+    def stats(self):
+        return {"written": self.written, "pending": len(self._pending), "dropped": self.dropped,
+                "errors": self.errors, "last_error": self.last_error}
+
+    def _flush_safely(self):
+        # A batch that cannot be written is counted and skipped; the writer must keep draining
+        try:
+            self.flush()
+        except Exception as e:
+            self.errors += 1
+            self.last_error = repr(e)
+
+    def _write_periodically(self, interval):
+        while not self._stop.wait(interval):
+            self._flush_safely()
+
+    def close(self):
+        self._stop.set()
+        self._flush_safely()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._strings_file.close()
+                self._fd = None
+
+
+def check_header(data, path):
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a request trace")
+    magic, version, record_size, _ = HEADER.unpack(data[:HEADER.size])
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"{path} is not a version {VERSION} request trace")
+
+
+def read_strings(path):
+    try:
+        with open(path + STRINGS_SUFFIX, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def recorder_from_env(component):
+    """A recorder writing <LB_TRACE_DIR>/<component>.trace, or None when tracing is off"""
+    if not TRACE_DIR:
+        return None
+    return TraceRecorder(os.path.join(TRACE_DIR, f"{component}.trace"))
+
+
+class TraceReader:
+    """
+    Random and sequential access to a trace through a read-only memory map.
+
+    Only records complete when the reader opened are visible; a recorder can
+    keep appending meanwhile.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        check_header(self._map[:HEADER.size], path)
+        _, _, _, self.created_ns = HEADER.unpack_from(self._map)
+        self.count = (len(self._map) - HEADER.size) // RECORD.size
+        self.strings = read_strings(path)
+
+    def __len__(self):
+        return self.count
+
+    def _resolve(self, fields):
+        time_ns, latency_us, client, backend, target, status, request_type, outcome = fields
+        return TraceRecord(time_ns, latency_us, client, self.strings[backend] or None, self.strings[target],
+                           status, REQUEST_TYPES[request_type], OUTCOMES[outcome])
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self._resolve(RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size))
+
+    def __iter__(self):
+        view = memoryview(self._map)[HEADER.size:HEADER.size + self.count * RECORD.size]
+        try:
+            for fields in RECORD.iter_unpack(view):
+                yield self._resolve(fields)
+        finally:
+            view.release()
+
+    def close(self):
+        self._map.close()
+
+
+def summarize(reader):
+    """Counts by request type, outcome and backend, plus the decision latency percentiles"""
+    latencies = LatencyHistogram()
+    types, outcomes, backends = Counter(), Counter(), Counter()
+    for record in reader:
+        latencies.record(record.latency_us / 1000)
+        types[record.request_type] += 1
+        outcomes[record.outcome] += 1
+        backends[record.backend] += 1
+    duration = (reader[-1].time_ns - reader[0].time_ns) / 1e9 if len(reader) else 0.0
+    return {"records": len(reader), "seconds": duration, "types": types, "outcomes": outcomes,
+            "backends": backends, "latency": latencies}
+
+
+async def replay(reader, target=DEFAULT_REPLAY_TARGET, speed=1.0, concurrency=256, timeout=30.0):
+    """
+    Re-send the trace's requests to `target` (the balancer proxy), keeping
+    their spacing divided by `speed`, or as fast as possible when speed is
+    None. Each request carries its original client as X-Client-Id, so rate
+    limits apply as they did. Bodies and query strings are not recorded: POSTs
+    go out empty and every request goes to its bare path.
+    """
+    import httpx
+
+    latencies = LatencyHistogram()
+    statuses = Counter()
+    slots = asyncio.Semaphore(concurrency)
+    lag = 0.0
+    tasks = set()
+
+    async def send(client, record):
+        method, _, path = (record.target or DEFAULT_TARGETS.get(record.request_type, "GET /web/")).partition(' ')
+        headers = {'X-Client-Id': f"replay-{record.client:08x}"} if record.client else {}
+        start = time.monotonic()
+        try:
+            response = await client.request(method, target + path, headers=headers)
+            statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+        finally:
+            slots.release()
+        latencies.record((time.monotonic() - start) * 1000)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(max_connections=concurrency)) as client:
+        started = time.monotonic()
+        first_ns = None
+        for record in reader:
+            if first_ns is None:
+                first_ns = record.time_ns
+            if speed:
+                due = started + (record.time_ns - first_ns) / 1e9 / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    lag = max(lag, -delay)
+            await slots.acquire()
+            task = asyncio.ensure_future(send(client, record))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - started
+    return {"sent": len(reader), "seconds": elapsed, "statuses": statuses, "latency": latencies, "max_lag": lag}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and replay request traces")
+    commands = parser.add_subparsers(dest='command', required=True)
+    show = commands.add_parser('show', help="Summarize a trace")
+    show.add_argument('trace')
+    show.add_argument('--tail', type=int, default=0, help="Also print the last N records")
+    play = commands.add_parser('replay', help="Re-drive a local stack with a trace")
+    play.add_argument('trace')
+    play.add_argument('--target', default=DEFAULT_REPLAY_TARGET, help="Balancer proxy to send the requests to")
+    play.add_argument('--speed', default='1', help="Time scale: 1 for real time, 10 for ten times faster, or max")
+    play.add_argument('--concurrency', type=int, default=256, help="Requests in flight at most")
+    args = parser.parse_args()
+
+    reader = TraceReader(args.trace)
+    if args.command == 'show':
+        summary = summarize(reader)
+        print(f"{summary['records']:,} records over {summary['seconds']:.1f}s")
+        print(f"  decision latency: {format_percentiles(summary['latency'])}")
+        for title in ('types', 'outcomes', 'backends'):
+            print(f"  {title}: " + ", ".join(f"{key or '-'} {count:,}" for key, count in summary[title].most_common()))
+        for index in range(max(0, len(reader) - args.tail), len(reader)) if args.tail else ():
+            print(reader[index])
+    else:
+        speed = None if args.speed == 'max' else float(args.speed)
+        result = asyncio.run(replay(reader, args.target, speed, args.concurrency))
+        print(f"Replayed {result['sent']:,} requests in {result['seconds']:.1f}s "
+              f"({result['sent'] / max(result['seconds'], 1e-9):,.0f}/s, max lag {result['max_lag'] * 1000:.0f} ms)")
+        print(f"  latency: {format_percentiles(result['latency'])}")
+        print("  statuses: " + ", ".join(f"{status} {count:,}" for status, count in result['statuses'].most_common()))
+    reader.close()
+
+
+if __name__ == '__main__':
+    main()
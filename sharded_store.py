@@ -0,0 +1,132 @@
+import heapq
+import itertools
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import database_store
+
+# Sharding mode is opt-in so existing deployments keep using shared_database.db
+SHARDING_ENABLED = os.environ.get("DATABASE_SHARDING") == "1"
+
+# One shard per database instance; instance N owns SHARD_PATHS[N - 1] and is its only writer
+# (instances past the shard count share one, round robin). Reads gather from every shard.
+SHARD_COUNT = int(os.environ.get("DATABASE_SHARD_COUNT", 3))
+SHARD_PATHS = [f"database_shard{number}.db" for number in range(1, SHARD_COUNT + 1)]
+
+# Largest SQLite integer, used to build "strictly after this timestamp" cursors
+_MAX_ID = 2 ** 63 - 1
+
+# Scatter-gather reads run one query per shard concurrently
+_executor = ThreadPoolExecutor(max_workers=len(SHARD_PATHS), thread_name_prefix="shard-query")
+
+
+def shard_path_for_instance(instance_number):
+    """Shard file owned by a database instance (1-based, like the instance modules)"""
+    return SHARD_PATHS[(instance_number - 1) % len(SHARD_PATHS)]
+
+
+# The page and the JSON API of instance N run with INSTANCE_NUMBER=N and write only here
+OWN_SHARD_PATH = shard_path_for_instance(int(os.environ.get("INSTANCE_NUMBER", 1)))
+
+
+def _gather(func, *args, **kwargs):
+    """Run func against every shard concurrently and return the results in shard order"""
+    futures = [_executor.submit(func, *args, path=path, **kwargs) for path in SHARD_PATHS]
+    return [future.result() for future in futures]
+
+
+def init_db():
+    """Create or migrate every shard and switch them to WAL so reads never block writers"""
+    for path in SHARD_PATHS:
+        database_store.init_db(path)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+
+
+def add_entry(name, age, instance_id):
+    """Insert an entry into this instance's own shard"""
+    database_store.add_entry(name, age, instance_id, path=OWN_SHARD_PATH)
+
+
+def add_entries(entries, instance_id):
+    """Insert (name, age) pairs into this instance's own shard in one transaction"""
+    database_store.add_entries(entries, instance_id, path=OWN_SHARD_PATH)
+
+
+def data_version():
+    """Combined data version of all shards; changes when any shard is written"""
+    return tuple(database_store.data_version(path) for path in SHARD_PATHS)
+
+
+def get_entry_stats():
+    """Merge the per-shard totals into {instance_id: (entries, age_total)}"""
+    merged = {}
+    for stats in _gather(database_store.get_entry_stats):
+        for instance_id, (entries, age_total) in stats.items():
+            total_entries, total_age = merged.get(instance_id, (0, 0))
+            merged[instance_id] = (total_entries + entries, total_age + age_total)
+    return merged
+
+
+def _shard_cursor(after, shard):
+    """Translate a global (timestamp, shard, id) cursor into a per-shard (timestamp, id) one"""
+    if after is None:
+        return None
+    timestamp, after_shard, after_id = after
+    if shard < after_shard:
+        return (timestamp, _MAX_ID)  # everything at this timestamp was already shown
+    if shard > after_shard:
+        return (timestamp, 0)  # ids start at 1, so this includes the whole timestamp
+    return (timestamp, after_id)
+
+
+def get_entries_page(after=None, limit=database_store.PAGE_SIZE, instance_id=None):
+    """
+    Keyset pagination across all shards ordered by (timestamp, shard, id).
+
+    Each shard returns at most one page past the cursor and the sorted pages are
+    merged, so the cost stays one indexed seek per shard regardless of table size.
+    """
+    # One extra row per shard so the merge can tell whether another page exists
+    futures = [
+        _executor.submit(database_store.get_entries_page, after=_shard_cursor(after, shard),
+                         limit=limit + 1, instance_id=instance_id, path=path)
+        for shard, path in enumerate(SHARD_PATHS)
+    ]
+    shard_rows = []
+    for shard, future in enumerate(futures):
+        rows, _ = future.result()
+        shard_rows.append([dict(row, shard=shard) for row in rows])
+
+    merged = heapq.merge(*shard_rows, key=lambda row: (row["timestamp"], row["shard"], row["id"]))
+    rows = [row for _, row in zip(range(limit + 1), merged)]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = (last["timestamp"], last["shard"], last["id"])
+    return rows, next_cursor
+
+
+class BulkWriter(database_store.BulkWriter):
+    """Bulk inserts into this instance's own shard"""
+
+    def __init__(self, transaction_rows=database_store.BULK_TRANSACTION_ROWS):
+        super().__init__(OWN_SHARD_PATH, transaction_rows)
+
+
+def iter_entries(chunk_size=database_store.BULK_BATCH_SIZE, instance_id=None):
+    """Stream entries from all shards merged by (timestamp, id), chunk_size rows at a time"""
+    streams = [
+        itertools.chain.from_iterable(database_store.iter_entries(chunk_size, instance_id, path=path))
+        for path in SHARD_PATHS
+    ]
+    merged = heapq.merge(*streams, key=lambda row: (row[3], row[0]))
+    while True:
+        rows = list(itertools.islice(merged, chunk_size))
+        if not rows:
+            break
+        yield rows
@@ -0,0 +1,186 @@
+import argparse
+import atexit
+import os
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from latency_histogram import LatencyHistogram, bucket_count_for, DEFAULT_MAX_VALUE_MS
+
+# Name of the shared-memory segment used by the local web instances
+DEFAULT_NAME = "lb_web_metrics"
+
+# Fixed layout: a header, then MAX_SLOTS slots of int64 words, one slot per instance
+MAX_SLOTS = 64
+LAYOUT_MAGIC = 0x4C424D54  # "LBMT"
+LAYOUT_VERSION = 1
+PHASES = ('dns', 'connect', 'ttfb', 'total')
+BUCKETS = bucket_count_for(DEFAULT_MAX_VALUE_MS)
+
+# Header words
+HEADER_MAGIC, HEADER_VERSION, HEADER_SLOTS, HEADER_BUCKETS = range(4)
+HEADER_WORDS = 4
+
+# Slot words; the phase histograms follow the scalar counters
+SEQUENCE, REQUESTS, ERRORS, IN_FLIGHT, UPDATED_NS = range(5)
+SCALAR_WORDS = 5
+SLOT_WORDS = SCALAR_WORDS + len(PHASES) * BUCKETS
+
+
+class SharedMetricsTable:
+    """
+    Per-instance request counters and latency histograms in shared memory.
+
+    Every local web instance maps the same segment and owns one slot, so readers
+    see all instances' load with plain memory reads. Each slot has a single
+    writer process (threads within it serialise on a lock) and a sequence
+    counter: odd while an update is in progress, so readers retry instead of
+    seeing half-applied updates.
+
+    On POSIX the segment outlives every process until it is unlinked. On
+    Windows a named segment is freed when the last process holding it exits,
+    so the counters reset whenever every web instance has stopped.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, max_slots=MAX_SLOTS):
+        size = 8 * (HEADER_WORDS + max_slots * SLOT_WORDS)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            created = True
+        except FileExistsError:
+            self.shm = shared_memory.SharedMemory(name=name)
+            created = False
+        # Instances come and go; the segment must outlive whichever one created it. Only POSIX
+        # tracks shared memory (and would unlink it when the creator exits)
+        if os.name == 'posix':
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        self.words = self.shm.buf.cast('q')
+        if created:
+            self.words[HEADER_SLOTS] = max_slots
+            self.words[HEADER_BUCKETS] = BUCKETS
+            self.words[HEADER_VERSION] = LAYOUT_VERSION
+            self.words[HEADER_MAGIC] = LAYOUT_MAGIC  # written last: marks the layout as ready
+        else:
+            deadline = time.monotonic() + 1
+            while self.words[HEADER_MAGIC] != LAYOUT_MAGIC and time.monotonic() < deadline:
+                time.sleep(0.001)
+            if (self.words[HEADER_MAGIC], self.words[HEADER_VERSION], self.words[HEADER_BUCKETS]) != \
+                    (LAYOUT_MAGIC, LAYOUT_VERSION, BUCKETS):
+                raise RuntimeError(f"Shared memory segment {name!r} has an incompatible layout")
+        self.max_slots = self.words[HEADER_SLOTS]
+        self._lock = threading.Lock()
+        # Histogram views straight over the shared counters, built once per slot and phase
+        self._histograms = {}
+        self._claimed = set()
+
+    def _base(self, slot):
+        if not 0 <= slot < self.max_slots:
+            raise IndexError(f"slot {slot} out of range (max {self.max_slots})")
+        return HEADER_WORDS + slot * SLOT_WORDS
+
+    def histogram(self, slot, phase):
+        """A LatencyHistogram whose counts live in the slot's shared memory (no copy)"""
+        key = (slot, phase)
+        if key not in self._histograms:
+            start = self._base(slot) + SCALAR_WORDS + PHASES.index(phase) * BUCKETS
+            self._histograms[key] = LatencyHistogram(counts=self.words[start:start + BUCKETS])
+        return self._histograms[key]
+
+    def _write(self, slot, update):
+        base = self._base(slot)
+        with self._lock:
+            self.words[base + SEQUENCE] += 1  # odd: update in progress
+            update(base)
+            self.words[base + UPDATED_NS] = time.time_ns()
+            self.words[base + SEQUENCE] += 1  # even: consistent again
+
+    def begin_request(self, slot):
+        def update(base):
+            self.words[base + IN_FLIGHT] += 1
+        self._write(slot, update)
+
+    def end_request(self, slot, latencies=None, error=False):
+        """Finish a request: count it and record {phase: ms} into the slot's histograms"""
+        def update(base):
+            self.words[base + IN_FLIGHT] -= 1
+            self.words[base + REQUESTS] += 1
+            if error:
+                self.words[base + ERRORS] += 1
+            for phase, value_ms in (latencies or {}).items():
+                self.histogram(slot, phase).record(value_ms)
+        self._write(slot, update)
+
+    def read(self, slot, field):
+        """Consistent read of one counter; retries while the owning process is mid-update"""
+        base = self._base(slot)
+        words = self.words
+        while True:
+            sequence = words[base + SEQUENCE]
+            value = words[base + field]
+            if not sequence & 1 and words[base + SEQUENCE] == sequence:
+                return value
+
+    def requests(self, slot):
+        return self.read(slot, REQUESTS)
+
+    def in_flight(self, slot):
+        return self.read(slot, IN_FLIGHT)
+
+    def least_loaded(self, slots):
+        """Slot with the fewest requests served, across every process sharing the table"""
+        return min(slots, key=self.requests)
+
+    def reset(self, slot):
+        def update(base):
+            for offset in range(SEQUENCE + 1, SLOT_WORDS):
+                self.words[base + offset] = 0
+        self._write(slot, update)
+
+    def claim(self, slot):
+        """Reset a slot the first time this process uses it, dropping a previous owner's counters"""
+        if not 0 <= slot < self.max_slots:
+            raise ValueError(f"Slot {slot} does not fit the shared metrics table ({self.max_slots} slots); "
+                             f"instance numbers must stay within 1..{self.max_slots}")
+        if slot not in self._claimed:
+            self._claimed.add(slot)
+            self.reset(slot)
+
+    def close(self):
+        """Release every view over the segment and unmap it; the segment itself stays"""
+        for histogram in self._histograms.values():
+            histogram.counts.release()
+        self._histograms.clear()
+        self.words.release()
+        self.shm.close()
+
+
+_tables = {}
+
+
+def get_table(name=DEFAULT_NAME):
+    """The process-wide handle on a shared table, attached on first use"""
+    if name not in _tables:
+        _tables[name] = table = SharedMetricsTable(name)
+        atexit.register(table.close)
+    return _tables[name]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect or remove the shared web metrics table")
+    parser.add_argument('--name', default=DEFAULT_NAME)
+    parser.add_argument('--slots', type=int, default=3, help="Number of slots to print")
+    parser.add_argument('--unlink', action='store_true', help="Remove the segment")
+    args = parser.parse_args()
+    table = SharedMetricsTable(args.name)
+    if args.unlink:
+        if os.name == 'posix':
+            resource_tracker.register(table.shm._name, "shared_memory")  # unlink() unregisters it again
+        table.shm.unlink()
+        print(f"Removed {args.name}")
+    else:
+        for slot in range(args.slots):
+            total = table.histogram(slot, 'total')
+            print(f"slot {slot}: {table.requests(slot)} requests, {table.in_flight(slot)} in flight, "
+                  f"p99 {total.percentile(99):.1f} ms")
+    table.close()
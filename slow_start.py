@@ -0,0 +1,124 @@
+import os
+import statistics
+import time
+
+# Seconds a new or recovered backend takes to reach its full share; 0 turns slow start off
+SLOW_START_SECONDS = float(os.environ.get('LB_SLOW_START_SECONDS', 30))
+
+# Share of its normal traffic a backend gets at the start of its ramp
+MIN_WEIGHT = 0.1
+
+# The ramp pauses while the backend's latency is this many times its peers' median
+LATENCY_FACTOR = 2.0
+
+# Weight of the newest latency sample in each backend's moving average
+LATENCY_ALPHA = 0.3
+
+
+class SlowStart:
+    """
+    Slow-start ramp for the backends of one pool.
+
+    A backend that joins the pool, or turns healthy again, starts at
+    MIN_WEIGHT and ramps linearly to full weight over `window` seconds. The
+    ramp only advances while the backend's latency stays within
+    LATENCY_FACTOR of its full-weight peers, so a backend that slows down as
+    traffic arrives is held at its current share until it copes.
+
+    Strategies apply the weight through take_turn(): a backend at weight w
+    accepts about w of the requests the strategy would otherwise send it, and
+    the rest go to the next choice.
+    """
+
+    def __init__(self, window=SLOW_START_SECONDS, min_weight=MIN_WEIGHT, latency_factor=LATENCY_FACTOR,
+                 on_ramp=None, clock=time.monotonic):
+        self.window = window
+        self.min_weight = min_weight
+        self.latency_factor = latency_factor
+        self.on_ramp = on_ramp  # called with the url whenever a ramp starts
+        self.clock = clock
+        self._members = None  # urls seen in the last weights() call
+        self._healthy = {}
+        self._ramps = {}  # url -> [seconds ramped, last update]
+        self._latency = {}  # url -> moving average in ms
+        self._credit = {}
+        self.held = 0  # weight updates where a slow ramp was paused
+
+    def _begin(self, url, now):
+        if self.window <= 0:
+            return
+        self._ramps[url] = [0.0, now]
+        self._credit[url] = 0.0
+        self._latency.pop(url, None)  # judge the ramp on fresh samples only
+        if self.on_ramp:
+            self.on_ramp(url)
+
+    def update(self, url, healthy, latency_ms=None):
+        """Record a health check; a backend that was down starts a new ramp"""
+        was_healthy = self._healthy.get(url)
+        self._healthy[url] = healthy
+        if healthy and was_healthy is False:
+            self._begin(url, self.clock())
+        if healthy and latency_ms is not None:
+            self.record(url, latency_ms)
+
+    def record(self, url, latency_ms):
+        """Feed a latency sample (a health check or a forwarded request) for `url`"""
+        previous = self._latency.get(url)
+        self._latency[url] = latency_ms if previous is None else previous + LATENCY_ALPHA * (latency_ms - previous)
+
+    def _too_slow(self, url, urls):
+        latency = self._latency.get(url)
+        peers = [self._latency[u] for u in urls if u not in self._ramps and u in self._latency]
+        return latency is not None and bool(peers) and latency > self.latency_factor * statistics.median(peers)
+
+    def weights(self, urls):
+        """{url: weight in (0, 1]} for the pool's current backends, advancing the ramps"""
+        now = self.clock()
+        members = set(urls)
+        if self._members is not None:
+            # Backends present from the first call are the pool's baseline; later arrivals ramp
+            for url in members - self._members:
+                self._begin(url, now)
+            for url in self._members - members:
+                self._ramps.pop(url, None)
+        self._members = members
+        weights = {}
+        for url in urls:
+            ramp = self._ramps.get(url)
+            if ramp is None:
+                weights[url] = 1.0
+                continue
+            elapsed, ramp[1] = now - ramp[1], now
+            if self._too_slow(url, urls):
+                self.held += 1
+            else:
+                ramp[0] += elapsed
+            if ramp[0] >= self.window:
+                del self._ramps[url]
+                weights[url] = 1.0
+            else:
+                weights[url] = self.min_weight + (1 - self.min_weight) * ramp[0] / self.window
+        return weights
+
+    def take_turn(self, url, weight):
+        """Whether a backend at `weight` takes the request it was picked for"""
+        if weight >= 1.0:
+            return True
+        credit = self._credit.get(url, 0.0) + weight
+        if credit >= 1.0:
+            self._credit[url] = credit - 1.0
+            return True
+        self._credit[url] = credit
+        return False
+
+    def pick(self, ranked, weights):
+        """First backend of `ranked` (the strategy's preference order) that takes its turn"""
+        for url in ranked:
+            if self.take_turn(url, weights.get(url, 1.0)):
+                return url
+        return ranked[0] if ranked else None
+
+    def ramping(self):
+        """{url: seconds ramped so far} for backends still below full weight"""
+        return {url: round(ramp[0], 1) for url, ramp in self._ramps.items()}
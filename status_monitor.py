@@ -0,0 +1,112 @@
+import asyncio
+import json
+import threading
+import time
+
+import background_loop
+import web_client
+from database_api import api_url_for
+
+# Seconds between probe rounds while someone is reading the snapshot
+PROBE_INTERVAL = 1.0
+PROBE_TIMEOUT = 1.0
+
+# Probing stops once nobody has asked for the snapshot for this long, and resumes on the next read
+IDLE_SECONDS = 30
+
+
+def health_url(backend):
+    """The URL that tells whether a registry Backend is up"""
+    # Database instances expose a real liveness check on their JSON API
+    base = api_url_for(backend.url) if backend.pool == "Database" else backend.url
+    return base + "/health"
+
+
+class StatusMonitor:
+    """
+    Health of every registered backend, probed once per interval for all readers.
+
+    One probe round checks each backend's /health concurrently on the
+    background loop, whatever the number of dashboards polling. The result
+    is kept as pre-encoded JSON with a version that only changes when a
+    backend's health, state or membership does, so serving it costs a
+    reference read, and an unchanged snapshot is answered with 304.
+    """
+
+    def __init__(self, registry, interval=PROBE_INTERVAL, timeout=PROBE_TIMEOUT, idle=IDLE_SECONDS):
+        self.registry = registry
+        self.interval = interval
+        self.timeout = timeout
+        self.idle = idle
+        self.version = 0
+        # Versions restart in every process, so ETags carry this one's start too; a client holding
+        # an ETag from before a restart then gets the new snapshot instead of a 304
+        self._epoch = f"{time.time_ns():x}"
+        self.probed_at = None
+        self._content = None
+        self._encoded = (None, b'')  # (etag, JSON body), replaced together
+        self._last_read = 0.0
+        self._running = False
+        self._lock = threading.Lock()
+
+    async def _probe(self, backend):
+        try:
+            response = await web_client.get_async_client().get(health_url(backend), timeout=self.timeout)
+            return response.status_code == 200
+        except Exception:
+            return False
+
+    async def refresh(self):
+        """Probe every backend once and publish a new snapshot if anything changed"""
+        snapshot = self.registry.snapshot()
+        backends = [backend for pool in snapshot.pools.values() for backend in pool]
+        healthy = await asyncio.gather(*(self._probe(backend) for backend in backends))
+        up = dict(zip((backend.url for backend in backends), healthy))
+        content = {
+            "interval": self.interval,
+            "healthy": sum(healthy),
+            "total": len(backends),
+            "pools": {pool: [{"url": b.url, "name": b.name, "state": b.state, "healthy": up[b.url]}
+                             for b in members]
+                      for pool, members in snapshot.pools.items()},
+        }
+        self.probed_at = time.time()
+        if content != self._content:
+            self._content = content
+            self.version += 1
+            body = json.dumps({"version": self.version, **content}).encode()
+            self._encoded = (f'"{self._epoch}-{self.version}"', body)
+
+    async def _run(self):
+        try:
+            # The reader that started the loop has just probed (see status), so each round waits first
+            started = time.monotonic()
+            while time.monotonic() - self._last_read < self.idle:
+                await asyncio.sleep(max(0.0, started + self.interval - time.monotonic()))
+                started = time.monotonic()
+                await self.refresh()
+        finally:
+            with self._lock:
+                self._running = False
+
+    def touch(self):
+        """Note a reader; starts the probe loop if it is not running. Returns whether it was"""
+        self._last_read = time.monotonic()
+        with self._lock:
+            if self._running:
+                return True
+            self._running = True
+        background_loop.submit(self._run())
+        return False
+
+    def routes(self):
+        return {('GET', '/status'): self.status}
+
+    async def status(self, request):
+        if not self.touch() or self.probed_at is None:
+            # First read after an idle spell: probe now rather than serve a stale or empty snapshot
+            await asyncio.wrap_future(background_loop.submit(self.refresh()))
+        etag, body = self._encoded
+        if etag is not None and request.headers.get('if-none-match') == etag:
+            return 304, b'', {'ETag': etag}
+        return 200, body, {'Content-Type': 'application/json', 'ETag': etag or '"0"', 'Cache-Control': 'no-cache'}
@@ -0,0 +1,385 @@
+import argparse
+import itertools
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import autoscaler
+from database_api import API_PORT_OFFSET
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Pool membership written for the dashboard and balancers, {"Database": [url, ...], ...}
+DEFAULT_STATE_FILE = os.path.join(HERE, 'backends.json')
+
+READY_TIMEOUT = 60.0
+HEALTH_POLL_INTERVAL = 0.2
+MONITOR_INTERVAL = 1.0
+MAX_RESTART_BACKOFF = 30.0
+
+# Retired instances stay up, marked draining, for this long so balancers stop
+# routing to them before in-flight requests are cut off
+DRAIN_SECONDS = 10.0
+
+
+def streamlit_command(script):
+    def command(port):
+        return [sys.executable, '-m', 'streamlit', 'run', os.path.join(HERE, script),
+                '--server.port', str(port), '--server.headless', 'true']
+    return command
+
+
+def python_command(script):
+    def command(port):
+        return [sys.executable, os.path.join(HERE, script), str(port)]
+    return command
+
+
+def database_api_command(port):
+    # The JSON API (and the /health the balancers check) runs beside the page, not inside it
+    return [sys.executable, os.path.join(HERE, 'database_api.py'), '--port', str(port + API_PORT_OFFSET)]
+
+
+class Tier:
+    """How to launch, address and health-check the instances of one pool"""
+
+    def __init__(self, name, pool, base_port, command, health_url, port_offsets=(0,), fixed_port=False,
+                 sidecars=()):
+        self.name = name
+        self.pool = pool  # pool key used by the balancers ("Database", "Web", "File") or None
+        self.base_port = base_port
+        self.command = command
+        self.sidecars = sidecars  # commands for processes started, restarted and stopped with each instance
+        self.health_url = health_url
+        self.port_offsets = port_offsets  # every port an instance binds, relative to its main port
+        self.fixed_port = fixed_port
+
+
+TIERS = {
+    'database': Tier('database', 'Database', 8502, streamlit_command('database_instance.py'),
+                     lambda port: f"http://localhost:{port + API_PORT_OFFSET}/health",
+                     port_offsets=(0, API_PORT_OFFSET), sidecars=(database_api_command,)),
+    'web': Tier('web', 'Web', 8511, streamlit_command('web_instance.py'),
+                lambda port: f"http://localhost:{port}/_stcore/health"),
+    'file': Tier('file', 'File', 8701, python_command('file_instance.py'),
+                 lambda port: f"http://localhost:{port}/health"),
+    'file-balancer': Tier('file-balancer', None, 8704, streamlit_command('file_load_balancer.py'),
+                          lambda port: f"http://localhost:{port}/_stcore/health", fixed_port=True),
+    'proxy': Tier('proxy', None, 8610, python_command('balancer_proxy.py'),
+                  lambda port: f"http://localhost:{port}/proxy/health", fixed_port=True),
+    'dashboard': Tier('dashboard', None, 8501, streamlit_command('app.py'),
+                      lambda port: f"http://localhost:{port}/_stcore/health", fixed_port=True),
+}
+
+# Singletons with well-known ports are placed first so pools grow around them
+START_ORDER = ['dashboard', 'file-balancer', 'proxy', 'database', 'web', 'file']
+
+
+def port_is_free(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(('localhost', port))
+            return True
+        except OSError:
+            return False
+
+
+def is_healthy(url, timeout=1.0):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+class Instance:
+    def __init__(self, tier, number, port):
+        self.tier = tier
+        self.number = number
+        self.port = port
+        self.url = f"http://localhost:{port}"
+        self.health_url = tier.health_url(port)
+        self.process = None
+        self.sidecars = []  # processes from tier.sidecars
+        self.state = 'stopped'  # starting -> ready -> draining -> stopped; crashed while waiting to restart
+        self.started_at = None
+        self.ready_seconds = None
+        self.restarts = 0
+        self.next_restart_at = 0.0
+        self.ready_future = None  # resolves to True once the health check passes
+
+    def __repr__(self):
+        return f"{self.tier.name}#{self.number}@{self.port}"
+
+    def exit_code(self):
+        """Exit code of the first of the instance's processes to have exited, or None while all run"""
+        for process in [self.process] + self.sidecars:
+            if process is not None and process.poll() is not None:
+                return process.returncode
+        return None
+
+
+class Supervisor:
+    """
+    Starts, health-gates, restarts and scales pools of local backend processes.
+
+    Instances of a tier run one parameterised module (INSTANCE_NUMBER in the
+    environment), so a pool can grow to any size without new files. Ports are
+    assigned from each tier's base port, skipping ports already in use.
+    """
+
+    def __init__(self, state_file=DEFAULT_STATE_FILE, ready_timeout=READY_TIMEOUT, drain_seconds=DRAIN_SECONDS):
+        self.state_file = state_file
+        self.ready_timeout = ready_timeout
+        self.drain_seconds = drain_seconds
+        self.instances = {name: [] for name in TIERS}
+        self._lock = threading.RLock()
+        self._stopping = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="readiness")
+        self._assigned_ports = set()
+
+    def _allocate_port(self, tier):
+        port = tier.base_port
+        while True:
+            ports = [port + offset for offset in tier.port_offsets]
+            if not any(p in self._assigned_ports for p in ports) and all(port_is_free(p) for p in ports):
+                self._assigned_ports.update(ports)
+                return port
+            if tier.fixed_port:
+                raise RuntimeError(f"Port {port} for {tier.name} is already in use")
+            port += 1
+
+    def _environment(self, instance):
+        env = dict(os.environ)
+        env['INSTANCE_NUMBER'] = str(instance.number)
+        env['LB_MANAGED_BY_SUPERVISOR'] = '1'
+        return env
+
+    def _launch(self, instance):
+        env = self._environment(instance)
+        instance.process = subprocess.Popen(instance.tier.command(instance.port), cwd=HERE, env=env)
+        instance.sidecars = [subprocess.Popen(command(instance.port), cwd=HERE, env=env)
+                             for command in instance.tier.sidecars]
+        instance.state = 'starting'
+        instance.started_at = time.monotonic()
+        instance.ready_seconds = None
+        instance.ready_future = self._executor.submit(self.wait_ready, instance)
+
+    def wait_ready(self, instance, timeout=None):
+        """Poll the instance's health URL until it answers 200 or the deadline passes"""
+        deadline = instance.started_at + (timeout or self.ready_timeout)
+        while time.monotonic() < deadline and not self._stopping.is_set():
+            if instance.exit_code() is not None:
+                return False
+            if is_healthy(instance.health_url):
+                with self._lock:
+                    if instance.state == 'starting':
+                        instance.state = 'ready'
+                        instance.ready_seconds = time.monotonic() - instance.started_at
+                        instance.restarts = 0
+                self.write_state()
+                return True
+            time.sleep(HEALTH_POLL_INTERVAL)
+        if not self._stopping.is_set() and instance.state == 'starting':
+            # Never turned healthy: stop it, and check_processes restarts it with backoff
+            print(f"{instance} not healthy after {timeout or self.ready_timeout:.0f}s, restarting")
+            self._terminate(instance)
+        return False
+
+    def spawn(self, tier_name, count=1):
+        """Start `count` more instances of a tier; each turns 'ready' once its health check passes"""
+        tier = TIERS[tier_name]
+        with self._lock:
+            pool = self.instances[tier_name]
+            created = []
+            for _ in range(count):
+                # Lowest number not in use (draining instances still hold theirs), so numbers freed by
+                # retired instances are reused and web instances' shared metrics slots stay bounded
+                taken = {i.number for i in pool}
+                number = next(n for n in itertools.count(1) if n not in taken)
+                instance = Instance(tier, number, self._allocate_port(tier))
+                pool.append(instance)
+                created.append(instance)
+            for instance in created:
+                self._launch(instance)
+        return created
+
+    def start(self, counts):
+        """Launch every tier at once, then wait for all of them to turn healthy in parallel"""
+        start = time.monotonic()
+        launched = []
+        for tier_name in START_ORDER:
+            count = counts.get(tier_name, 0)
+            if count:
+                launched += self.spawn(tier_name, count)
+        results = [instance.ready_future.result() for instance in launched]
+        for instance, ready in zip(launched, results):
+            status = f"ready in {instance.ready_seconds:.1f}s" if ready else "NOT READY"
+            print(f"  {instance.tier.name:<13} #{instance.number:<3} {instance.url:<24} {status}")
+        print(f"{sum(results)}/{len(launched)} instances ready in {time.monotonic() - start:.1f}s")
+        self.write_state()
+        return all(results)
+
+    def retire(self, tier_name, instance=None):
+        """
+        Drain one instance of a tier (the highest-numbered by default), then stop it.
+
+        The instance is published as draining straight away and terminated
+        after drain_seconds, so balancers stop picking it before it goes away.
+        """
+        with self._lock:
+            candidates = [i for i in self.instances[tier_name] if i.state != 'draining']
+            if not candidates:
+                return None
+            instance = instance or max(candidates, key=lambda i: i.number)
+            instance.state = 'draining'
+        self.write_state()
+        timer = threading.Timer(self.drain_seconds, self._stop, args=(instance,))
+        timer.daemon = True
+        timer.start()
+        return instance
+
+    def _stop(self, instance):
+        with self._lock:
+            if instance in self.instances[instance.tier.name]:
+                self.instances[instance.tier.name].remove(instance)
+            instance.state = 'stopped'
+            self._assigned_ports.difference_update(instance.port + o for o in instance.tier.port_offsets)
+        self.write_state()
+        self._terminate(instance)
+
+    def scale(self, tier_name, count):
+        """Grow or shrink a tier to exactly `count` instances"""
+        current = len([i for i in self.instances[tier_name] if i.state != 'draining'])
+        if count > current:
+            self.spawn(tier_name, count - current)
+        for _ in range(current - count):
+            self.retire(tier_name)
+
+    @staticmethod
+    def _terminate(instance, grace=10):
+        processes = [p for p in [instance.process] + instance.sidecars if p is not None and p.poll() is None]
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(grace)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def check_processes(self):
+        """Restart crashed instances with exponential backoff; called from the monitor loop"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [i for pool in self.instances.values() for i in pool]
+        for instance in candidates:
+            if instance.state in ('stopped', 'draining'):
+                continue
+            code = instance.exit_code()
+            if code is None:
+                continue
+            if instance.state != 'crashed':
+                instance.state = 'crashed'
+                instance.restarts += 1
+                backoff = min(2 ** (instance.restarts - 1), MAX_RESTART_BACKOFF)
+                instance.next_restart_at = now + backoff
+                print(f"{instance} exited with code {code}, restarting in {backoff:.0f}s")
+                # The page and its sidecars restart together, so stop whichever half is still up
+                self._terminate(instance)
+                self.write_state()
+            elif now >= instance.next_restart_at:
+                self._launch(instance)
+
+    def monitor_forever(self):
+        while not self._stopping.wait(MONITOR_INTERVAL):
+            self.check_processes()
+
+    def stop_all(self):
+        self._stopping.set()
+        with self._lock:
+            instances = [i for pool in self.instances.values() for i in pool]
+            for instance in instances:
+                instance.state = 'stopped'
+        list(self._executor.map(self._terminate, instances))
+        self._executor.shutdown(wait=False)
+
+    def pools(self):
+        """
+        Backends for the balancers' registry, {pool: [{"url", "name", "state"?}]}.
+
+        Only instances that passed their health check are listed. Names carry
+        the instance number, which web instances use to size their pool.
+        """
+        with self._lock:
+            pools = {}
+            for name, tier in TIERS.items():
+                if tier.pool:
+                    pools[tier.pool] = [
+                        {"url": i.url, "name": f"{tier.pool} Server - Instance {i.number}",
+                         **({} if i.state == 'ready' else {"state": "draining"})}
+                        for i in self.instances[name] if i.state in ('ready', 'draining')
+                    ]
+            return pools
+
+    def write_state(self):
+        if not self.state_file:
+            return
+        with self._lock:
+            state = self.pools()
+        temporary = self.state_file + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(temporary, self.state_file)  # readers never see a half-written file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Launch and supervise the load balancer backend pools")
+    parser.add_argument('--database', type=int, default=3, help="Number of database instances")
+    parser.add_argument('--web', type=int, default=3, help="Number of web instances")
+    parser.add_argument('--file', type=int, default=3, help="Number of file instances")
+    parser.add_argument('--no-file-balancer', action='store_true', help="Do not start file_load_balancer.py")
+    parser.add_argument('--no-proxy', action='store_true', help="Do not start the forwarding balancer_proxy.py")
+    parser.add_argument('--dashboard', action='store_true', help="Also start the app.py dashboard")
+    parser.add_argument('--state-file', default=DEFAULT_STATE_FILE)
+    parser.add_argument('--ready-timeout', type=float, default=READY_TIMEOUT)
+    parser.add_argument('--autoscale', action='store_true', help="Grow and shrink the pools with their load")
+    parser.add_argument('--max-instances', type=int, default=8, help="Autoscaling limit per pool")
+    parser.add_argument('--drain-seconds', type=float, default=DRAIN_SECONDS)
+    args = parser.parse_args()
+
+    supervisor = Supervisor(args.state_file, args.ready_timeout, args.drain_seconds)
+    counts = {
+        'database': args.database,
+        'web': args.web,
+        'file': args.file,
+        'file-balancer': 0 if args.no_file_balancer else 1,
+        'proxy': 0 if args.no_proxy else 1,
+        'dashboard': 1 if args.dashboard else 0,
+    }
+    # Treat a service-manager stop like Ctrl+C so children are not orphaned
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        supervisor.start(counts)
+        if args.autoscale:
+            def report(event):
+                print(f"autoscaler: {event.tier} {event.action} to {event.instances} ({event.reason})")
+            # Only the pools that were asked for are scaled; a pool started at 0 stays off
+            policies = {tier: policy for tier, policy in autoscaler.default_policies(args.max_instances).items()
+                        if counts[tier]}
+            autoscaler.Autoscaler(supervisor, policies, autoscaler.default_sources(), on_event=report).start()
+        supervisor.monitor_forever()
+    except KeyboardInterrupt:
+        print("Stopping all instances...")
+    finally:
+        supervisor.stop_all()
+
+
+if __name__ == '__main__':
+    main()
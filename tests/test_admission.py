@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+
+import admission
+
+
+def test_request_class_from_route():
+    assert admission.request_class('GET', '/database/entries') == "interactive"
+    assert admission.request_class('POST', '/database/entries') == "write"
+    assert admission.request_class('POST', '/database/entries/bulk') == "bulk"
+    assert admission.request_class('GET', '/database/entries/export') == "bulk"
+
+
+def test_priority_accepts_class_names_and_numbers():
+    controller = admission.AdmissionController({'Web': 1})
+    assert controller.priority(None) == admission.PRIORITIES["interactive"]
+    assert controller.priority("bulk") == admission.PRIORITIES["bulk"]
+    assert controller.priority("5") == 5
+    with pytest.raises(ValueError):
+        controller.priority("urgent")
+
+
+def test_higher_priority_jumps_the_queue_and_sheds_lower():
+    async def scenario():
+        pool = admission.PoolAdmission("Web", capacity=1, queue_size=2, initial_service_time=0.001)
+        deadline = time.monotonic() + 5
+        await pool.acquire(admission.PRIORITIES["interactive"], deadline)  # takes the only slot
+        order = []
+
+        async def wait(name, priority):
+            try:
+                await pool.acquire(admission.PRIORITIES[priority], deadline)
+            except admission.Rejected as e:
+                order.append((name, e.reason))
+                return
+            order.append((name, "admitted"))
+            pool.release(0.001)
+
+        old_bulk = asyncio.create_task(wait("old bulk", "bulk"))
+        new_bulk = asyncio.create_task(wait("new bulk", "bulk"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(wait("interactive", "interactive"))
+        await asyncio.sleep(0)
+        pool.release(0.001)
+        await asyncio.gather(old_bulk, new_bulk, interactive)
+        return order, pool
+
+    order, pool = asyncio.run(scenario())
+    assert order == [("new bulk", "Web shed for higher-priority work"),
+                     ("interactive", "admitted"),
+                     ("old bulk", "admitted")]
+    assert pool.rejected['shed'] == 1
+
+
+def test_full_queue_of_equal_priority_rejects_newcomer():
+    async def scenario():
+        pool = admission.PoolAdmission("Web", capacity=1, queue_size=1, initial_service_time=0.001)
+        deadline = time.monotonic() + 5
+        await pool.acquire(0, deadline)
+        queued = asyncio.create_task(pool.acquire(0, deadline))
+        await asyncio.sleep(0)
+        with pytest.raises(admission.Rejected, match="queue is full"):
+            await pool.acquire(0, deadline)
+        pool.release(0.001)
+        await queued
+
+    asyncio.run(scenario())
+
+
+def test_request_that_cannot_meet_its_deadline_is_rejected_up_front():
+    async def scenario():
+        pool = admission.PoolAdmission("Web", capacity=1, initial_service_time=1.0)
+        await pool.acquire(0, time.monotonic() + 5)
+        with pytest.raises(admission.Rejected, match="before its deadline"):
+            await pool.acquire(0, time.monotonic() + 0.5)
+        assert pool.rejected['deadline'] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import pytest
+
+import async_http
+
+
+async def echo(request):
+    body = await request.read()
+    return 200, {"method": request.method, "path": request.path, "query": request.query,
+                 "target": request.target, "body": body.decode()}
+
+
+async def lines(request):
+    return 200, {"lines": [line.decode() async for line in request.iter_lines()]}
+
+
+async def bad(request):
+    raise ValueError("bad input")
+
+
+ROUTES = {
+    ('GET', '/echo'): echo,
+    ('POST', '/echo'): echo,
+    ('POST', '/lines'): lines,
+    ('GET', '/bad'): bad,
+    ('GET', '/prefix/*'): echo,
+}
+
+
+async def read_response(reader):
+    """(status, headers, body) of one Content-Length framed response, or None at EOF"""
+    head = await reader.readuntil(b'\r\n\r\n') if not reader.at_eof() else b''
+    if not head:
+        return None
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in header_lines if line)
+    body = await reader.readexactly(int(headers.get('Content-Length', 0)))
+    return int(status_line.split()[1]), headers, body
+
+
+def exchange(raw, responses=1):
+    """Send raw request bytes to a fresh server and read `responses` responses, then whether it closed"""
+    async def run():
+        server = await async_http.start_server(ROUTES, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(raw)
+        await writer.drain()
+        results = [await read_response(reader) for _ in range(responses)]
+        closed = await asyncio.wait_for(reader.read(), 1) == b''
+        writer.close()
+        server.close()
+        return results, closed
+    return asyncio.run(run())
+
+
+def payload(response):
+    return json.loads(response[2])
+
+
+def test_parses_path_query_and_target():
+    (response,), _ = exchange(b"GET /echo?a=1&b=two HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+    assert response[0] == 200
+    assert payload(response) == {"method": "GET", "path": "/echo", "query": {"a": "1", "b": "two"},
+                                 "target": "/echo?a=1&b=two", "body": ""}
+
+
+def test_content_length_body_and_keep_alive():
+    raw = (b"POST /echo HTTP/1.1\r\nContent-Length: 5\r\n\r\nhello"
+           b"GET /echo HTTP/1.1\r\nConnection: close\r\n\r\n")
+    (first, second), closed = exchange(raw, responses=2)
+    assert payload(first)["body"] == "hello"
+    assert payload(second)["method"] == "GET"
+    assert closed
+
+
+def test_chunked_body_is_decoded_and_not_read_as_the_next_request():
+    smuggled = b"GET /bad HTTP/1.1\r\n\r\n"
+    body = b"%x\r\n%s\r\n" % (len(smuggled), smuggled) + b"3;ext=1\r\nabc\r\n0\r\nTrailer: x\r\n\r\n"
+    raw = (b"POST /echo HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n" + body +
+           b"GET /echo?after=1 HTTP/1.1\r\nConnection: close\r\n\r\n")
+    (first, second), closed = exchange(raw, responses=2)
+    assert payload(first)["body"] == smuggled.decode() + "abc"
+    assert payload(second)["query"] == {"after": "1"}
+    assert closed
+
+
+def test_chunked_lines_without_trailing_newline():
+    raw = b"POST /lines HTTP/1.1\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n4\r\na\nb\n\r\n1\r\nc\r\n0\r\n\r\n"
+    (response,), _ = exchange(raw)
+    assert payload(response) == {"lines": ["a\n", "b\n", "c"]}
+
+
+def test_content_length_lines_without_trailing_newline():
+    raw = b"POST /lines HTTP/1.1\r\nContent-Length: 5\r\nConnection: close\r\n\r\nx\ny\nz"
+    (response,), _ = exchange(raw)
+    assert payload(response) == {"lines": ["x\n", "y\n", "z"]}
+
+
+def test_unsupported_transfer_coding_is_refused_and_closed():
+    raw = b"POST /echo HTTP/1.1\r\nTransfer-Encoding: gzip\r\n\r\nGET /echo HTTP/1.1\r\n\r\n"
+    (response,), closed = exchange(raw)
+    assert response[0] == 501
+    assert closed
+
+
+@pytest.mark.parametrize('length', [b'-1', b'5, 5', b'abc'])
+def test_invalid_content_length_is_refused_and_closed(length):
+    (response,), closed = exchange(b"POST /echo HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\nhello")
+    assert response[0] == 400
+    assert closed
+
+
+def test_both_framings_use_chunked_and_close():
+    raw = (b"POST /echo HTTP/1.1\r\nContent-Length: 3\r\nTransfer-Encoding: chunked\r\n\r\n"
+           b"2\r\nok\r\n0\r\n\r\n")
+    (response,), closed = exchange(raw)
+    assert payload(response)["body"] == "ok"
+    assert response[1]["Connection"] == "close"
+    assert closed
+
+
+def test_malformed_chunk_is_a_400_and_closes():
+    raw = b"POST /echo HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\nabc\r\n0\r\n\r\n"
+    (response,), closed = exchange(raw)
+    assert response[0] == 400
+    assert closed
+
+
+def test_value_error_is_400_and_unknown_routes_404_or_405():
+    raw = (b"GET /bad HTTP/1.1\r\n\r\nGET /missing HTTP/1.1\r\n\r\n"
+           b"DELETE /echo HTTP/1.1\r\nConnection: close\r\n\r\n")
+    (bad_input, missing, wrong_method), _ = exchange(raw, responses=3)
+    assert (bad_input[0], missing[0], wrong_method[0]) == (400, 404, 405)
+    assert payload(bad_input) == {"error": "bad input"}
+
+
+def test_prefix_routes_match_nested_paths():
+    (response,), _ = exchange(b"GET /prefix/a/b HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert payload(response)["path"] == "/prefix/a/b"
@@ -0,0 +1,26 @@
+import numpy as np
+
+import balancer_simulator as sim
+
+
+def test_lane_follows_the_lindley_recursion():
+    pool = sim.SimulatedPool(["a"], workers=1, speeds=[0.5])
+    assert pool.serve(0, 0.0, 1.0) == 2.0  # half speed doubles the service time
+    assert pool.serve(0, 1.0, 1.0) == 4.0  # waits for the first request
+    assert pool.serve(0, 10.0, 1.0) == 12.0  # idle lane starts at arrival
+
+
+def test_least_connections_sees_departures_and_avoids_the_slow_backend():
+    rng = np.random.default_rng(3)
+    times, pools = sim.poisson_arrivals({"Web": 5.0}, 5000, rng)
+    services = rng.uniform(0.1, 2.0, len(times))
+    results = {}
+    for name, strategy in sim.STRATEGIES.items():
+        results[name], failed, _ = sim.simulate(strategy, times, pools, services, backends=3,
+                                                workers={"Web": 4, "Database": 8}, speeds=[1, 1, 0.5])
+        assert failed == 0
+    round_robin, least = results["Round Robin"]["Web"], results["Least Connections"]["Web"]
+    assert round_robin["imbalance"] < 1.01
+    # Finished requests leave the balancer's load, so the half-speed backend gets fewer of them
+    assert least["imbalance"] > 1.05
+    assert least["percentiles"][99] < round_robin["percentiles"][99]
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+import database_store
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "entries.db")
+    database_store.init_db(path)
+    return path
+
+
+def count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def legacy_db(path, rows):
+    """A database in the original layout: no id column, no indexes, user_version 0"""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE entries (name TEXT, age INTEGER, timestamp TEXT, instance_id TEXT)")
+    conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def bulk(path, rows):
+    with database_store.BulkWriter(path) as writer:
+        writer.write_batch(rows)
+
+
+def test_migration_keeps_rows_in_order_and_builds_the_totals(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    legacy_db(path, [("Ada", 36, "2024-01-01 00:00:00", "a"), ("Alan", 41, "2024-01-01 00:00:00", "b"),
+                     ("Grace", 45, "2024-01-02 00:00:00", "a")])
+    database_store.init_db(path)
+    database_store.init_db(path)  # already current: nothing to do
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database_store.SCHEMA_VERSION
+    conn.close()
+    rows, _ = database_store.get_entries_page(path=path)
+    assert [(row["id"], row["name"]) for row in rows] == [(1, "Ada"), (2, "Alan"), (3, "Grace")]
+    assert database_store.get_entry_stats(path) == {"a": (2, 81), "b": (1, 41)}
+
+    database_store.add_entry("Edsger", 72, "b", path=path)
+    assert database_store.get_entry_stats(path)["b"] == (2, 113)
+
+
+def test_pages_cover_every_row_once_across_equal_timestamps(db):
+    # Every row shares one timestamp, so only the id tie-break keeps the pages apart
+    bulk(db, [(f"n{i}", i, "2024-01-01 00:00:00", "a" if i % 2 else "b") for i in range(23)])
+    seen, cursor = [], None
+    while True:
+        rows, cursor = database_store.get_entries_page(after=cursor, limit=5, path=db)
+        seen += [row["id"] for row in rows]
+        if cursor is None:
+            break
+    assert seen == list(range(1, 24))
+
+
+def test_pages_filter_by_instance(db):
+    bulk(db, [(f"n{i}", i, f"2024-01-01 00:00:{i:02d}", "a" if i % 2 else "b") for i in range(10)])
+    rows, cursor = database_store.get_entries_page(limit=5, instance_id="a", path=db)
+    assert [row["age"] for row in rows] == [1, 3, 5, 7, 9]
+    assert cursor is None
+
+
+def test_add_entries_inserts_every_row(db):
+    database_store.add_entries([("Ada", 36), ("Alan", 41)], "Database Server - Instance 1", path=db)
+    assert count(db) == 2
+
+
+def test_add_entries_stores_nothing_when_a_row_fails(db):
+    with pytest.raises(sqlite3.Error):
+        database_store.add_entries([("Ada", 36), ({"not": "bindable"}, 41)], "Database Server - Instance 1", path=db)
+    assert count(db) == 0
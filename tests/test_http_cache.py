@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from http_cache import CachedResponse, parse_cache_control
+
+
+def cached(**headers):
+    headers = {name.replace('_', '-'): value for name, value in headers.items()}
+    return CachedResponse("http://example.test/", 200, "HTTP/1.1", headers, b"body", {})
+
+
+def lifetime(response):
+    return response.expires_at - response.stored_at
+
+
+def test_parse_cache_control():
+    assert parse_cache_control('max-age=60, No-Cache, private="x"') == \
+        {'max-age': '60', 'no-cache': None, 'private': 'x'}
+    assert parse_cache_control(None) == {}
+
+
+def test_max_age_sets_the_lifetime_less_the_age():
+    response = cached(cache_control='max-age=60', age='15')
+    assert lifetime(response) == pytest.approx(45)
+    assert response.fresh
+
+
+@pytest.mark.parametrize('value', ['soon', '-5', '1.5', '"60 s"', ''])
+def test_invalid_max_age_is_stale(value):
+    response = cached(cache_control=f'max-age={value}')
+    assert lifetime(response) == 0
+    assert not response.fresh
+
+
+def test_quoted_max_age_is_accepted():
+    assert lifetime(cached(cache_control='max-age="30"')) == pytest.approx(30)
+
+
+@pytest.mark.parametrize('value, expected', [('abc', 0), ('-3', 0), ('10, 20', 10), ('', 0)])
+def test_age_uses_first_member_and_ignores_invalid_values(value, expected):
+    assert lifetime(cached(cache_control='max-age=100', age=value)) == pytest.approx(100 - expected)
+
+
+def test_expires_relative_to_date():
+    response = cached(date='Mon, 01 Jan 2024 00:00:00 GMT', expires='Mon, 01 Jan 2024 00:02:00 GMT')
+    assert lifetime(response) == pytest.approx(120)
+
+
+def test_invalid_expires_is_stale():
+    assert lifetime(cached(expires='0')) == 0
+
+
+def test_heuristic_freshness_from_last_modified():
+    response = cached(date='Wed, 11 Jan 2024 00:00:00 GMT', last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+    assert lifetime(response) == pytest.approx(24 * 3600)  # 10% of 10 days, capped at a day
+
+
+def test_no_cache_is_never_fresh():
+    assert not cached(cache_control='max-age=60, no-cache').fresh
+
+
+def test_refresh_after_304_restarts_the_lifetime():
+    response = cached(cache_control='max-age=0')
+    assert not response.fresh
+    response.refresh({'cache-control': 'max-age=60'})
+    assert response.fresh
+    assert response.expires_at == pytest.approx(time.time() + 60, abs=1)
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+import latency_histogram
+from latency_histogram import LatencyHistogram
+
+
+def test_buckets_tile_the_range_and_contain_their_values():
+    previous_high = -1
+    for index in range(latency_histogram.bucket_count_for(1000)):
+        low, high = latency_histogram.bucket_bounds(index)
+        assert low == previous_high + 1
+        assert latency_histogram.bucket_index(low) == latency_histogram.bucket_index(high) == index
+        # Width relative to the bucket's lowest value stays under 1 / SUB_BUCKET_HALF
+        assert high - low < max(low, 1) / latency_histogram.SUB_BUCKET_HALF
+        previous_high = high
+
+
+def test_percentiles_stay_within_the_bucket_error():
+    rng = random.Random(7)
+    values = sorted(rng.lognormvariate(3, 1.2) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    for percentile in (50, 90, 99, 99.9):
+        exact = values[round(len(values) * percentile / 100) - 1]
+        assert histogram.percentile(percentile) == pytest.approx(exact, rel=0.016, abs=0.001)
+    assert histogram.percentile(100) <= values[-1]
+    assert histogram.mean_ms == pytest.approx(sum(values) / len(values))
+
+
+def test_merge_matches_recording_everything_in_one_histogram():
+    first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i in range(1000):
+        (first if i % 3 else second).record(i / 7)
+        combined.record(i / 7)
+    merged = LatencyHistogram.merged([first, second])
+    assert list(merged.counts) == list(combined.counts)
+    assert merged.percentiles() == combined.percentiles()
+    with pytest.raises(ValueError):
+        first.merge(LatencyHistogram(max_value_ms=10))
+
+
+def test_values_beyond_the_range_land_in_the_top_bucket():
+    histogram = LatencyHistogram(max_value_ms=10)
+    histogram.record(10_000)
+    histogram.record(-5)  # clock steps backwards count as zero
+    assert histogram.counts[-1] == 1 and histogram.counts[0] == 1
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(99) == 0.0
+    assert latency_histogram.format_percentiles(histogram) == "no samples"
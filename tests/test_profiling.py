@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+import profiling
+
+
+class _Request:
+    def __init__(self, payload):
+        self.payload = payload
+
+    async def json(self):
+        return self.payload
+
+
+def test_disabled_timers_record_nothing():
+    timers = profiling.PhaseTimers(enabled=False)
+    start = timers.start()
+    assert start == 0
+    assert timers.lap("phase", start) == 0
+    assert timers.snapshot() == {}
+
+
+def test_timers_switch_on_at_runtime():
+    timers = profiling.PhaseTimers(enabled=False)
+    begun_while_off = timers.start()
+    timers.enabled = True
+    timers.lap("straddling", begun_while_off)  # would otherwise count the whole uptime
+    timers.lap("phase", timers.start())
+    assert list(timers.snapshot()) == ["phase"]
+    assert timers.snapshot()["phase"]["count"] == 1
+
+
+def test_debug_api_switches_the_timers():
+    timers = profiling.PhaseTimers(enabled=False)
+    api = profiling.DebugAPI(timers=timers)
+    assert asyncio.run(api.switch_phases(_Request({"enabled": True}))) == (200, {"enabled": True})
+    assert timers.enabled
+    with pytest.raises(ValueError):
+        asyncio.run(api.switch_phases(_Request({"enabled": "yes"})))
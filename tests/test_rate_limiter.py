@@ -0,0 +1,53 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter, TokenBucketTable
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_a_burst_then_refills_at_its_rate():
+    table = TokenBucketTable(rate=2.0, burst=3)
+    assert [table.allow("k", now=0.0)[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = table.allow("k", now=0.0)
+    assert not allowed and retry_after == pytest.approx(0.5)
+    assert table.allow("k", now=0.5)[0]
+    assert not table.allow("k", now=0.5)[0]
+    assert [table.allow("k", now=100.0)[0] for _ in range(4)] == [True, True, True, False]  # capped at burst
+
+
+def test_idle_buckets_are_swept_and_full_tables_evict_the_least_recent():
+    table = TokenBucketTable(rate=1.0, burst=1, max_entries=3, idle_seconds=10.0)
+    for key, now in (("a", 0.0), ("b", 1.0), ("c", 2.0)):
+        table.allow(key, now=now)
+    table.allow("d", now=2.5)  # full and nothing idle: "a" was used least recently
+    assert len(table) == 3 and "a" not in table._index
+    table.allow("e", now=20.0)  # everything is idle by now, so the sweep frees slots first
+    assert len(table) <= 3 and table.evictions >= 2
+
+
+def test_type_limit_rejects_without_spending_the_client_budget():
+    clock = Clock()
+    limiter = RateLimiter(client_limit=(1.0, 3), type_limits={"File Request": (1.0, 1)}, clock=clock)
+    assert limiter.check("c", "File Request").allowed
+    decision = limiter.check("c", "File Request")
+    assert (decision.allowed, decision.scope) == (False, 'type')
+    # The rejected file request paid nothing, so two client tokens remain for other types
+    assert limiter.check("c", "Web Request").allowed
+    assert limiter.check("c", "Web Request").allowed
+    decision = limiter.check("c", "Web Request")
+    assert (decision.allowed, decision.scope) == (False, 'client')
+    assert decision.retry_after == pytest.approx(1.0)
+    assert limiter.check("other", "Web Request").allowed  # buckets are per client
+    assert limiter.stats()["limited"] == 2
+
+
+def test_rate_limited_describes_the_decision():
+    error = rate_limiter.RateLimited(rate_limiter.Decision(False, 1.5, 'client'))
+    assert "client" in str(error) and "1.5s" in str(error)
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+import request_trace
+from request_trace import OUTCOMES, TraceReader, TraceRecorder
+
+
+def recorder(path, **kwargs):
+    return TraceRecorder(str(path), flush_seconds=3600, **kwargs)  # flushed by the test, not the thread
+
+
+def read(path):
+    reader = TraceReader(str(path))
+    try:
+        return list(reader)
+    finally:
+        reader.close()
+
+
+def test_records_round_trip(tmp_path):
+    path = tmp_path / "proxy.trace"
+    trace = recorder(path)
+    trace.record("Web Request", "http://web-1", 0.0125, OUTCOMES.index("ok"), 200, "GET /web/", "10.0.0.1")
+    trace.record("File Request", None, 0.5, OUTCOMES.index("rejected"), 503, "PUT /file/x")
+    trace.close()
+
+    first, second = read(path)
+    assert (first.request_type, first.backend, first.target, first.status, first.outcome) == \
+        ("Web Request", "http://web-1", "GET /web/", 200, "ok")
+    assert first.latency_us == 12500 and first.client != 0
+    assert (second.backend, second.client, second.outcome) == (None, 0, "rejected")
+    assert second.time_ns >= first.time_ns
+
+
+def test_reopened_trace_appends_and_reuses_its_strings(tmp_path):
+    path = tmp_path / "proxy.trace"
+    for status in (200, 500):
+        trace = recorder(path)
+        trace.record("Web Request", "http://web-1", 0.001, request_trace.outcome_for(status, "http://web-1"),
+                     status, "GET /web/")
+        trace.close()
+    assert [(r.backend, r.outcome) for r in read(path)] == [("http://web-1", "ok"), ("http://web-1", "error")]
+    assert request_trace.read_strings(str(path)) == ["http://web-1", "GET /web/"]  # stored once
+
+
+def test_full_trace_rotates_with_its_strings(tmp_path):
+    path = tmp_path / "proxy.trace"
+    trace = recorder(path, max_bytes=request_trace.HEADER.size + 2 * request_trace.RECORD.size)
+    trace.record("Web Request", "http://web-1", 0.001, 0, 200, "GET /web/")
+    trace.record("Web Request", "http://web-2", 0.001, 0, 200, "GET /web/")
+    trace.flush()  # reaches max_bytes: the next record starts a new file and string table
+    trace.record("Web Request", "http://web-3", 0.001, 0, 200, "GET /web/")
+    trace.close()
+    assert [r.backend for r in read(str(path) + '.1')] == ["http://web-1", "http://web-2"]
+    assert [r.backend for r in read(path)] == ["http://web-3"]
+    assert request_trace.read_strings(str(path)) == ["http://web-3", "GET /web/"]
+
+
+def test_backlog_beyond_max_pending_drops_the_oldest(tmp_path):
+    trace = recorder(tmp_path / "proxy.trace", max_pending=2)
+    for backend in ("a", "b", "c"):
+        trace.record("Web Request", backend, 0.001, 0)
+    trace.close()
+    assert [r.backend for r in read(tmp_path / "proxy.trace")] == ["b", "c"]
+    assert trace.stats()["dropped"] == 1
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "notes.trace"
+    path.write_bytes(b"not a trace at all, just some bytes")
+    with pytest.raises(ValueError):
+        TraceReader(str(path))
+
+
+@pytest.mark.parametrize("status, backend, outcome", [
+    (200, "b", "ok"), (502, "b", "error"), (504, None, "timeout"), (429, None, "rate_limited"),
+    (503, None, "rejected"), (503, "b", "error"),
+])
+def test_outcome_for(status, backend, outcome):
+    assert OUTCOMES[request_trace.outcome_for(status, backend)] == outcome
+
+
+def test_recorder_from_env_is_off_without_a_directory(monkeypatch, tmp_path):
+    monkeypatch.setattr(request_trace, 'TRACE_DIR', None)
+    assert request_trace.recorder_from_env("proxy") is None
+    monkeypatch.setattr(request_trace, 'TRACE_DIR', str(tmp_path))
+    trace = request_trace.recorder_from_env("proxy")
+    trace.close()
+    assert os.path.exists(tmp_path / "proxy.trace")
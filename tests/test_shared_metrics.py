@@ -0,0 +1,30 @@
+import os
+import uuid
+
+import pytest
+
+import shared_metrics
+
+
+@pytest.fixture
+def table():
+    table = shared_metrics.SharedMetricsTable(f"lb_test_{uuid.uuid4().hex[:12]}", max_slots=2)
+    yield table
+    if os.name == 'posix':
+        shared_metrics.resource_tracker.register(table.shm._name, "shared_memory")
+    table.shm.unlink()
+    table.close()
+
+
+def test_claim_rejects_slots_beyond_the_table(table):
+    table.claim(1)
+    with pytest.raises(ValueError, match="2 slots"):
+        table.claim(2)
+
+
+def test_counters_round_trip(table):
+    table.claim(0)
+    table.begin_request(0)
+    table.end_request(0, {'total': 12.0})
+    assert (table.requests(0), table.in_flight(0)) == (1, 0)
+    assert sum(table.histogram(0, 'total').counts) == 1
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import backend_registry
+from status_monitor import StatusMonitor
+
+
+class _Request:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def monitor():
+    return StatusMonitor(backend_registry.BackendRegistry({"Web": []}), idle=0)
+
+
+def test_version_only_moves_when_the_snapshot_changes():
+    status = monitor()
+    asyncio.run(status.refresh())
+    asyncio.run(status.refresh())
+    assert status.version == 1
+
+
+def test_etags_differ_between_processes_at_the_same_version():
+    first = monitor()
+    time.sleep(0.001)
+    restarted = monitor()  # a later process starts counting again from 0
+    asyncio.run(first.refresh())
+    asyncio.run(restarted.refresh())
+    assert first.version == restarted.version == 1
+    assert first._encoded[0] != restarted._encoded[0]
+
+
+def test_matching_etag_is_answered_with_304_and_a_stale_one_with_the_snapshot():
+    status = monitor()
+    status_code, body, headers = asyncio.run(status.status(_Request({})))
+    assert status_code == 200
+    etag = headers['ETag']
+    assert asyncio.run(status.status(_Request({'if-none-match': etag})))[0] == 304
+    before_restart = '"1"'
+    assert asyncio.run(status.status(_Request({'if-none-match': before_restart})))[0] == 200
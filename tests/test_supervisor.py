@@ -0,0 +1,10 @@
+import supervisor
+
+
+def test_spawn_reuses_the_lowest_freed_instance_number(monkeypatch, tmp_path):
+    manager = supervisor.Supervisor(state_file=str(tmp_path / 'backends.json'))
+    monkeypatch.setattr(manager, '_launch', lambda instance: None)
+    monkeypatch.setattr(manager, '_allocate_port', lambda tier: 0)
+    first, second, third = manager.spawn('web', 3)
+    manager.instances['web'].remove(second)
+    assert [i.number for i in manager.spawn('web', 2)] == [2, 4]
@@ -0,0 +1,69 @@
+import http.server
+import threading
+
+import httpx
+import pytest
+
+import background_loop
+import dns_cache
+import web_client
+
+
+class _Ok(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Ok)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    # Nothing listens on 127.0.0.2, so the first address is refused and the second must be tried
+    lookup = dns_cache.StubLookup({'dual.test': ('127.0.0.2', '127.0.0.1')})
+    monkeypatch.setattr(dns_cache, 'RESOLVER', dns_cache.AsyncResolver(lookup=lookup))
+    monkeypatch.setattr(web_client, '_client', None)
+    monkeypatch.setattr(web_client, '_async_client', None)
+
+
+def test_transports_still_expose_the_network_backend():
+    # web_client swaps this private attribute; fail loudly if an httpx/httpcore upgrade moves it
+    assert hasattr(httpx.HTTPTransport()._pool, '_network_backend')
+    assert hasattr(httpx.AsyncHTTPTransport()._pool, '_network_backend')
+
+
+def test_system_lookup_returns_every_address():
+    addresses = background_loop.run(dns_cache.system_lookup('localhost'))
+    assert isinstance(addresses, tuple)
+    assert '127.0.0.1' in addresses or '::1' in addresses
+
+
+def test_client_falls_back_to_the_next_address(server, resolver):
+    client = web_client.get_client()
+    try:
+        assert client.get(f"http://dual.test:{server}/").text == 'ok'
+    finally:
+        client.close()
+
+
+def test_async_client_falls_back_to_the_next_address(server, resolver):
+    async def fetch():
+        client = web_client.get_async_client()
+        try:
+            return (await client.get(f"http://dual.test:{server}/")).text
+        finally:
+            await client.aclose()
+
+    assert background_loop.run(fetch()) == 'ok'
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import time
+
+import web_client
+from status_monitor import health_url
+
+# Seconds startup waits for the registered backends before taking traffic regardless
+# (under the supervisor's READY_TIMEOUT, so a warming balancer is not restarted)
+READY_DEADLINE = float(os.environ.get('LB_READY_DEADLINE', 30))
+
+# Keep-alive connections opened to each backend before the first request
+WARM_CONNECTIONS = int(os.environ.get('LB_WARM_CONNECTIONS', 2))
+
+READY_POLL_INTERVAL = 0.2
+PROBE_TIMEOUT = 1.0
+
+
+async def wait_ready(client, url, deadline, interval=READY_POLL_INTERVAL):
+    """Poll `url` until it answers 200; seconds it took, or None once `deadline` (monotonic) passes"""
+    started = time.monotonic()
+    while True:
+        try:
+            response = await client.get(url, timeout=max(min(PROBE_TIMEOUT, deadline - time.monotonic()), 0.05))
+            if response.status_code == 200:
+                return time.monotonic() - started
+        except Exception:
+            pass  # not listening yet
+        if time.monotonic() + interval > deadline:
+            return None
+        await asyncio.sleep(interval)
+
+
+async def open_connections(client, url, count):
+    """Send `count` requests to `url` at once, so the client's pool keeps that many connections open"""
+    responses = await asyncio.gather(*(client.get(url, timeout=PROBE_TIMEOUT) for _ in range(count)),
+                                     return_exceptions=True)
+    return sum(1 for response in responses if not isinstance(response, BaseException))
+
+
+async def warm_up(registry, client=None, deadline=READY_DEADLINE, connections=WARM_CONNECTIONS, pools=None):
+    """
+    Wait for every registered backend at once, then pre-open its connections.
+
+    Each backend is polled on its health URL until it answers or `deadline`
+    seconds pass; `connections` concurrent requests are then sent to each
+    one that came up, leaving that many idle keep-alive connections in
+    `client`'s pool (the shared async client by default, which must then be
+    used from the background loop). `pools` limits warm-up to those pools.
+    Returns a report of how long each
+    backend, and the whole pool, took to become ready.
+    """
+    client = client or web_client.get_async_client()
+    started = time.monotonic()
+    until = started + deadline
+
+    async def prepare(backend):
+        url = health_url(backend)
+        seconds = await wait_ready(client, url, until)
+        opened = await open_connections(client, url, connections) if seconds is not None and connections else 0
+        return backend.url, {"pool": backend.pool, "ready": seconds is not None,
+                             "ready_seconds": None if seconds is None else round(seconds, 3), "connections": opened}
+
+    snapshot = registry.snapshot()
+    backends = await asyncio.gather(*(prepare(backend) for pool, members in snapshot.pools.items()
+                                      if pools is None or pool in pools for backend in members))
+    backends = dict(backends)
+    return {
+        "time_to_ready": round(time.monotonic() - started, 3),
+        "deadline": deadline,
+        "ready": sum(1 for backend in backends.values() if backend["ready"]),
+        "total": len(backends),
+        "connections": sum(backend["connections"] for backend in backends.values()),
+        "backends": backends,
+    }
+
+
+def combine(reports):
+    """One report for warm-ups of separate pools that ran side by side"""
+    backends = {url: backend for report in reports for url, backend in report["backends"].items()}
+    return {
+        "time_to_ready": max((report["time_to_ready"] for report in reports), default=0.0),
+        "deadline": max((report["deadline"] for report in reports), default=READY_DEADLINE),
+        "ready": sum(report["ready"] for report in reports),
+        "total": sum(report["total"] for report in reports),
+        "connections": sum(report["connections"] for report in reports),
+        "backends": backends,
+    }
+
+
+def describe(report):
+    """One line for logs and the dashboard"""
+    line = (f"{report['ready']}/{report['total']} backends ready in {report['time_to_ready']:.1f}s, "
+            f"{report['connections']} connections pre-opened")
+    missing = [url for url, backend in report["backends"].items() if not backend["ready"]]
+    if missing:
+        line += f"; not ready after {report['deadline']:g}s: {', '.join(missing)}"
+    return line
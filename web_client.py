@@ -0,0 +1,170 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+import httpcore
+import httpx
+
+import dns_cache
+
+# Connection pool limits for the process-wide client
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection is kept open
+REQUEST_TIMEOUT = 10
+
+_client = None
+_client_lock = threading.Lock()
+
+# Async client for batch work; bound to background_loop, so only touched from that loop
+_async_client = None
+
+# Per-host connection reuse counters: host -> {'requests', 'new_connections', 'reused_connections'}
+_host_stats = {}
+_stats_lock = threading.Lock()
+
+
+class CachedDNSBackend(httpcore.SyncBackend):
+    """
+    Opens TCP connections to the addresses from the shared DNS cache (TLS still uses the hostname).
+
+    Addresses are tried in order until one connects, as socket.create_connection
+    does, so an unreachable first record (often IPv6 "localhost") is skipped.
+    """
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        error = None
+        for address in dns_cache.RESOLVER.resolve_blocking(host):
+            try:
+                return super().connect_tcp(address, port, timeout=timeout, local_address=local_address,
+                                           socket_options=socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+
+
+class CachedDNSAsyncBackend(httpcore.AnyIOBackend):
+    """Async counterpart of CachedDNSBackend for the batch client"""
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        error = None
+        for address in await dns_cache.RESOLVER.resolve(host):
+            try:
+                return await super().connect_tcp(address, port, timeout=timeout, local_address=local_address,
+                                                 socket_options=socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+
+
+def get_client():
+    """The shared HTTP/2 client; connections are kept alive and reused per host"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            transport = httpx.HTTPTransport(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+            )
+            # httpx has no public hook for name resolution, so swap the pool's network backend; the
+            # httpx/httpcore versions are pinned in requirements.txt and tests/test_web_client.py
+            # fails if the attribute moves
+            transport._pool._network_backend = CachedDNSBackend()
+            _client = httpx.Client(transport=transport, timeout=REQUEST_TIMEOUT)
+        return _client
+
+
+def get_async_client():
+    """The shared async HTTP/2 client; must be called from the background loop"""
+    global _async_client
+    if _async_client is None:
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=None,  # batch_probe bounds concurrency itself
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+        transport._pool._network_backend = CachedDNSAsyncBackend()  # see get_client
+        _async_client = httpx.AsyncClient(transport=transport, timeout=REQUEST_TIMEOUT)
+    return _async_client
+
+
+class PhaseTrace:
+    """
+    Collects httpcore trace events for one request (and its redirects).
+
+    Phases that did not happen, such as connect/TLS on a reused connection,
+    stay at zero, so a warm probe reports only the time to first byte.
+    """
+
+    def __init__(self):
+        self.started = {}
+        self.connect_ms = 0.0
+        self.tls_ms = 0.0
+        self.ttfb_ms = 0.0
+        self.new_connections = 0
+        self.requests = 0
+
+    def __call__(self, event_name, info):
+        now = time.perf_counter()
+        # e.g. "connection.connect_tcp.started" / "http2.receive_response_headers.complete"
+        phase, _, state = event_name.rpartition('.')
+        if state == 'started':
+            self.started[phase] = now
+            if phase.endswith('send_request_headers'):
+                self.started['request'] = now
+                self.requests += 1
+            return
+        if state != 'complete' or phase not in self.started:
+            return
+        elapsed = (now - self.started[phase]) * 1000
+        if phase == 'connection.connect_tcp':
+            self.connect_ms += elapsed
+            self.new_connections += 1
+        elif phase == 'connection.start_tls':
+            self.tls_ms += elapsed
+        elif phase.endswith('receive_response_headers') and 'request' in self.started:
+            self.ttfb_ms += (now - self.started['request']) * 1000
+
+
+def timed_get(url, headers=None):
+    """
+    GET a URL through the shared client.
+
+    Returns (response, timings) where timings has connect/TLS/TTFB/total in ms and
+    whether the request rode on an already-open connection.
+    """
+    trace = PhaseTrace()
+    start = time.perf_counter()
+    response = get_client().get(url, headers=headers, follow_redirects=True,
+                                extensions={'trace': trace})
+    total_ms = (time.perf_counter() - start) * 1000
+
+    reused = trace.new_connections == 0
+    host = urlparse(url).netloc
+    with _stats_lock:
+        stats = _host_stats.setdefault(host, {'requests': 0, 'new_connections': 0, 'reused_connections': 0})
+        stats['requests'] += max(trace.requests, 1)
+        stats['new_connections'] += trace.new_connections
+        stats['reused_connections'] += max(trace.requests - trace.new_connections, 0)
+
+    timings = {
+        'connect': round(trace.connect_ms, 2),
+        'tls': round(trace.tls_ms, 2),
+        'ttfb': round(trace.ttfb_ms, 2),
+        'total': round(total_ms, 2),
+        'connection_reused': reused,
+    }
+    return response, timings
+
+
+def pool_stats():
+    """Copy of the per-host reuse counters for display"""
+    with _stats_lock:
+        return {host: dict(stats) for host, stats in _host_stats.items()}
@@ -0,0 +1,345 @@
+import streamlit as st
+import os
+import time
+import streamlit.components.v1 as components
+from urllib.parse import urlparse
+import backend_registry
+import batch_probe
+import dns_cache
+import http_cache
+import load_model
+from latency_histogram import LatencyHistogram, format_percentiles
+import shared_metrics
+import web_client
+
+# Instance number is set by supervisor.py (or the web_instanceN.py shims)
+INSTANCE_NUMBER = int(os.environ.get("INSTANCE_NUMBER", 1))
+
+def pool_size():
+    """Highest web instance number in the pool, from the supervisor's backends.json"""
+    registry = backend_registry.start(admin_port=None)  # watches the file once per process
+    numbers = [int(b.name.rsplit(' ', 1)[-1]) for b in registry.snapshot().backends("Web")
+               if b.name.rsplit(' ', 1)[-1].isdigit()]
+    return max(numbers + [INSTANCE_NUMBER])
+
+# Read on every rerun, so instances added by autoscaling show up in pages already running
+POOL_SIZE = pool_size()
+INSTANCE_ID = f"Web Server - Instance {INSTANCE_NUMBER}"  # Unique instance identifier
+
+st.title(INSTANCE_ID)
+st.write("This is a dedicated web server instance.")
+
+# Create a list of available instances
+INSTANCES = [f"Web Server - Instance {number}" for number in range(1, POOL_SIZE + 1)]
+
+# Simulated service time (model, worker count and seed come from WEB_LOAD_* variables)
+LOAD_SIMULATOR = load_model.get_simulator(INSTANCE_NUMBER)
+
+# Load balancing metrics live in shared memory: every local instance updates its own slot
+# and reads everyone else's, so selection and the sidebar see real cross-instance load
+METRICS = shared_metrics.get_table()
+SLOT = INSTANCES.index(INSTANCE_ID)
+# A restarted or autoscaled instance must not inherit in-flight counts from a dead predecessor
+METRICS.claim(SLOT)
+
+def validate_url(url):
+    """Validate and format the URL properly"""
+    if not url.strip():
+        return False
+    if not url.startswith(('http://', 'https://')):
+        url = 'http://' + url
+    try:
+        result = urlparse(url)
+        return all([result.scheme, result.netloc])
+    except:
+        return False
+
+def select_instance():
+    """Least-requests load balancing across all local instances"""
+    # Get instance with least requests
+    return INSTANCES[METRICS.least_loaded(range(len(INSTANCES)))]
+
+def fetch_metrics(url):
+    """Enhanced fetch_metrics function with load simulation"""
+    metrics = {}
+    METRICS.begin_request(SLOT)
+    try:
+        # Simulated server processing runs on the background loop while the real fetch runs;
+        # the page then waits for it, so it is held for the queue wait plus service time
+        pending_load = LOAD_SIMULATOR.submit()
+        
+        # Validate URL first
+        if not validate_url(url):
+            raise ValueError("Invalid URL")
+            
+        # Extract host name without protocol or port
+        parsed_url = urlparse(url)
+        domain = parsed_url.hostname
+        if not domain:
+            raise ValueError("Invalid URL format")
+            
+        # Add headers to mimic a browser
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
+        }
+        
+        # DNS resolution time (served from the shared cache; the client connects to this address)
+        start_dns = time.perf_counter()
+        addresses, dns_cache_status = dns_cache.RESOLVER.lookup_blocking(domain)
+        ip_address = addresses[0]  # the client falls back to the others if this one is unreachable
+        dns_time = round((time.perf_counter() - start_dns) * 1000, 2)
+
+        # Serve from the HTTP cache when fresh, otherwise fetch on the shared keep-alive client
+        response, timings, cache_status = http_cache.CACHE.fetch(url, headers=headers)
+        latency = timings['total']
+        load_time, queue_wait = pending_load.result()  # blocks this script run until the simulated work ends
+
+        # Update instance metrics
+        latencies = {'dns': dns_time, 'total': latency}
+        if timings['connection_reused'] is False:  # connect only happens on new connections
+            latencies['connect'] = timings['connect']
+        if cache_status != 'HIT':  # a fresh cache hit never reaches the network
+            latencies['ttfb'] = timings['ttfb']
+        METRICS.end_request(SLOT, latencies)
+        total_histogram = METRICS.histogram(SLOT, 'total')
+        
+        metrics = {
+            'status': 'Active' if response.status_code == 200 else 'Down',
+            'protocol': response.http_version,
+            'latency': latency,
+            'connect_time': timings['connect'],
+            'tls_time': timings['tls'],
+            'ttfb': timings['ttfb'],
+            'connection_reused': timings['connection_reused'],
+            'cache_status': cache_status,
+            'dns_resolution': dns_time,
+            'dns_cache': dns_cache_status,
+            'ip_address': ip_address,
+            'response_code': response.status_code,
+            'server_instance': INSTANCE_ID,
+            'load_time': load_time,
+            'queue_wait': round(queue_wait * 1000, 2),
+            'total_requests': METRICS.requests(SLOT),
+            'p50_latency': total_histogram.percentile(50),
+            'p99_latency': total_histogram.percentile(99)
+        }
+    except Exception as e:
+        METRICS.end_request(SLOT, error=True)
+        metrics = {
+            'status': 'Down',
+            'protocol': 'N/A',
+            'latency': 'N/A',
+            'connect_time': 'N/A',
+            'tls_time': 'N/A',
+            'ttfb': 'N/A',
+            'connection_reused': 'N/A',
+            'cache_status': 'N/A',
+            'dns_resolution': 'N/A',
+            'dns_cache': 'N/A',
+            'ip_address': 'N/A',
+            'response_code': 'N/A',
+            'server_instance': 'N/A',
+            'error': str(e)
+        }
+    return metrics
+
+# Add example sites section before the form
+st.markdown("### Example Sites (Click to Use)")
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    if st.button("ITCorp"):
+        metrics = fetch_metrics("https://itcorp.com")
+        st.success(f"Loaded ITCorp (took {metrics.get('load_time', 0):.2f}s)")
+        st.session_state.url_input = "https://itcorp.com"
+        st.rerun()
+        
+    if st.button("Vortex"):
+        metrics = fetch_metrics("https://www.vortex.com")
+        st.success(f"Loaded Vortex (took {metrics.get('load_time', 0):.2f}s)")
+        st.session_state.url_input = "https://www.vortex.com"
+        st.rerun()
+
+with col2:
+    if st.button("TIC"):
+        metrics = fetch_metrics("https://www.tic.com")
+        st.success(f"Loaded TIC (took {metrics.get('load_time', 0):.2f}s)")
+        st.session_state.url_input = "https://www.tic.com"
+        st.rerun()
+        
+    if st.button("Purple"):
+        metrics = fetch_metrics("https://purple.com")
+        st.success(f"Loaded Purple (took {metrics.get('load_time', 0):.2f}s)")
+        st.session_state.url_input = "https://purple.com"
+        st.rerun()
+        
+with col3:
+    if st.button("Vortex Alt"):
+        metrics = fetch_metrics("https://www.vortex.com")
+        st.success(f"Loaded Vortex Alt (took {metrics.get('load_time', 0):.2f}s)")
+        st.session_state.url_input = "https://www.vortex.com"
+        st.rerun()
+
+# Display current server load
+st.sidebar.markdown("### Server Load Metrics")
+for idx, instance in enumerate(INSTANCES):
+    st.sidebar.metric(
+        label=instance,
+        value=f"{METRICS.requests(idx)} requests ({METRICS.in_flight(idx)} in flight)",
+        delta=f"{METRICS.histogram(idx, 'total').percentile(99):.2f}ms p99",
+        delta_color="off"
+    )
+    st.sidebar.caption(format_percentiles(METRICS.histogram(idx, 'total')))
+
+# Percentiles per phase, merged across all instances
+with st.sidebar.expander("Latency by phase (all instances)"):
+    for phase in shared_metrics.PHASES:
+        merged = LatencyHistogram.merged(METRICS.histogram(idx, phase) for idx in range(len(INSTANCES)))
+        st.text(f"{phase}: {format_percentiles(merged)}")
+
+# Keep-alive effectiveness of the shared HTTP client
+st.sidebar.markdown("### Connection Pool")
+for host, stats in web_client.pool_stats().items():
+    st.sidebar.text(f"{host}: {stats['reused_connections']}/{stats['requests']} reused, "
+                    f"{stats['new_connections']} opened")
+
+cache_stats = http_cache.CACHE.stats()
+st.sidebar.markdown("### Response Cache")
+st.sidebar.text(f"Hit rate: {cache_stats['hit_rate']:.0%} ({cache_stats['HIT']} hits, "
+                f"{cache_stats['REVALIDATED']} revalidated, {cache_stats['MISS']} misses)")
+st.sidebar.text(f"Entries: {cache_stats['entries']} | {cache_stats['bytes'] / 1024:.0f} KiB in memory, "
+                f"{cache_stats['spilled']} on disk")
+
+# Then create the form
+with st.form("web_request_form", clear_on_submit=True):
+    # Custom styling for the form
+    st.markdown("""
+    <style>
+    .form-container {
+        width: 100%; 
+        max-width: 1200px; 
+        margin: auto;
+        padding: 20px;
+        border-radius: 10px;
+        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
+        background-color: #f9f9f9;
+    }
+    .stTextInput input {
+        height: 40px;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+    url = st.text_input("Enter URL (e.g., https://www.google.com)", key="url_input")
+    submitted = st.form_submit_button("Submit")
+
+    # Update URL if example site was clicked
+    if 'url_input' in st.session_state:
+        url = st.session_state.url_input
+
+    if submitted:
+        # Check if URL is valid
+        if url.strip() == "":
+            st.error("Please enter a valid URL.")
+        else:
+            st.write(f"Request submitted to {INSTANCE_ID} for URL: {url}")
+            metrics = fetch_metrics(url)
+
+            # Display network metrics in a visually appealing layout
+            st.markdown("### Network Diagnostics")
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.markdown("#### Connection Metrics")
+                st.info(f"""
+                - 🔌 **Status**: {metrics.get('status')}
+                - 🌐 **Protocol**: {metrics.get('protocol')}
+                - ⚡ **Latency**: {metrics.get('latency')} ms
+                - 🤝 **Connect / TLS**: {metrics.get('connect_time')} ms / {metrics.get('tls_time')} ms
+                - ⏱️ **Time to First Byte**: {metrics.get('ttfb')} ms
+                - ♻️ **Reused Connection**: {metrics.get('connection_reused')}
+                - 💾 **Cache**: {metrics.get('cache_status')}
+                """)
+
+            with col2:
+                st.markdown("#### DNS and IP Metrics")
+                dns_stats = dns_cache.RESOLVER.stats()
+                st.info(f"""
+                - 🧩 **DNS Resolution Time**: {metrics.get('dns_resolution')} ms ({metrics.get('dns_cache')})
+                - 🗂️ **DNS Cache**: {dns_stats['hits']} hits / {dns_stats['misses']} misses, {dns_stats['saved_ms']} ms saved
+                - 🌎 **IP Address**: {metrics.get('ip_address')}
+                - 📡 **Response Code**: {metrics.get('response_code')}
+                """)
+
+            # Add a little vertical space before the website preview
+            st.markdown("<br>", unsafe_allow_html=True)
+
+            # Enhanced website preview with interactive iframe
+            st.markdown("### Website Preview")
+
+            if url:
+                # Center align the iframe
+                iframe_code = f"""
+                <div style="display: flex; justify-content: center; align-items: center; width: 95%; padding: 10px;">
+                    <div style="border: 2px solid #4CAF50; padding: 10px; border-radius: 8px; width: 100%; max-width: 900px; overflow: hidden; box-shadow: 0 4px 8px rgba(0,0,0,0.2); margin-top: 20px;">
+                        <iframe src="{url}" width="100%" height="580px" style="border: none; overflow: auto; border-radius: 8px;" scrolling="yes"></iframe>
+                    </div>
+                </div>
+                """
+                components.html(iframe_code, height=650)
+
+            # Add this after the metrics display
+            if submitted and url:
+                # Display load balancing metrics
+                st.markdown("### Load Balancing Metrics")
+                cols = st.columns(len(INSTANCES))
+                for idx, instance in enumerate(INSTANCES):
+                    with cols[idx]:
+                        st.metric(
+                            label=f"Instance {idx + 1}",
+                            value=f"{METRICS.requests(idx)} requests",
+                            delta=f"{METRICS.histogram(idx, 'total').percentile(99):.2f}ms p99",
+                            delta_color="off"
+                        )
+
+# Batch mode: probe many URLs concurrently and stream rows into the table as they finish
+st.markdown("### Batch URL Check")
+with st.expander("Check many URLs at once"):
+    batch_text = st.text_area("URLs (one per line)", height=150)
+    batch_file = st.file_uploader("...or upload a .txt / .csv list", type=['txt', 'csv'])
+    limit_col1, limit_col2 = st.columns(2)
+    with limit_col1:
+        global_limit = st.number_input("Max concurrent requests", min_value=1, max_value=1000,
+                                       value=batch_probe.DEFAULT_GLOBAL_CONCURRENCY)
+    with limit_col2:
+        per_host_limit = st.number_input("Max concurrent requests per host", min_value=1, max_value=100,
+                                         value=batch_probe.DEFAULT_PER_HOST_CONCURRENCY)
+
+    if st.button("Run Batch"):
+        batch_urls = batch_probe.parse_urls(batch_text)
+        if batch_file is not None:
+            batch_urls += batch_probe.parse_urls(batch_file.getvalue().decode('utf-8', errors='replace'))
+
+        if not batch_urls:
+            st.error("Please enter or upload at least one URL.")
+        else:
+            run = batch_probe.BatchRun(batch_urls, int(global_limit), int(per_host_limit))
+            progress = st.progress(0.0)
+            status_line = st.empty()
+            table = st.empty()
+            rows = []
+            while not run.done or not run.results.empty():
+                new_rows = run.drain()
+                if new_rows:
+                    rows.extend(new_rows)
+                    table.dataframe(rows[-batch_probe.LIVE_ROWS:][::-1], use_container_width=True)
+                progress.progress(len(rows) / len(batch_urls))
+                status_line.text(f"{len(rows)}/{len(batch_urls)} done, {run.throughput():.1f} URLs/s"
+                                 f" (latest {min(len(rows), batch_probe.LIVE_ROWS)} shown, newest first)")
+            table.dataframe(rows, use_container_width=True)
+            errors = sum(1 for row in rows if row['error'])
+            st.success(f"Checked {len(rows)} URLs ({errors} errors) at {run.throughput():.1f} URLs/s")
+
+
+# https://www.vortex.com
\ No newline at end of file